@@ -1,12 +1,47 @@
-from typing import Tuple
+from typing import Dict, Optional, Tuple
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
 from django.http import HttpRequest
+from django.utils.timezone import now
 from django.utils.translation import ugettext as _
 from rest_framework import authentication, exceptions
 from rest_framework.authtoken.models import Token
 
 from ..core.models import CashdeskSession, User
-from ..core.utils.iputils import detect_cashdesk, get_ip_address
+from ..core.models.cashdesk import get_token_cache_key
+from ..core.utils.iputils import detect_cashdesk_id, get_ip_address
+
+
+def get_token_session(key: str) -> Optional[Dict]:
+    """
+    The session, cashdesk, user ID and state and session times belonging to an
+    API token. Cached for ``API_AUTH_CACHE`` seconds; saving or deleting the
+    session or its user drops the entry.
+    """
+    timeout = getattr(settings, "API_AUTH_CACHE", 0)
+    cache_key = get_token_cache_key(key)
+    if timeout > 0:
+        info = cache.get(cache_key)
+        if info is not None:
+            return info
+    session = (
+        CashdeskSession.objects.filter(api_token=key).select_related("user").first()
+    )
+    if not session:
+        return None
+    info = {
+        "session": session.pk,
+        "cashdesk": session.cashdesk_id,
+        "user": session.user_id,
+        "user_active": session.user.is_active,
+        "start": session.start,
+        "end": session.end,
+    }
+    if timeout > 0:
+        cache.set(cache_key, info, timeout)
+    return info
 
 
 class TokenAuthentication(authentication.TokenAuthentication):
@@ -15,19 +50,24 @@ class TokenAuthentication(authentication.TokenAuthentication):
         return super().authenticate(request)
 
     def authenticate_credentials(self, key) -> Tuple[User, Token]:
-        try:
-            session = CashdeskSession.objects.get(api_token=key)
-        except CashdeskSession.DoesNotExist:
+        info = get_token_session(key)
+        if not info:
             raise exceptions.AuthenticationFailed("Invalid token.")
 
-        if not session.is_active():
+        if (info["start"] and info["start"] >= now()) or info["end"]:
             raise exceptions.AuthenticationFailed("Your session has ended.")
 
-        if session.cashdesk != detect_cashdesk(self.request):
+        if info["cashdesk"] != detect_cashdesk_id(self.request):
             raise exceptions.AuthenticationFailed(
                 _(
                     "Your token is valid for a different cashdesk. Your IP is: {}"
                 ).format(get_ip_address(self.request))
             )
 
-        return session.user, session.api_token
+        if not info["user_active"]:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+        # Only the ID is known, any other field is loaded when it is first used
+        user = User.from_db(
+            router.db_for_read(User), ["id", "is_active"], [info["user"], True]
+        )
+        return user, key
@@ -10,6 +10,7 @@ from postix.core.models import (
     Transaction,
     TransactionPosition,
 )
+from postix.core.utils.working_hours import get_minutes, get_name
 
 
 class PreorderPositionSerializer(serializers.ModelSerializer):
@@ -93,3 +94,19 @@ class PingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ping
         fields = ("id", "pinged", "ponged", "secret", "synced")
+
+
+class WorkingHoursSerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    username = serializers.CharField(source="user__username")
+    name = serializers.SerializerMethodField()
+    day = serializers.DateField(required=False)
+    role = serializers.CharField(required=False)
+    minutes = serializers.SerializerMethodField()
+    sessions = serializers.IntegerField()
+
+    def get_name(self, row) -> str:
+        return get_name(row)
+
+    def get_minutes(self, row) -> int:
+        return get_minutes(row["duration"])
@@ -3,19 +3,22 @@ from typing import Any, Dict, List, Union
 import pytz
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Q, QuerySet
+from django.db.models import Prefetch, QuerySet
 from django.http import HttpRequest
 from django.utils.formats import date_format
 from django.utils.timezone import now
 from django.utils.translation import ugettext as _
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.mixins import ListModelMixin
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-from rest_framework.viewsets import ReadOnlyModelViewSet
+from rest_framework.viewsets import GenericViewSet, ReadOnlyModelViewSet
 
 from postix.core.models import ItemMovement
 from postix.core.models.base import ItemSupplyPack
 
+from ..core.middleware import get_cashdesk_context
 from ..core.models import (
     Cashdesk,
     ListConstraint,
@@ -27,6 +30,7 @@ from ..core.models import (
     Transaction,
 )
 from ..core.models.ping import generate_ping
+from ..core.models.preorder import filter_secret_prefix, normalize_secret
 from ..core.utils import round_decimal
 from ..core.utils.compat import detail_route, list_route
 from ..core.utils.flow import (
@@ -35,6 +39,8 @@ from ..core.utils.flow import (
     reverse_transaction,
     sell_ticket,
 )
+from ..core.utils.search import search
+from ..core.utils.working_hours import get_working_hours, parse_groups
 from .serializers import (
     ListConstraintEntrySerializer,
     ListConstraintSerializer,
@@ -43,6 +49,7 @@ from .serializers import (
     PreorderSerializer,
     ProductSerializer,
     TransactionSerializer,
+    WorkingHoursSerializer,
 )
 
 
@@ -56,7 +63,12 @@ class PreorderViewSet(ReadOnlyModelViewSet):
     This is a read-only list of all preorders.
     """
 
-    queryset = Preorder.objects.all().order_by("id")
+    queryset = Preorder.objects.prefetch_related(
+        Prefetch(
+            "positions",
+            queryset=PreorderPosition.objects.with_redemption_info().order_by("id"),
+        )
+    ).order_by("id")
     serializer_class = PreorderSerializer
     permission_classes = (IsAdminUser,)
 
@@ -68,24 +80,38 @@ class PreorderPositionViewSet(ReadOnlyModelViewSet):
     You can filter using query parameters by the ``secret`` field. You can also
     search for secrets by using the ``?search=`` query parameter, that will only
     match the *beginning* of secrets and only if the search query has more than
-    6 characters.
+    6 characters. Both ignore case.
+
+    For autocompletion, use ``typeahead/?search=`` instead: it returns a plain
+    list of at most ``TYPEAHEAD_LIMIT`` matching secrets, without pagination.
     """
 
+    TYPEAHEAD_LIMIT = 10
     queryset = PreorderPosition.objects.all().order_by("id")
     serializer_class = PreorderPositionSerializer
 
     def get_queryset(self) -> QuerySet:
-        queryset = PreorderPosition.objects.all().order_by("id")
+        queryset = PreorderPosition.objects.with_redemption_info().order_by("id")
         exact_param = self.request.GET.get("secret", None)
         search_param = self.request.GET.get("search", None)
         if exact_param is not None:
-            queryset = queryset.filter(secret__iexact=exact_param)
+            queryset = queryset.filter(secret_lookup=normalize_secret(exact_param))
         elif search_param is not None and len(search_param) >= 6:
-            queryset = queryset.filter(secret__istartswith=search_param)
+            queryset = filter_secret_prefix(queryset, search_param)
         else:
             queryset = queryset.none()
         return queryset
 
+    @list_route(methods=["GET"])
+    def typeahead(self, request: HttpRequest) -> Response:
+        search_param = request.GET.get("search", "")
+        if len(search_param) < 6:
+            return Response([])
+        secrets = filter_secret_prefix(
+            PreorderPosition.objects.order_by("secret_lookup"), search_param
+        ).values_list("secret", flat=True)[: self.TYPEAHEAD_LIMIT]
+        return Response([{"secret": secret} for secret in secrets])
+
 
 class TransactionViewSet(ReadOnlyModelViewSet):
     """
@@ -132,7 +158,7 @@ class TransactionViewSet(ReadOnlyModelViewSet):
         trans = Transaction()
         if "cash_given" in data:
             trans.cash_given = round_decimal(data.get("cash_given", "0.00"))
-        session = self.request.user.get_current_session()
+        session = get_cashdesk_context(self.request).session
         if not session:  # noqa
             raise RuntimeError(
                 "This should never happen because the auth layer should handle this."
@@ -189,14 +215,16 @@ class TransactionViewSet(ReadOnlyModelViewSet):
 
     @detail_route(methods=["POST"])
     def reverse(self, *args, **kwargs) -> Response:
-        session = self.request.user.get_current_session()
+        session = get_cashdesk_context(self.request).session
         if not session:  # noqa
             raise RuntimeError(
                 "This should never happen because the auth layer should handle this."
             )
         try:
             new_id = reverse_transaction(kwargs.get("pk"), session)
-            Transaction.objects.get(pk=new_id).print_receipt(do_open_drawer=False)
+            new_transaction = Transaction.objects.get(pk=new_id)
+            new_transaction.session = session
+            new_transaction.print_receipt(do_open_drawer=False)
             return Response(
                 {"success": True, "id": new_id}, status=status.HTTP_201_CREATED
             )
@@ -232,10 +260,7 @@ class ListConstraintEntryViewSet(ReadOnlyModelViewSet):
             queryset = queryset.filter(list_id=listid_param)
             search_param = self.request.query_params.get("search", None)
             if search_param is not None and len(search_param) >= 3:
-                queryset = queryset.filter(
-                    Q(name__icontains=search_param)
-                    | Q(identifier__icontains=search_param)
-                )
+                queryset = search(queryset, search_param)
             elif search_param is not None:
                 queryset = queryset.filter(identifier__iexact=search_param)
             else:
@@ -256,7 +281,7 @@ class CashdeskActionViewSet(ReadOnlyModelViewSet):
 
     @list_route(methods=["POST"], url_path="open-drawer")
     def open_drawer(self, request: HttpRequest) -> Response:
-        session = request.user.get_current_session()
+        session = get_cashdesk_context(request).session
         if not session:  # noqa
             raise RuntimeError(
                 "This should never happen because the auth layer should handle this."
@@ -276,7 +301,7 @@ class CashdeskActionViewSet(ReadOnlyModelViewSet):
 
     @list_route(methods=["POST"], url_path="reprint-receipt")
     def reprint_receipt(self, request: HttpRequest) -> Response:
-        session = request.user.get_current_session()
+        session = get_cashdesk_context(request).session
         if not session:  # noqa
             raise RuntimeError(
                 "This should never happen because the auth layer should handle this."
@@ -294,7 +319,7 @@ class CashdeskActionViewSet(ReadOnlyModelViewSet):
 
     @list_route(methods=["POST"], url_path="request-resupply")
     def request_resupply(self, request: HttpRequest) -> Response:
-        session = request.user.get_current_session()
+        session = get_cashdesk_context(request).session
         if not session:  # noqa
             raise RuntimeError(
                 "This should never happen because the auth layer should handle this."
@@ -305,7 +330,7 @@ class CashdeskActionViewSet(ReadOnlyModelViewSet):
 
     @list_route(methods=["POST"], url_path="signal-next")
     def signal_next(self, request: HttpRequest) -> Response:
-        session = request.user.get_current_session()
+        session = get_cashdesk_context(request).session
         if not session:  # noqa
             raise RuntimeError(
                 "This should never happen because the auth layer should handle this."
@@ -316,7 +341,7 @@ class CashdeskActionViewSet(ReadOnlyModelViewSet):
 
     @list_route(methods=["POST"], url_path="print-ping")
     def print_ping(self, request: HttpRequest) -> Response:
-        session = request.user.get_current_session()
+        session = get_cashdesk_context(request).session
         if not session:  # noqa
             raise RuntimeError(
                 "This should never happen because the auth layer should handle this."
@@ -355,12 +380,12 @@ class CashdeskActionViewSet(ReadOnlyModelViewSet):
                     new_state="used",
                     item_movement=ItemMovement.objects.create(
                         item=isp.item,
-                        session=request.user.get_current_session(),
+                        session=get_cashdesk_context(request).session,
                         amount=isp.amount,
                         backoffice_user=request.user,
                     ),
                 )
-            request.user.get_current_session().cashdesk.printer.open_drawer()
+            get_cashdesk_context(request).session.cashdesk.printer.open_drawer()
             return Response({"success": True})
         elif isp.state == "backoffice":
             return Response(
@@ -410,3 +435,21 @@ class PingViewSet(ReadOnlyModelViewSet):
         obj.synced = True
         obj.save()
         return Response(PingSerializer(obj).data)
+
+
+class WorkingHoursViewSet(ListModelMixin, GenericViewSet):
+    """
+    Working hours of all users with ended sessions, longest first, in minutes.
+    Use ``?group_by=day``, ``?group_by=role`` (the cashdesk's record name) or
+    ``?group_by=day,role`` to split them up.
+    """
+
+    serializer_class = WorkingHoursSerializer
+    permission_classes = (IsAdminUser,)
+
+    def get_queryset(self) -> QuerySet:
+        try:
+            group_by = parse_groups(self.request.GET.get("group_by", ""))
+        except ValueError as e:
+            raise ValidationError({"group_by": str(e)})
+        return get_working_hours(group_by)
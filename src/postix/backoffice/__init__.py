@@ -0,0 +1 @@
+default_app_config = "postix.backoffice.apps.BackofficeConfig"
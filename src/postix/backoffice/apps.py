@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class BackofficeConfig(AppConfig):
+    name = "postix.backoffice"
+    verbose_name = "Backoffice"
+
+    def ready(self):
+        # Connects the signals that invalidate cached check results
+        from . import checks  # noqa
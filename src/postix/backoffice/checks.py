@@ -1,22 +1,102 @@
+"""
+Checks for configuration mistakes, shown on top of the backoffice pages.
+
+A check declares the models it reads when it is registered. Its result is then
+cached for ``BACKOFFICE_CHECKS_CACHE`` seconds in the cache all workers share,
+and dropped as soon as an instance of one of those models is saved or deleted,
+so only the affected checks run again. Checks without models run every time.
+"""
 from decimal import Decimal
+from typing import Dict, Iterable, List
 
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.translation import get_language
 from django.utils.translation import ugettext as _
 
-from postix.core.models import ListConstraintProduct, Product, WarningConstraintProduct
+from postix.core.models import (
+    ListConstraintProduct,
+    Product,
+    Quota,
+    WarningConstraintProduct,
+)
+
 
-_check_registry = set()
+class CheckError(Exception):
+    pass
 
 
-def register_check(fn):
-    _check_registry.add(fn)
-    return fn
+class Check:
+    def __init__(self, fn, models: Iterable):
+        self.fn = fn
+        self.name = fn.__name__
+        self.models = set(models)
+        # Changing a many-to-many relation saves neither of the models
+        self.dependencies = self.models | {
+            field.remote_field.through
+            for model in self.models
+            for field in model._meta.many_to_many
+        }
 
+    @property
+    def cache_key(self) -> str:
+        return "backoffice:check:{}".format(self.name)
 
-class CheckError(Exception):
-    pass
+    def run(self) -> str:
+        """ Returns the error message, or an empty string if the check passed. """
+        try:
+            self.fn()
+        except CheckError as e:
+            return str(e)
+        return ""
+
+
+_check_registry = {}  # type: Dict[str, Check]
+
+
+def register_check(fn=None, *, models: Iterable = ()):
+    """
+    Registers a check, which raises a ``CheckError`` if something is wrong::
 
+        @register_check(models=[Product, Quota])
+        def check_quotas():
+            ...
+    """
 
-@register_check
+    def decorator(fn):
+        check = Check(fn, models)
+        _check_registry[check.name] = check
+        for model in check.dependencies:
+            post_save.connect(_invalidate_dependent_checks, sender=model)
+            post_delete.connect(_invalidate_dependent_checks, sender=model)
+            m2m_changed.connect(_invalidate_dependent_checks, sender=model)
+        return fn
+
+    return decorator if fn is None else decorator(fn)
+
+
+def invalidate_checks(checks: Iterable[Check] = None) -> None:
+    """ Drops the cached results of ``checks``, or of all checks. """
+    if checks is None:
+        checks = _check_registry.values()
+    keys = [check.cache_key for check in checks]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # A request may run the checks before the change is committed, and cache
+    # the old result again
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _invalidate_dependent_checks(sender, **kwargs):
+    invalidate_checks(
+        check for check in _check_registry.values() if sender in check.dependencies
+    )
+
+
+@register_check(models=[Product, Quota])
 def check_quotas():
     prods = []
     for p in Product.objects.filter(is_visible=True).prefetch_related("quota_set"):
@@ -34,7 +114,7 @@ def check_quotas():
         )
 
 
-@register_check
+@register_check(models=[Product, ListConstraintProduct, WarningConstraintProduct])
 def check_tax_rates():
     product_rates = set(
         Product.objects.exclude(price=0).values_list("tax_rate", flat=True).distinct()
@@ -70,12 +150,23 @@ def check_tax_rates():
         )
 
 
-def all_errors():
-    errors = []
-    for check in _check_registry:
-        try:
-            check()
-        except CheckError as e:
-            errors.append(str(e))
-
+def all_errors() -> List[str]:
+    timeout = getattr(settings, "BACKOFFICE_CHECKS_CACHE", 0)
+    language = get_language()
+    checks = sorted(_check_registry.values(), key=lambda check: check.name)
+    cacheable = [check for check in checks if check.models] if timeout > 0 else []
+    # The messages are translated, so we keep the results by language
+    cached = cache.get_many([check.cache_key for check in cacheable])
+    errors, updates = [], {}
+    for check in checks:
+        results = cached.get(check.cache_key, {})
+        result = results.get(language)
+        if result is None:
+            result = check.run()
+            if check in cacheable:
+                updates[check.cache_key] = dict(results, **{language: result})
+        if result:
+            errors.append(result)
+    if updates:
+        cache.set_many(updates, timeout)
     return errors
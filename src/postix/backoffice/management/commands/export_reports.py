@@ -1,11 +1,82 @@
 import os
 import shutil
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
+import django
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
+from django.db import connections
 from django.utils.timezone import now
 
-from postix.backoffice.report import generate_record
-from postix.core.models import Record
+from postix.backoffice.rendering import queue_record, render_job
+from postix.core.models import EventSettings, Record, RecordRenderJob
+from postix.core.models.record import get_record_file_index
+
+
+def _init_worker():
+    django.setup()
+
+
+def _render_record(pk):
+    record = Record.objects.get(pk=pk)
+    job = queue_record(record)
+    if job.status == RecordRenderJob.STATUS_QUEUED:
+        job = render_job(job)
+    if job.status == RecordRenderJob.STATUS_DONE:
+        return pk, default_storage.path(job.path)
+    return pk, None
+
+
+def _export_file(path, export_dir, link=False):
+    target = os.path.join(export_dir, os.path.basename(path))
+    if link:
+        try:
+            os.link(path, target)
+            return os.path.getsize(target)
+        except OSError:
+            pass  # Different file system, fall back to copying
+    shutil.copy2(path, target)
+    return os.path.getsize(target)
+
+
+class Progress:
+    def __init__(self, stream, total, label):
+        self.stream = stream
+        self.total = total
+        self.label = label
+        self.done = 0
+        self.size = 0
+        self.start = time.monotonic()
+        self.step = max(1, total // 20)
+
+    @property
+    def elapsed(self):
+        return max(time.monotonic() - self.start, 1e-6)
+
+    def advance(self, size=0):
+        self.done += 1
+        self.size += size
+        if self.done % self.step == 0 or self.done == self.total:
+            self.stream.write(
+                "{label}: {done}/{total} ({rate:.1f}/s)".format(
+                    label=self.label,
+                    done=self.done,
+                    total=self.total,
+                    rate=self.done / self.elapsed,
+                )
+            )
+
+    def summary(self):
+        return "{} files, {:.1f} MB in {:.1f}s ({:.1f} files/s, {:.1f} MB/s)".format(
+            self.done,
+            self.size / 2 ** 20,
+            self.elapsed,
+            self.done / self.elapsed,
+            self.size / 2 ** 20 / self.elapsed,
+        )
 
 
 class Command(BaseCommand):
@@ -15,34 +86,107 @@ class Command(BaseCommand):
         parser.add_argument(
             "--force", action="store_true", help="Generate missing documents"
         )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=1,
+            help="Number of processes used to generate missing documents",
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=4,
+            help="Number of threads used to copy documents",
+        )
+        parser.add_argument(
+            "--link",
+            action="store_true",
+            help="Hardlink documents into the export directory instead of copying them",
+        )
+        parser.add_argument(
+            "--zip",
+            metavar="FILE",
+            help="Write all documents into a ZIP archive instead of a directory. "
+            'Use "-" to write the archive to stdout.',
+        )
 
     def handle(self, *args, **options):
-        export_dir = os.path.join(
-            ".", "export-{}".format(now().strftime("%Y-%m-%d-%H%M%S"))
-        )
-        os.mkdir(export_dir)
-        successful_exports = 0
-        failed_exports = []
-        force = options["force"]
-
-        for record in Record.objects.all():
-            report_path = record.record_path
-            if not report_path and force:
-                generate_record(record)
-                report_path = record.record_path
-            if report_path:
-                shutil.copy2(report_path, export_dir)
-                successful_exports += 1
-            else:
-                failed_exports.append(record.pk)
-
-        success_msg = "Exported {} records to directory {}.".format(
-            successful_exports, export_dir
+        # Keep stdout clean if the archive is streamed there
+        log = self.stderr if options["zip"] == "-" else self.stdout
+        index = get_record_file_index(EventSettings.get_solo().short_name)
+        record_ids = list(Record.objects.order_by("pk").values_list("pk", flat=True))
+        missing = [pk for pk in record_ids if pk not in index]
+
+        if missing and options["force"]:
+            index.update(self.render(missing, options["jobs"], log))
+            missing = [pk for pk in record_ids if pk not in index]
+
+        paths = [index[pk] for pk in record_ids if pk in index]
+        if options["zip"]:
+            target = options["zip"]
+            progress = self.write_zip(paths, target, log)
+        else:
+            target = os.path.join(
+                ".", "export-{}".format(now().strftime("%Y-%m-%d-%H%M%S"))
+            )
+            os.mkdir(target)
+            progress = self.write_directory(
+                paths, target, options["threads"], options["link"], log
+            )
+
+        success_msg = "Exported {} records to {}: {}".format(
+            len(paths), target, progress.summary()
         )
-        self.stdout.write(self.style.SUCCESS(success_msg))
+        log.write(self.style.SUCCESS(success_msg))
 
-        if failed_exports:
+        if missing:
             warn_msg = "Could not find files for {} records (IDs: {}). Use --force to generate them.".format(
-                len(failed_exports), failed_exports
+                len(missing), missing
             )
-            self.stdout.write(self.style.WARNING(warn_msg))
+            log.write(self.style.WARNING(warn_msg))
+
+    def render(self, record_ids, jobs, log):
+        progress = Progress(log, len(record_ids), "Rendering")
+        result = {}
+        if jobs > 1:
+            # Child processes must not share the parent's database connections
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=jobs, initializer=_init_worker
+            ) as executor:
+                rendered = executor.map(_render_record, record_ids, chunksize=4)
+                for pk, path in rendered:
+                    progress.advance()
+                    if path:
+                        result[pk] = path
+        else:
+            for pk in record_ids:
+                pk, path = _render_record(pk)
+                progress.advance()
+                if path:
+                    result[pk] = path
+        return result
+
+    def write_directory(self, paths, export_dir, threads, link, log):
+        progress = Progress(log, len(paths), "Exporting")
+        with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+            futures = [
+                executor.submit(_export_file, path, export_dir, link) for path in paths
+            ]
+            for future in futures:
+                progress.advance(future.result())
+        return progress
+
+    def write_zip(self, paths, target, log):
+        progress = Progress(log, len(paths), "Archiving")
+        stream = sys.stdout.buffer if target == "-" else open(target, "wb")
+        try:
+            # PDFs are compressed already, so we only store them
+            with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED) as zf:
+                for path in paths:
+                    zf.write(path, arcname=os.path.basename(path))
+                    progress.advance(os.path.getsize(path))
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
+        return progress
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from postix.backoffice.rendering import run_render_jobs
+
+
+class Command(BaseCommand):
+    help = "Render queued record PDFs. Use --loop to keep running as a worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling for new render jobs"
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls when idle (default: 1)",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            count = run_render_jobs()
+            if count:
+                self.stdout.write("Rendered {} records.".format(count))
+            if not options["loop"]:
+                break
+            if not count:
+                time.sleep(options["interval"])
@@ -0,0 +1,138 @@
+import logging
+from datetime import timedelta
+from typing import Union
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils.timezone import now
+
+from postix.core.models import Record, RecordRenderJob
+
+logger = logging.getLogger(__name__)
+
+
+def generate_record(record: Record) -> str:
+    """
+    Renders the PDF of a record and returns its path, see
+    ``postix.backoffice.report``. That imports reportlab, which takes a
+    while, so we only import it when the first record is rendered.
+    """
+    from .report import generate_record
+
+    return generate_record(record)
+
+
+def get_cached_record(record: Record) -> Union[str, None]:
+    """
+    Returns the storage path of a finished render of this record if the record
+    has not changed since, and None otherwise.
+    """
+    job = (
+        record.render_jobs.filter(
+            status=RecordRenderJob.STATUS_DONE, checksum=record.checksum
+        )
+        .order_by("-created")
+        .first()
+    )
+    if job and job.path and default_storage.exists(job.path):
+        return job.path
+
+
+def requeue_stale_jobs(jobs: QuerySet = None) -> int:
+    """
+    Queues running jobs again that have not finished within
+    ``RECORD_RENDER_TIMEOUT`` seconds, e.g. because their worker died.
+    Returns the number of jobs queued again.
+    """
+    if jobs is None:
+        jobs = RecordRenderJob.objects.all()
+    cutoff = now() - timedelta(seconds=settings.RECORD_RENDER_TIMEOUT)
+    return jobs.filter(
+        status=RecordRenderJob.STATUS_RUNNING, modified__lt=cutoff
+    ).update(status=RecordRenderJob.STATUS_QUEUED, modified=now())
+
+
+def queue_record(record: Record, force: bool = False) -> RecordRenderJob:
+    """
+    Requests a PDF of the given record. Renders are deduplicated by the record
+    checksum: a pending job or a cached PDF for the current checksum are reused.
+    Pass ``force`` if the document changed in ways the checksum does not cover,
+    e.g. the item report of a corrected session.
+
+    Unless ``RECORD_RENDER_BACKGROUND`` is set, the job is rendered once the
+    current transaction is committed, or right away outside of transactions.
+    Rendering takes a while, and we do not want to hold the database's write
+    lock meanwhile.
+    """
+    checksum = record.checksum
+    jobs = record.render_jobs.filter(checksum=checksum).order_by("-created")
+    requeue_stale_jobs(jobs)
+    pending = [RecordRenderJob.STATUS_QUEUED]
+    if not force:
+        pending.append(RecordRenderJob.STATUS_RUNNING)
+    job = jobs.filter(status__in=pending).first()
+    if not job and not force:
+        job = jobs.filter(status=RecordRenderJob.STATUS_DONE).first()
+        if job and not (job.path and default_storage.exists(job.path)):
+            job = None
+    if not job:
+        job = RecordRenderJob.objects.create(record=record, checksum=checksum)
+    if job.status == RecordRenderJob.STATUS_QUEUED and not getattr(
+        settings, "RECORD_RENDER_BACKGROUND", False
+    ):
+        transaction.on_commit(lambda: render_job(job))
+    return job
+
+
+def claim_job(job: RecordRenderJob) -> bool:
+    """ Marks a queued job as running. Returns False if another worker was faster. """
+    claimed = RecordRenderJob.objects.filter(
+        pk=job.pk, status=RecordRenderJob.STATUS_QUEUED
+    ).update(status=RecordRenderJob.STATUS_RUNNING, modified=now())
+    if claimed:
+        job.status = RecordRenderJob.STATUS_RUNNING
+    return bool(claimed)
+
+
+def render_job(job: RecordRenderJob) -> RecordRenderJob:
+    if job.status == RecordRenderJob.STATUS_QUEUED and not claim_job(job):
+        job.refresh_from_db()
+        return job
+
+    record = Record.objects.get(pk=job.record_id)
+    try:
+        # The checksum is taken at render time, in case the record was edited
+        # while the job was waiting in the queue.
+        checksum = record.checksum
+        path = generate_record(record)
+    except Exception as e:
+        logger.exception("Rendering record %s failed", job.record_id)
+        job.status = RecordRenderJob.STATUS_FAILED
+        job.error = str(e)
+        job.save(update_fields=["status", "error", "modified"])
+        return job
+
+    job.status = RecordRenderJob.STATUS_DONE
+    job.checksum = checksum
+    job.path = path
+    job.error = ""
+    job.save(update_fields=["status", "checksum", "path", "error", "modified"])
+    return job
+
+
+def run_render_jobs(limit: int = None) -> int:
+    """ Processes queued render jobs in creation order, returns the number handled. """
+    count = 0
+    requeue_stale_jobs()
+    queued = RecordRenderJob.objects.filter(
+        status=RecordRenderJob.STATUS_QUEUED
+    ).order_by("created")
+    for job in queued.iterator():
+        if limit is not None and count >= limit:
+            break
+        if claim_job(job):
+            render_job(job)
+            count += 1
+    return count
@@ -11,6 +11,7 @@ from reportlab.lib.units import mm
 from reportlab.platypus import PageBreak, Paragraph, Spacer, Table, TableStyle
 
 from postix.core.models import CashdeskSession, EventSettings, Record
+from postix.core.utils.metrics import timed
 from postix.core.utils.pdf import (
     FONTSIZE,
     get_default_document,
@@ -382,6 +383,7 @@ def generate_balance_statement(record, doc):
     ]
 
 
+@timed("record_render")
 def generate_record(record: Record) -> str:
     """
     Generates the PDF for a given record; returns the path to the record PDF.
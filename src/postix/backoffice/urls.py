@@ -42,12 +42,18 @@ urlpatterns = [
     url("^records/balance/$", views.RecordBalanceView.as_view(), name="record-balance"),
     url("^records/new/$", views.RecordCreateView.as_view(), name="new-record"),
     url("^records/blank/$", views.record_print, name="blank-record"),
+    url("^records/export/$", views.record_export, name="record-export"),
     url(
         "^records/(?P<pk>[0-9]+)/$",
         views.RecordDetailView.as_view(),
         name="record-detail",
     ),
     url("^records/(?P<pk>[0-9]+)/print/$", views.record_print, name="record-print"),
+    url(
+        "^records/(?P<pk>[0-9]+)/status/$",
+        views.record_render_status,
+        name="record-render-status",
+    ),
     url(
         "^records/entity/$",
         views.RecordEntityListView.as_view(),
@@ -126,5 +132,13 @@ urlpatterns = [
         views.WizardItemEditView.as_view(),
         name="wizard-items-edit",
     ),
+    url("^wizard/metrics/$", views.metrics_view, name="wizard-metrics"),
+    url(
+        "^wizard/metrics/prometheus$",
+        views.metrics_prometheus,
+        name="wizard-metrics-prometheus",
+    ),
+    url("^stats/timeline/$", views.stats_timeline, name="stats-timeline"),
+    url("^recheck/$", views.recheck_view, name="recheck"),
     url("^$", views.MainView.as_view(), name="main"),
 ]
@@ -6,7 +6,7 @@ from .asset import (
     AssetUpdateView,
 )
 from .auth import LoginView, logout_view, switch_user
-from .main import MainView
+from .main import MainView, recheck_view
 from .record import (
     RecordBalanceView,
     RecordCreateView,
@@ -16,7 +16,9 @@ from .record import (
     RecordEntityDetailView,
     RecordEntityListView,
     RecordListView,
+    record_export,
     record_print,
+    record_render_status,
 )
 from .session import (
     EndSessionView,
@@ -28,6 +30,7 @@ from .session import (
     resupply_session,
     reverse_session_view,
 )
+from .stats import metrics_prometheus, metrics_view, stats_timeline
 from .supply import (
     SupplyCreateView,
     SupplyListView,
@@ -63,6 +66,8 @@ __all__ = (
     "LoginView",
     "logout_view",
     "MainView",
+    "metrics_prometheus",
+    "metrics_view",
     "move_session",
     "NewSessionView",
     "resupply_session",
@@ -75,12 +80,16 @@ __all__ = (
     "RecordEntityDetailView",
     "RecordEntityListView",
     "RecordListView",
+    "record_export",
     "record_print",
+    "record_render_status",
+    "recheck_view",
     "ReportListView",
     "ResetPasswordView",
     "switch_user",
     "SessionDetailView",
     "SessionListView",
+    "stats_timeline",
     "SupplyListView",
     "SupplyCreateView",
     "SupplyMoveInView",
@@ -1,12 +1,19 @@
+from django.contrib import messages
 from django.db.models import Sum
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import redirect
+from django.utils.http import is_safe_url
+from django.utils.translation import ugettext as _
+from django.views.decorators.http import require_POST
 from django.views.generic import TemplateView
 
 from postix.core.models import Quota
 from postix.core.models.base import Item, ItemSupplyPack, Product
 from postix.core.models.preorder import PreorderPosition
+from postix.core.models.rollup import get_product_totals
 
 from .. import checks
-from .utils import SuperuserRequiredMixin
+from .utils import SuperuserRequiredMixin, backoffice_user_required
 
 
 class MainView(SuperuserRequiredMixin, TemplateView):
@@ -14,7 +21,11 @@ class MainView(SuperuserRequiredMixin, TemplateView):
 
     def get_context_data(self):
         ctx = super().get_context_data()
-        ctx["products"] = Product.objects.all()
+        ctx["products"] = list(Product.objects.all())
+        totals = get_product_totals()
+        for product in ctx["products"]:
+            product.amount_sold = totals[product.pk]["sold"]
+            product.amount_redeemed = totals[product.pk]["redeemed"]
         ctx["items"] = Item.objects.all()
         ctx["quotas"] = Quota.objects.all()
         ctx["check_errors"] = checks.all_errors()
@@ -38,3 +49,26 @@ class MainView(SuperuserRequiredMixin, TemplateView):
             .annotate(s=Sum("amount"))
         )
         return ctx
+
+
+@require_POST
+@backoffice_user_required
+def recheck_view(request: HttpRequest) -> HttpResponse:
+    """ Drops the cached check results and runs all checks again. """
+    checks.invalidate_checks()
+    errors = checks.all_errors()
+    if errors:
+        messages.warning(
+            request,
+            _("The settings have been checked again. Problems found: {count}").format(
+                count=len(errors)
+            ),
+        )
+    else:
+        messages.success(
+            request, _("The settings have been checked again. No problems found.")
+        )
+    url = request.POST.get("next")
+    if url and is_safe_url(url, request.get_host()):
+        return redirect(url)
+    return redirect("backoffice:session-list")
@@ -7,12 +7,13 @@ from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.core.files.storage import default_storage
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Q, Sum
 from django.forms import formset_factory
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, redirect
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.functional import cached_property
+from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
 from django.views.generic import (
     CreateView,
@@ -32,8 +33,16 @@ from postix.backoffice.forms.record import (
     RecordSearchForm,
     RecordUpdateForm,
 )
-from postix.backoffice.report import generate_record
-from postix.core.models.record import Record, RecordEntity, record_balance
+from postix.backoffice.rendering import generate_record, queue_record
+from postix.core.models import EventSettings
+from postix.core.models.record import (
+    Record,
+    RecordEntity,
+    RecordRenderJob,
+    record_balance,
+    signed_amount,
+)
+from postix.core.utils.record_export import iter_records_csv
 
 from .utils import (
     BackofficeUserRequiredMixin,
@@ -44,14 +53,37 @@ from .utils import (
 User = get_user_model()
 
 
-class RecordListView(BackofficeUserRequiredMixin, TemplateView):
+class RecordListView(BackofficeUserRequiredMixin, ListView):
     model = Record
     template_name = "backoffice/record_list.html"
+    context_object_name = "records"
+    paginate_by = 100
+
+    @cached_property
+    def filter_form(self):
+        return RecordSearchForm(data=self.request.GET)
 
     def get_context_data(self, *args, **kwargs):
         ctx = super().get_context_data(*args, **kwargs)
+        ctx["filter_form"] = self.filter_form
+
+        # Running totals are computed over the filtered records in
+        # chronological order: one aggregate yields the total before the oldest
+        # record on this page, the rest is summed up within the page.
+        records = list(ctx["records"])
+        if records:
+            oldest = records[-1]
+            running_total = self.get_queryset().filter(
+                Q(datetime__lt=oldest.datetime)
+                | Q(datetime=oldest.datetime, pk__lt=oldest.pk)
+            ).aggregate(total=Sum(signed_amount()))["total"] or Decimal("0.00")
+            for obj in reversed(records):
+                running_total += obj.signed_amount
+                obj.running_total = running_total
+        ctx["records"] = records
+        return ctx
 
-        ctx["filter_form"] = RecordSearchForm(data=self.request.GET)
+    def get_queryset(self):
 
         records = Record.objects.prefetch_related(
             # prefetch_related should save some RAM and bandwith over select_related since we expect a small set of
@@ -63,8 +95,8 @@ class RecordListView(BackofficeUserRequiredMixin, TemplateView):
             "cash_movement__session__cashdesk",
             "cash_movement__session__user",
         )
-        if ctx["filter_form"].is_valid():
-            filters = ctx["filter_form"].cleaned_data
+        if self.filter_form.is_valid():
+            filters = self.filter_form.cleaned_data
             if filters.get("date_min"):
                 records = records.filter(datetime__gte=filters.get("date_min"))
             if filters.get("date_max"):
@@ -96,15 +128,7 @@ class RecordListView(BackofficeUserRequiredMixin, TemplateView):
                     | Q(entity__detail__icontains=filters.get("source"))
                 )
 
-        running_total = 0
-        for obj in records:
-            if obj.type == "inflow":
-                running_total += obj.amount
-            else:
-                running_total -= obj.amount
-            obj.running_total = running_total
-        ctx["records"] = reversed(records)
-        return ctx
+        return records.order_by("-datetime", "-pk")
 
 
 class RecordCreateView(BackofficeUserRequiredMixin, CreateView):
@@ -238,7 +262,9 @@ class RecordDetailView(BackofficeUserRequiredMixin, UpdateView):
                 else:
                     movement.session.cash_after -= difference
                 movement.session.save()
-        return super().form_valid(form)
+        response = super().form_valid(form)
+        queue_record(self.object, force=True)
+        return response
 
     def get_success_url(self):
         return reverse("backoffice:record-print", kwargs={"pk": self.kwargs["pk"]})
@@ -251,11 +277,12 @@ def record_print(request, pk: int = None):
         content = generate_record(record)
     else:
         record = get_object_or_404(Record, pk=pk)
-        if (
-            not record.record_path or "cached" not in request.GET
-        ):  # TODO: don't regenerate pdf always
-            generate_record(record)
-        content = default_storage.open(record.record_path, "rb")
+        job = queue_record(record)
+        if job.status != RecordRenderJob.STATUS_DONE:
+            return render(
+                request, "backoffice/record_render.html", {"record": record, "job": job}
+            )
+        content = default_storage.open(job.path, "rb")
 
     response = HttpResponse(content=content)
     response["Content-Type"] = "application/pdf"
@@ -265,6 +292,30 @@ def record_print(request, pk: int = None):
     return response
 
 
+@backoffice_user_required
+def record_export(request):
+    response = StreamingHttpResponse(
+        iter_records_csv(), content_type="text/csv; charset=utf-8"
+    )
+    response["Content-Disposition"] = 'attachment; filename="{}_records_{}.csv"'.format(
+        EventSettings.get_solo().short_name, now().strftime("%Y-%m-%d-%H-%M")
+    )
+    return response
+
+
+@backoffice_user_required
+def record_render_status(request, pk: int):
+    record = get_object_or_404(Record, pk=pk)
+    job = record.render_jobs.order_by("-created").first()
+    return JsonResponse(
+        {
+            "status": job.status if job else None,
+            "error": job.error if job else "",
+            "url": reverse("backoffice:record-print", kwargs={"pk": record.pk}),
+        }
+    )
+
+
 class RecordEntityListView(SuperuserRequiredMixin, ListView):
     model = RecordEntity
     template_name = "backoffice/record_entity_list.html"
@@ -23,9 +23,10 @@ from ...core.models import (
     Record,
     User,
 )
+from ...core.models.cashdesk import get_item_ledger
 from .. import checks
 from ..forms import ItemMovementFormSetHelper, SessionBaseForm, get_form_and_formset
-from ..report import generate_record
+from ..rendering import queue_record
 from .utils import BackofficeUserRequiredMixin, backoffice_user_required
 
 
@@ -135,6 +136,21 @@ class SessionListView(LoginRequiredMixin, BackofficeUserRequiredMixin, ListView)
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data()
         ctx["check_errors"] = checks.all_errors()
+        cashdesks = list(ctx["cashdesks"])
+        sessions = (
+            CashdeskSession.objects.filter(cashdesk__in=cashdesks, end__isnull=True)
+            .select_related("cashdesk", "user")
+            .order_by("pk")
+        )
+        sessions = [session for session in sessions if session.is_active()]
+        ledger = get_item_ledger(sessions)
+        for cashdesk in cashdesks:
+            cashdesk.active_sessions = []
+        cashdesk_map = {cashdesk.pk: cashdesk for cashdesk in cashdesks}
+        for session in sessions:
+            session.current_items = ledger[session.pk]
+            cashdesk_map[session.cashdesk_id].active_sessions.append(session)
+        ctx["cashdesks"] = cashdesks
         return ctx
 
 
@@ -147,7 +163,20 @@ class ReportListView(LoginRequiredMixin, BackofficeUserRequiredMixin, ListView):
     paginate_by = 25
 
     def get_queryset(self) -> QuerySet:
-        return CashdeskSession.objects.filter(end__isnull=False).order_by("-end")
+        return (
+            CashdeskSession.objects.filter(end__isnull=False)
+            .select_related("cashdesk", "user")
+            .order_by("-end")
+        )
+
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        sessions = list(ctx["sessions"])
+        ledger = get_item_ledger(sessions)
+        for session in sessions:
+            session.current_items = ledger[session.pk]
+        ctx["sessions"] = sessions
+        return ctx
 
 
 class SessionDetailView(BackofficeUserRequiredMixin, DetailView):
@@ -375,7 +404,7 @@ class EndSessionView(LoginRequiredMixin, BackofficeUserRequiredMixin, TemplateVi
                             backoffice_user=form.cleaned_data["backoffice_user"],
                         )
 
-            generate_record(record)
+            queue_record(record, force=True)
             return redirect("backoffice:record-print", pk=record.pk)
         messages.error(
             request, _("Session could not be ended: Please review the data.")
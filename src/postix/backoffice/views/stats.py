@@ -0,0 +1,99 @@
+import hmac
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.shortcuts import redirect, render
+from django.utils.translation import ugettext as _
+
+from postix.core.utils.metrics import OPERATION, REQUEST, registry, render_prometheus
+
+from .utils import backoffice_user_required, is_superuser, superuser_required
+
+
+def _get_date(request: HttpRequest, name: str):
+    value = request.GET.get(name)
+    if value:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+# Bounds for the size of a timeline response
+TIMELINE_MAX_DAYS = 31
+TIMELINE_MAX_SAMPLES = 10000
+
+
+@backoffice_user_required
+def stats_timeline(request: HttpRequest) -> JsonResponse:
+    """
+    Transactions per bucket and open cashdesks over time. Accepts ``start`` and
+    ``end`` (YYYY-MM-DD) as well as ``bucket`` and ``resolution`` in minutes.
+    """
+    from postix.core.utils.timeseries import get_timeline, serialize_timeline
+
+    try:
+        timeline = get_timeline(
+            start=_get_date(request, "start"),
+            end=_get_date(request, "end"),
+            bucket=timedelta(minutes=int(request.GET.get("bucket", 30))),
+            resolution=timedelta(minutes=int(request.GET.get("resolution", 5))),
+            max_days=TIMELINE_MAX_DAYS,
+            max_samples=TIMELINE_MAX_SAMPLES,
+        )
+    except (ValueError, OverflowError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(serialize_timeline(timeline))
+
+
+def _metric_rows(kind: str, sort_by_time: bool = False) -> list:
+    rows = [
+        {
+            "name": name,
+            "count": metric.count,
+            "errors": metric.errors,
+            "average": metric.average * 1000,
+            "p50": metric.quantile(0.5) * 1000,
+            "p95": metric.quantile(0.95) * 1000,
+            "p99": metric.quantile(0.99) * 1000,
+            "queries": metric.average_queries,
+            "db_time": metric.db_time / metric.count * 1000,
+            "total": metric.duration,
+        }
+        for name, metric in registry.snapshot(kind).items()
+    ]
+    if sort_by_time:
+        return sorted(rows, key=lambda row: row["total"], reverse=True)
+    return sorted(rows, key=lambda row: row["name"])
+
+
+@superuser_required
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    if request.method == "POST":
+        registry.reset()
+        messages.success(request, _("The metrics have been reset."))
+        return redirect("backoffice:wizard-metrics")
+    return render(
+        request,
+        "backoffice/wizard_metrics.html",
+        {
+            "enabled": settings.METRICS,
+            "requests": _metric_rows(REQUEST, sort_by_time=True),
+            "operations": _metric_rows(OPERATION),
+        },
+    )
+
+
+def metrics_prometheus(request: HttpRequest) -> HttpResponse:
+    """
+    Metrics in the Prometheus text format, for superusers and for requests
+    carrying the ``METRICS_TOKEN`` as bearer token.
+    """
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    token_valid = bool(settings.METRICS_TOKEN) and hmac.compare_digest(
+        authorization.encode(), "Bearer {}".format(settings.METRICS_TOKEN).encode()
+    )
+    if not token_valid and not is_superuser(request.user):
+        return HttpResponse(status=403)
+    return HttpResponse(
+        render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
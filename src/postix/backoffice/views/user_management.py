@@ -1,13 +1,24 @@
 from typing import Union
 
 from django.contrib import messages
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.shortcuts import redirect, render
 from django.urls import reverse
 from django.utils.translation import ugettext as _
 from django.views.generic import FormView, ListView
 
 from ...core.models import User
+from ...core.utils.working_hours import (
+    iter_working_hours_csv,
+    parse_groups,
+    with_working_time,
+)
 from ..forms import CreateUserForm, ResetPasswordForm, get_normal_user_form
 from .utils import BackofficeUserRequiredMixin, backoffice_user_required
 
@@ -39,29 +50,18 @@ def create_user_view(request: HttpRequest) -> Union[HttpResponseRedirect, HttpRe
 
 class UserListView(BackofficeUserRequiredMixin, ListView):
     template_name = "backoffice/user_list.html"
-    queryset = User.objects.all().order_by("username")
+    queryset = with_working_time(User.objects.all()).order_by("username")
 
-    def dispatch(self, request, *args, **kwargs):
+    def get(self, request, *args, **kwargs):
         if "export" not in request.GET:
-            return super().dispatch(request, *args, **kwargs)
-        user_list = (
-            User.objects.filter(cashdesksession__isnull=False).order_by().distinct()
+            return super().get(request, *args, **kwargs)
+        try:
+            group_by = parse_groups(request.GET.get("group_by", ""))
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        return StreamingHttpResponse(
+            iter_working_hours_csv(group_by), content_type="text/plain;charset=utf-8"
         )
-        user_list = sorted(user_list, key=lambda u: u.hours[0], reverse=True)
-        content = "nick,name,minutes\n"
-        content += "\n".join(
-            [
-                "{nick},{name},{minutes}".format(
-                    nick=user.username,
-                    name=user.get_full_name(),
-                    minutes=int(user.hours[0].seconds / 60)
-                    + user.hours[0].days * 24 * 60,
-                )
-                for user in user_list
-            ]
-        )
-        response = HttpResponse(content, content_type="text/plain;charset=utf-8")
-        return response
 
 
 class ResetPasswordView(BackofficeUserRequiredMixin, FormView):
@@ -1,102 +1,119 @@
 import math
-from datetime import datetime, time, timedelta
+from datetime import datetime, timedelta
 
-import numpy as np
-import pylab as plt
-from django.core.management.base import BaseCommand
-from django.utils.timezone import get_current_timezone
+from django.core.management.base import BaseCommand, CommandError
 
-from postix.core.models import CashdeskSession, TransactionPosition
+from postix.core.models import EventSettings
 
 
-def dtf(d):
-    return d.hour + d.minute / 60.0
-
-
-def opensessions(x, sessions, dt):
-    tz = get_current_timezone()
-    dt = datetime.combine(
-        dt,
-        time(
-            hour=int(math.floor(x)),
-            minute=int((x - math.floor(x)) * 60),
-            second=0,
-            tzinfo=tz,
-        ),
-    )
-    op = set([s["cashdesk"] for s in sessions if s["start"] <= dt and s["end"] >= dt])
-    return len(op)
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
 
 
 class Command(BaseCommand):
     help = "Generate time graphs"
 
     def add_arguments(self, parser):
-        parser.add_argument("--ignore-sessions")
+        parser.add_argument(
+            "--ignore-sessions", default="", help="Comma-separated session IDs"
+        )
+        parser.add_argument("--start", type=parse_date, help="First day, YYYY-MM-DD")
+        parser.add_argument("--end", type=parse_date, help="Last day, YYYY-MM-DD")
+        parser.add_argument(
+            "--bucket", type=int, default=30, help="Bucket size in minutes"
+        )
+        parser.add_argument(
+            "--resolution",
+            type=int,
+            default=5,
+            help="Sampling interval of open cashdesks in minutes",
+        )
+        parser.add_argument("--output", default="transactions")
 
     def handle(self, *args, **kwargs):
-        tz = get_current_timezone()
-        sessions = (
-            CashdeskSession.objects.exclude(cashdesk__name__icontains="handkasse")
-            .exclude(cashdesk__handles_items=False)
-            .exclude(
-                id__in=[int(a) for a in kwargs.get("ignore_sessions", "").split(",")]
-            )
-            .values("id", "start", "end", "cashdesk")
+        import numpy as np
+        import pylab as plt
+
+        from postix.core.utils.timeseries import (
+            day_offsets,
+            get_default_sessions,
+            get_timeline,
+            split_days,
         )
-        firststart = CashdeskSession.objects.order_by("start").first().start.date()
-        lastend = CashdeskSession.objects.order_by("-end").first().end.date()
-        days = (lastend - firststart).days + 1
 
+        sessions = get_default_sessions().exclude(
+            id__in=[int(a) for a in kwargs["ignore_sessions"].split(",") if a]
+        )
+        try:
+            timeline = get_timeline(
+                start=kwargs["start"],
+                end=kwargs["end"],
+                bucket=timedelta(minutes=kwargs["bucket"]),
+                resolution=timedelta(minutes=kwargs["resolution"]),
+                sessions=sessions,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        days = timeline["days"]
+        rows = math.ceil(days / 2)
         fig, axs = plt.subplots(
-            math.ceil(days / 2), 2, figsize=(11.69, 8.27), sharey=True
+            rows, 2, figsize=(11.69, 8.27), sharey=True, squeeze=False
+        )
+        bucket_hours = timeline["bucket_size"] / 3600
+        max_open = max(timeline["open_cashdesks"].max(initial=0), 1) + 1
+        transactions = timeline["transactions"]
+        series = [
+            ("Presale transactions", transactions["redeem"]),
+            ("Cash transactions", transactions["sell"]),
+            ("Reversals", transactions["reverse"]),
+        ]
+        start = timeline["start"]
+        day_lengths = np.diff(day_offsets(start, days))
+        bucket_days = list(
+            split_days(
+                np.arange(len(timeline["buckets"])), timeline["buckets"], start, days
+            )
+        )
+        open_days = list(
+            split_days(timeline["open_cashdesks"], timeline["points"], start, days)
         )
+
         for i in range(days):
             sp = axs[i // 2, i % 2]
-            x = np.linspace(0, 24, 300)[:-1]
-            day = firststart + timedelta(days=i)
+            offsets, indices = bucket_days[i]
+            bottom = np.zeros(len(indices))
+            for label, counts in series:
+                sp.bar(
+                    offsets / 3600,
+                    counts[indices],
+                    width=bucket_hours,
+                    bottom=bottom,
+                    align="edge",
+                    label=label,
+                )
+                bottom += counts[indices]
+            sp.set_title((start + timedelta(days=i)).strftime("%Y-%m-%d"))
 
-            d = TransactionPosition.objects.filter(
-                transaction__datetime__lt=firststart + timedelta(days=i + 1),
-                transaction__datetime__gt=firststart + timedelta(days=i),
-            ).values("transaction__datetime", "preorder_position")
-            sp.hist(
-                [
-                    [
-                        dtf(p["transaction__datetime"].astimezone(tz))
-                        for p in d
-                        if p["preorder_position"]
-                    ],
-                    [
-                        dtf(p["transaction__datetime"].astimezone(tz))
-                        for p in d
-                        if not p["preorder_position"]
-                    ],
-                ],
-                label=["Presale transactions", "Cash transactions"],
-                bins=np.arange(0, 24.5, 0.5),
-                histtype="barstacked",
-            )
-            sp.set_title(day.strftime("%Y-%m-%d"))
             ax2 = sp.twinx()
-            ax2.plot(
-                x,
-                [opensessions(x, sessions, firststart + timedelta(days=i)) for x in x],
-                label="Open cashdesks",
-                color="r",
-            )
-            ax2.set_ylim(0, 8)
+            points, open_cashdesks = open_days[i]
+            ax2.plot(points / 3600, open_cashdesks, label="Open cashdesks", color="r")
+            ax2.set_ylim(0, max_open)
             if i == 0:
                 ax2.legend(loc="upper left")
-            elif i == 3:
+            if i % 2 == 1:
                 ax2.set_ylabel("Open cashdesks")
-            sp.set_xlim(0, 24)
+            sp.set_xlim(0, day_lengths[i] / 3600)
             sp.set_xticks(range(0, 25, 2))
 
-        axs[1, 1].legend(loc="upper left")
-        axs[1, 0].set_ylabel(u"Number of Transactions per 30 minutes")
-        axs[2, 0].set_xlabel(u"Time of day")
+        if days % 2:
+            axs[-1, 1].axis("off")
+        axs[0, 1 if days > 1 else 0].legend(loc="upper right")
+        axs[rows // 2, 0].set_ylabel(
+            "Number of Transactions per {} minutes".format(kwargs["bucket"])
+        )
+        axs[-1, 0].set_xlabel("Time of day")
         fig.tight_layout()
-        fig.suptitle("Cashdesk transactions 35c3")
-        plt.savefig("transactions.svg")
-        plt.savefig("transactions.png")
+        fig.suptitle("Cashdesk transactions {}".format(EventSettings.get_solo().name))
+        plt.savefig("{}.svg".format(kwargs["output"]))
+        plt.savefig("{}.png".format(kwargs["output"]))
@@ -4,6 +4,7 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 
 from postix.core.models import ListConstraint, ListConstraintEntry
+from postix.core.utils.metrics import timed
 
 
 class Command(BaseCommand):
@@ -27,7 +28,7 @@ class Command(BaseCommand):
                 reader = csv.DictReader(member_list, delimiter="\t")
             else:
                 reader = csv.DictReader(member_list, delimiter=";")
-            with transaction.atomic():
+            with timed("import_member"), transaction.atomic():
                 for row in reader:
                     if not any(row.values()):
                         continue  # empty line
@@ -0,0 +1,130 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from postix.core.utils.loadtest import (
+    CONNECTION_ERROR,
+    DEFAULT_MIX,
+    RACE,
+    REJECTED,
+    SERVER_ERROR,
+    create_load_event,
+    parse_mix,
+    run_load,
+    scrape_request_totals,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate cashdesks against a running postix instance that uses the "
+        "same database. Do not run this against a production database."
+    )
+
+    HEADER = (
+        "desks  actions/s  requests/s  p50 ms  p95 ms  p99 ms  "
+        "rejected  races  server errors  connection errors"
+    )
+    ROW = (
+        "{:5d}  {:9.1f}  {:10.1f}  {:6.0f}  {:6.0f}  {:6.0f}  "
+        "{:8d}  {:5d}  {:13d}  {:17d}"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            default="http://127.0.0.1:8000",
+            help="Base URL of the postix instance (default: http://127.0.0.1:8000)",
+        )
+        parser.add_argument(
+            "--desks",
+            default="1,2,4,8",
+            help="Comma-separated numbers of concurrent desks, run one after "
+            "another (default: 1,2,4,8)",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=30.0,
+            help="Seconds to run each number of desks (default: 30)",
+        )
+        parser.add_argument(
+            "--preorders",
+            type=int,
+            default=5000,
+            help="Number of presale tickets to create (default: 5000)",
+        )
+        parser.add_argument(
+            "--mix",
+            default=",".join(
+                "{}={}".format(action, weight) for action, weight in DEFAULT_MIX.items()
+            ),
+            help="Weights of the desk actions (default: %(default)s)",
+        )
+        parser.add_argument("--seed", type=int, help="Seed for the desk actions")
+        parser.add_argument(
+            "--metrics-token",
+            help="POSTIX_METRICS_TOKEN of the instance, to report the time its "
+            "API requests spent in the database",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            steps = [int(desks) for desks in options["desks"].split(",")]
+            mix = parse_mix(options["mix"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if min(steps) < 1 or options["preorders"] < 1:
+            raise CommandError("You need at least one desk and one presale ticket.")
+
+        try:
+            event = create_load_event(max(steps), options["preorders"])
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        url, token = options["url"], options["metrics_token"]
+        self.stdout.write(self.HEADER + ("  DB ms/request  DB share" if token else ""))
+        try:
+            for desks in steps:
+                before = scrape_request_totals(url, token) if token else None
+                result = run_load(
+                    url,
+                    event,
+                    options["duration"],
+                    desks=desks,
+                    mix=mix,
+                    seed=options["seed"],
+                )
+                line = self.ROW.format(
+                    desks,
+                    result.actions / result.duration,
+                    result.requests / result.duration,
+                    result.percentile(0.5) * 1000,
+                    result.percentile(0.95) * 1000,
+                    result.percentile(0.99) * 1000,
+                    result.count(REJECTED),
+                    result.count(RACE),
+                    result.count(SERVER_ERROR),
+                    result.count(CONNECTION_ERROR),
+                )
+                if token:
+                    after = scrape_request_totals(url, token)
+                    count = after["count"] - before["count"]
+                    db_time = after["db_time"] - before["db_time"]
+                    duration = after["duration"] - before["duration"]
+                    line += "  {:13.1f}  {:7.0%}".format(
+                        db_time / count * 1000 if count else 0,
+                        db_time / duration if duration else 0,
+                    )
+                self.stdout.write(line)
+                if options["verbosity"] > 1:
+                    for action in sorted(result.timings):
+                        self.stdout.write(
+                            "       {:10s} {:6d} actions, p50 {:.0f} ms, p95 {:.0f} ms, "
+                            "{}".format(
+                                action,
+                                len(result.timings[action]),
+                                result.percentile(0.5, action) * 1000,
+                                result.percentile(0.95, action) * 1000,
+                                dict(result.outcomes[action]),
+                            )
+                        )
+        finally:
+            event.finish()
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from postix.core.models.rollup import diff_rollup, rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = "Rebuild the sales rollup from all transaction positions, or verify it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["rebuild", "verify"])
+
+    def handle(self, *args, **kwargs):
+        if kwargs["action"] == "rebuild":
+            count = rebuild_rollup()
+            self.stdout.write(
+                self.style.SUCCESS("Rebuilt sales rollup with {} rows.".format(count))
+            )
+            return
+
+        differences = diff_rollup()
+        for (
+            (bucket, cashdesk, product, position_type, is_preorder),
+            (stored, expected),
+        ) in sorted(differences.items()):
+            self.stdout.write(
+                "{} cashdesk={} product={} type={} preorder={}: stored {}, expected {}".format(
+                    bucket.isoformat(),
+                    cashdesk,
+                    product,
+                    position_type,
+                    is_preorder,
+                    stored,
+                    expected,
+                )
+            )
+        if differences:
+            raise CommandError(
+                "{} rollup rows differ, run `rollup_sales rebuild`.".format(
+                    len(differences)
+                )
+            )
+        self.stdout.write(self.style.SUCCESS("Sales rollup is consistent."))
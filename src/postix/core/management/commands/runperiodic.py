@@ -1,13 +1,70 @@
+import time
+
 from django.core.management.base import BaseCommand
 
-from postix.core.models import Ping
+from postix.core.utils.queue_sync import PingSyncer
 
 
 class Command(BaseCommand):
-    help = "Run periodic tasks"
+    help = "Run periodic tasks. Use --loop to keep running."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep running")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=10.0,
+            help="Seconds to wait between runs (default: 10)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Number of parallel requests to c3queue (default: 4)",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=5.0,
+            help="Timeout of a request to c3queue in seconds (default: 5)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of pings loaded from the database at once (default: 100)",
+        )
 
     def handle(self, *args, **options):
-        for ping in Ping.objects.filter(synced=False, ponged__isnull=False).order_by(
-            "ponged"
-        ):
-            ping.sync()
+        syncer = None
+        try:
+            while True:
+                syncer = self.get_syncer(syncer, options)
+                if syncer:
+                    synced, failed = syncer.sync_pending(
+                        batch_size=options["batch_size"]
+                    )
+                    if synced or failed:
+                        self.stdout.write(
+                            "Synced {} pings, {} failed.".format(
+                                len(synced), len(failed)
+                            )
+                        )
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
+        finally:
+            if syncer:
+                syncer.close()
+
+    def get_syncer(self, syncer, options):
+        """ Keeps the syncer (and its backoff state) unless the settings changed. """
+        new = PingSyncer.from_settings(
+            concurrency=options["concurrency"], timeout=options["timeout"]
+        )
+        if syncer and new and (syncer.url, syncer.token) == (new.url, new.token):
+            new.close()
+            return syncer
+        if syncer:
+            syncer.close()
+        return new
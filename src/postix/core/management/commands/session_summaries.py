@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from postix.core.models.summary import diff_summaries, rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the session summaries from all movements and transaction "
+        "positions, or verify them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["rebuild", "verify"])
+
+    def handle(self, *args, **kwargs):
+        if kwargs["action"] == "rebuild":
+            count = rebuild_summaries()
+            self.stdout.write(
+                self.style.SUCCESS(
+                    "Rebuilt the summaries of {} sessions.".format(count)
+                )
+            )
+            return
+
+        differences = diff_summaries()
+        for (session, item, field), (stored, expected) in sorted(
+            differences.items(),
+            key=lambda entry: (entry[0][0], entry[0][1] or 0, entry[0][2]),
+        ):
+            self.stdout.write(
+                "session={} {}{}: stored {}, expected {}".format(
+                    session,
+                    "item={} ".format(item) if item else "",
+                    field,
+                    stored,
+                    expected,
+                )
+            )
+        if differences:
+            raise CommandError(
+                "{} summary values differ, run `session_summaries rebuild`.".format(
+                    len(differences)
+                )
+            )
+        self.stdout.write(self.style.SUCCESS("Session summaries are consistent."))
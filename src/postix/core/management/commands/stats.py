@@ -1,7 +1,7 @@
 from django.core.management.base import BaseCommand
-from django.db.models import Count
+from django.db.models import Case, IntegerField, Sum, When
 
-from postix.core.models import TransactionPosition
+from postix.core.models import SalesRollup
 
 
 class Command(BaseCommand):
@@ -10,13 +10,22 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         total = 0
         agg = (
-            TransactionPosition.objects.order_by("product")
+            SalesRollup.objects.order_by("product")
             .values("product__name", "product__price")
-            .annotate(total=Count("id"), reverses=Count("reverses"))
+            .annotate(
+                total=Sum("count"),
+                reverses=Sum(
+                    Case(
+                        When(type="reverse", then="count"),
+                        default=0,
+                        output_field=IntegerField(),
+                    )
+                ),
+            )
         )
 
         for line in agg:
-            count = line["total"] - line["reverses"]
+            count = line["total"] - 2 * line["reverses"]
             self.stdout.write(
                 "{line[product__name]:30} {line[product__price]:>20} EUR       {count}".format(
                     line=line, count=count
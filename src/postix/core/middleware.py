@@ -0,0 +1,80 @@
+from typing import Optional
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpRequest, HttpResponse
+from django.utils.functional import cached_property
+
+from .models import Cashdesk, CashdeskSession
+from .utils.iputils import detect_cashdesk
+from .utils.metrics import REQUEST, measure
+
+
+class CashdeskContext:
+    """
+    The cashdesk a request comes from and the current session of the
+    requesting user, each looked up at most once per request. The session is
+    loaded together with its cashdesk and user.
+    """
+
+    def __init__(self, request: HttpRequest):
+        self.request = request
+
+    @cached_property
+    def cashdesk(self) -> Optional[Cashdesk]:
+        return detect_cashdesk(self.request)
+
+    @cached_property
+    def session(self) -> Optional[CashdeskSession]:
+        user = self.request.user
+        if not user.is_authenticated:
+            return None
+        return user.get_current_session()
+
+
+def get_cashdesk_context(request) -> CashdeskContext:
+    """
+    Returns the context of ``request``, which can also be a REST framework
+    request. Usually, ``CashdeskContextMiddleware`` has created it already.
+    """
+    request = getattr(request, "_request", request)
+    if not hasattr(request, "cashdesk_context"):
+        request.cashdesk_context = CashdeskContext(request)
+    return request.cashdesk_context
+
+
+class CashdeskContextMiddleware:
+    """ Makes the cashdesk context available as ``request.cashdesk_context``. """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        get_cashdesk_context(request)
+        return self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Records the latency and database queries of every request under the name
+    of the URL pattern it resolved to. Responses with a status of 500 or above
+    count as errors. Streaming responses are left out: we would only measure
+    the time until streaming starts.
+    """
+
+    UNRESOLVED = "<unresolved>"
+
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        with measure(REQUEST, self.UNRESOLVED) as result:
+            response = self.get_response(request)
+            match = getattr(request, "resolver_match", None)
+            if match:
+                result.name = match.view_name
+            result.error = response.status_code >= 500
+            result.discard = response.streaming
+        return response
@@ -0,0 +1,46 @@
+# Generated by Django 2.1.15 on 2026-10-19 06:55
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def initialize_ledger(apps, schema_editor):
+    Record = apps.get_model("core", "Record")
+    RecordLedger = apps.get_model("core", "RecordLedger")
+
+    balance = Decimal("0.00")
+    for record_type, amount in Record.objects.values_list("type", "amount"):
+        if record_type == "inflow":
+            balance += amount
+        elif record_type == "outflow":
+            balance -= amount
+    RecordLedger.objects.update_or_create(pk=1, defaults={"balance": balance})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("core", "0067_recordrenderjob")]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecordLedger",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "balance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+            ],
+            options={"abstract": False},
+        ),
+        migrations.RunPython(initialize_ledger, migrations.RunPython.noop),
+    ]
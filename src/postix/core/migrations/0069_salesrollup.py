@@ -0,0 +1,109 @@
+# Generated by Django 2.1.15 on 2026-10-19 07:09
+
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.timezone import utc
+
+
+def backfill_rollup(apps, schema_editor):
+    TransactionPosition = apps.get_model("core", "TransactionPosition")
+    SalesRollup = apps.get_model("core", "SalesRollup")
+
+    rollup = defaultdict(lambda: [0, Decimal("0.00")])
+    positions = TransactionPosition.objects.values_list(
+        "transaction__datetime",
+        "transaction__session__cashdesk_id",
+        "product_id",
+        "type",
+        "preorder_position_id",
+        "value",
+    ).order_by()
+    for dt, cashdesk_id, product_id, position_type, preorder, value in positions:
+        timestamp = dt.timestamp()
+        bucket = datetime.fromtimestamp(timestamp - timestamp % 300, tz=utc)
+        entry = rollup[
+            (bucket, cashdesk_id, product_id, position_type, preorder is not None)
+        ]
+        entry[0] += 1
+        entry[1] += value
+
+    SalesRollup.objects.bulk_create(
+        [
+            SalesRollup(
+                bucket=key[0],
+                cashdesk_id=key[1],
+                product_id=key[2],
+                type=key[3],
+                is_preorder=key[4],
+                count=count,
+                value=value,
+            )
+            for key, (count, value) in rollup.items()
+        ],
+        batch_size=100,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("core", "0068_recordledger")]
+
+    operations = [
+        migrations.CreateModel(
+            name="SalesRollup",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("bucket", models.DateTimeField(db_index=True)),
+                (
+                    "type",
+                    models.CharField(
+                        choices=[
+                            ("redeem", "Presale redemption"),
+                            ("reverse", "Reversal"),
+                            ("sell", "Sale"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                ("is_preorder", models.BooleanField(default=False)),
+                ("count", models.IntegerField(default=0)),
+                (
+                    "value",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "cashdesk",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="sales_rollups",
+                        to="core.Cashdesk",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="sales_rollups",
+                        to="core.Product",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name="salesrollup",
+            unique_together={("bucket", "cashdesk", "product", "type", "is_preorder")},
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
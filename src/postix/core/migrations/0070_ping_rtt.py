@@ -0,0 +1,35 @@
+# Generated by Django 2.1.15 on 2026-10-19 07:45
+
+from django.db import migrations, models
+
+
+def fill_rtt(apps, schema_editor):
+    Ping = apps.get_model("core", "Ping")
+
+    for ping in Ping.objects.filter(ponged__isnull=False):
+        ping.rtt = (ping.ponged - ping.pinged).total_seconds()
+        ping.save(update_fields=["rtt"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("core", "0069_salesrollup")]
+
+    operations = [
+        migrations.AddField(
+            model_name="ping",
+            name="rtt",
+            field=models.FloatField(
+                blank=True,
+                db_index=True,
+                help_text="Round-trip time in seconds",
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ping",
+            name="pinged",
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.RunPython(fill_rtt, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("core", "0070_ping_rtt")]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["datetime", "id"], name="transaction_datetime_id"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["session", "datetime"], name="transaction_session_datetime"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionposition",
+            index=models.Index(
+                fields=["type", "transaction"], name="position_type_transaction"
+            ),
+        ),
+    ]
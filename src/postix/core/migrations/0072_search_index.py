@@ -0,0 +1,95 @@
+import logging
+
+from django.db import DatabaseError, migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+# The search indexes as of this migration, see postix.core.utils.search
+SEARCH_FIELDS = {
+    "core_preorder": ("order_code",),
+    "core_listconstraintentry": ("name", "identifier"),
+}
+TRIGGERS = ("insert", "delete", "update")
+
+
+def sqlite_statements(table, fields):
+    search_table = table + "_search"
+    columns = ", ".join(fields)
+    insert = "INSERT INTO {t}(rowid, {c}) VALUES (new.id, {new});".format(
+        t=search_table, c=columns, new=", ".join("new." + field for field in fields)
+    )
+    delete = "INSERT INTO {t}({t}, rowid, {c}) VALUES ('delete', old.id, {old});".format(
+        t=search_table, c=columns, old=", ".join("old." + field for field in fields)
+    )
+    return [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {t} USING fts5({c}, content='{table}', "
+        "content_rowid='id', tokenize='trigram')".format(
+            t=search_table, c=columns, table=table
+        ),
+        "CREATE TRIGGER IF NOT EXISTS {t}_insert AFTER INSERT ON {table} "
+        "BEGIN {insert} END".format(t=search_table, table=table, insert=insert),
+        "CREATE TRIGGER IF NOT EXISTS {t}_delete AFTER DELETE ON {table} "
+        "BEGIN {delete} END".format(t=search_table, table=table, delete=delete),
+        "CREATE TRIGGER IF NOT EXISTS {t}_update AFTER UPDATE ON {table} "
+        "BEGIN {delete} {insert} END".format(
+            t=search_table, table=table, delete=delete, insert=insert
+        ),
+        "INSERT INTO {t}({t}) VALUES ('rebuild')".format(t=search_table),
+    ]
+
+
+def postgresql_statements(table, fields):
+    return [
+        "CREATE INDEX IF NOT EXISTS {table}_{field}_trgm ON {table} "
+        "USING gin (UPPER({field}::text) gin_trgm_ops)".format(table=table, field=field)
+        for field in fields
+    ]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        statements = [
+            statement
+            for table, fields in SEARCH_FIELDS.items()
+            for statement in sqlite_statements(table, fields)
+        ]
+    elif vendor == "postgresql":
+        statements = ["CREATE EXTENSION IF NOT EXISTS pg_trgm"] + [
+            statement
+            for table, fields in SEARCH_FIELDS.items()
+            for statement in postgresql_statements(table, fields)
+        ]
+    else:
+        return
+    # Without FTS5 or pg_trgm, the search falls back to icontains
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for statement in statements:
+                schema_editor.execute(statement)
+    except DatabaseError as e:
+        logger.warning("Could not create the search index: %s", e)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table, fields in SEARCH_FIELDS.items():
+        search_table = table + "_search"
+        if vendor == "sqlite":
+            for trigger in TRIGGERS:
+                schema_editor.execute(
+                    "DROP TRIGGER IF EXISTS {}_{}".format(search_table, trigger)
+                )
+            schema_editor.execute("DROP TABLE IF EXISTS {}".format(search_table))
+        elif vendor == "postgresql":
+            for field in fields:
+                schema_editor.execute(
+                    "DROP INDEX IF EXISTS {}_{}_trgm".format(table, field)
+                )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("core", "0071_transaction_indexes")]
+
+    operations = [migrations.RunPython(create_search_index, drop_search_index)]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+def fill_secret_lookup(apps, schema_editor):
+    PreorderPosition = apps.get_model("core", "PreorderPosition")
+    positions = PreorderPosition.objects.values_list("pk", "secret")
+    for pk, secret in positions.iterator():
+        PreorderPosition.objects.filter(pk=pk).update(secret_lookup=secret.lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("core", "0072_search_index")]
+
+    operations = [
+        migrations.AddField(
+            model_name="preorderposition",
+            name="secret_lookup",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=254
+            ),
+        ),
+        migrations.RunPython(fill_secret_lookup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations, models
+
+import postix.core.models.cashdesk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("core", "0073_preorderposition_secret_lookup")]
+
+    operations = [
+        migrations.AlterField(
+            model_name="cashdesksession",
+            name="api_token",
+            field=models.CharField(
+                db_index=True,
+                default=postix.core.models.cashdesk.generate_key,
+                help_text="Used for non-browser sessions. Generated automatically.",
+                max_length=254,
+                verbose_name="API token",
+            ),
+        )
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("core", "0074_cashdesksession_api_token_index")]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="cashdesksession",
+            index=models.Index(
+                fields=["user", "end", "start"], name="session_user_end_start"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionposition",
+            index=models.Index(
+                fields=["preorder_position", "type"], name="position_preorder_type"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionposition",
+            index=models.Index(
+                fields=["listentry", "type"], name="position_listentry_type"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionposition",
+            index=models.Index(
+                fields=["reverses", "type"], name="position_reverses_type"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionposition",
+            index=models.Index(
+                fields=["product", "type"], name="position_product_type"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="troubleshooternotification",
+            index=models.Index(
+                fields=["status", "created", "session"],
+                name="notification_status_created",
+            ),
+        ),
+    ]
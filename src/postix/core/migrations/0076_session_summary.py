@@ -0,0 +1,136 @@
+# Generated by Django 2.1.15 on 2026-10-19 08:43
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    CashMovement = apps.get_model("core", "CashMovement")
+    ItemMovement = apps.get_model("core", "ItemMovement")
+    TransactionPosition = apps.get_model("core", "TransactionPosition")
+    TransactionPositionItem = apps.get_model("core", "TransactionPositionItem")
+    SessionSummary = apps.get_model("core", "SessionSummary")
+    SessionItemSummary = apps.get_model("core", "SessionItemSummary")
+
+    sessions = defaultdict(dict)
+    items = defaultdict(lambda: defaultdict(int))
+    for session, cash in CashMovement.objects.values_list("session", "cash"):
+        field = "cash_in" if cash > 0 else "cash_out"
+        sessions[session][field] = sessions[session].get(field, 0) + cash
+    for session, value in TransactionPosition.objects.values_list(
+        "transaction__session", "value"
+    ):
+        total = sessions[session].get("transaction_total", 0)
+        sessions[session]["transaction_total"] = total + value
+    for session, item, amount, timestamp, end in ItemMovement.objects.values_list(
+        "session", "item", "amount", "timestamp", "session__end"
+    ):
+        field = "post_movements" if end and timestamp >= end else "movements"
+        items[(session, item)][field] += amount
+        items[(session, item)]["has_movements"] = True
+    for session, item, amount in (
+        TransactionPositionItem.objects.exclude(position__type="reverse")
+        .filter(position__reversed_by=None)
+        .values_list("position__transaction__session", "item", "amount")
+    ):
+        items[(session, item)]["transactions"] += amount
+
+    SessionSummary.objects.bulk_create(
+        [
+            SessionSummary(session_id=session, **values)
+            for session, values in sessions.items()
+        ],
+        batch_size=100,
+    )
+    SessionItemSummary.objects.bulk_create(
+        [
+            SessionItemSummary(session_id=session, item_id=item, **values)
+            for (session, item), values in items.items()
+        ],
+        batch_size=100,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [("core", "0075_hot_query_indexes")]
+
+    operations = [
+        migrations.CreateModel(
+            name="SessionSummary",
+            fields=[
+                (
+                    "session",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="summary",
+                        serialize=False,
+                        to="core.CashdeskSession",
+                    ),
+                ),
+                (
+                    "cash_in",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="Cash moved into the session",
+                    ),
+                ),
+                (
+                    "cash_out",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="Cash moved out of the session, negative",
+                    ),
+                ),
+                (
+                    "transaction_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SessionItemSummary",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("has_movements", models.BooleanField(default=False)),
+                ("movements", models.IntegerField(default=0)),
+                ("post_movements", models.IntegerField(default=0)),
+                ("transactions", models.IntegerField(default=0)),
+                (
+                    "item",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="session_summaries",
+                        to="core.Item",
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="item_summaries",
+                        to="core.CashdeskSession",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name="sessionitemsummary", unique_together={("session", "item")}
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -29,8 +29,10 @@ from .constraints import (
 from .info import Info
 from .ping import Ping
 from .preorder import Preorder, PreorderPosition
-from .record import Record, RecordEntity
+from .record import Record, RecordEntity, RecordLedger, RecordRenderJob
+from .rollup import SalesRollup
 from .settings import EventSettings
+from .summary import SessionItemSummary, SessionSummary
 
 __all__ = (
     "AbstractConstraint",
@@ -55,6 +57,11 @@ __all__ = (
     "Quota",
     "Record",
     "RecordEntity",
+    "RecordLedger",
+    "RecordRenderJob",
+    "SalesRollup",
+    "SessionItemSummary",
+    "SessionSummary",
     "Transaction",
     "TransactionPosition",
     "TransactionPositionItem",
@@ -1,6 +1,7 @@
 from datetime import timedelta
 
 from django.contrib.auth.base_user import AbstractBaseUser, BaseUserManager
+from django.core.cache import cache
 from django.db import models
 from django.utils.functional import cached_property
 
@@ -55,6 +56,25 @@ class User(AbstractBaseUser):
             return self.firstname
         return self.username
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._invalidate_api_tokens()
+
+    def delete(self, *args, **kwargs):
+        self._invalidate_api_tokens()
+        return super().delete(*args, **kwargs)
+
+    def _invalidate_api_tokens(self):
+        """ The cached API authentication of our sessions knows if we are active. """
+        from .cashdesk import CashdeskSession, get_token_cache_key
+
+        if not self.pk:
+            return
+        tokens = CashdeskSession.objects.filter(user=self).values_list(
+            "api_token", flat=True
+        )
+        cache.delete_many([get_token_cache_key(token) for token in tokens])
+
     @property
     def is_staff(self) -> bool:
         return self.is_superuser or self.is_backoffice_user or self.is_troubleshooter
@@ -64,17 +84,19 @@ class User(AbstractBaseUser):
 
         return (
             CashdeskSession.objects.filter(user=self, end__isnull=True)
+            .select_related("cashdesk", "user")
             .order_by("-start")
             .first()
         )
 
     @cached_property
     def hours(self):
-        from .cashdesk import CashdeskSession
+        from ..utils.working_hours import get_user_working_time
 
-        total = timedelta()
-        for session in CashdeskSession.objects.filter(user=self, end__isnull=False):
-            total += session.end - session.start
+        if hasattr(self, "working_time"):  # Annotated by with_working_time()
+            total = self.working_time or timedelta()
+        else:
+            total = get_user_working_time(self)
         if not total:
             return total
         string_result = "{} days, ".format(total.days) if total.days else ""
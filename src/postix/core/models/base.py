@@ -21,6 +21,14 @@ class Transaction(models.Model):
     )
     receipt_id = models.PositiveIntegerField(null=True, blank=True, unique=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["datetime", "id"], name="transaction_datetime_id"),
+            models.Index(
+                fields=["session", "datetime"], name="transaction_session_datetime"
+            ),
+        ]
+
     def print_receipt(self, do_open_drawer: bool = True, session=None) -> None:
         (session or self.session).cashdesk.printer.print_receipt(self, do_open_drawer)
 
@@ -117,6 +125,19 @@ class TransactionPosition(models.Model):
     )
     has_constraint_bypass = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["type", "transaction"], name="position_type_transaction"
+            ),
+            models.Index(
+                fields=["preorder_position", "type"], name="position_preorder_type"
+            ),
+            models.Index(fields=["listentry", "type"], name="position_listentry_type"),
+            models.Index(fields=["reverses", "type"], name="position_reverses_type"),
+            models.Index(fields=["product", "type"], name="position_product_type"),
+        ]
+
     def calculate_tax(self) -> None:
         net_value = self.value * 100 / (100 + self.tax_rate)
         self.tax_value = round_decimal(self.value - net_value)
@@ -133,7 +154,13 @@ class TransactionPosition(models.Model):
 
         self.calculate_tax()
 
+        # Reversals are copies of saved positions, so check the pk as well
+        adding = self._state.adding or self.pk is None
         super(TransactionPosition, self).save(*args, **kwargs)
+        if adding:
+            from .rollup import record_position
+
+            record_position(self)
 
         if not self.items.exists():
             for pi in self.product.product_items.all().select_related("item"):
@@ -141,6 +168,11 @@ class TransactionPosition(models.Model):
                     position=self, item=pi.item, amount=pi.amount
                 )
 
+        if adding:
+            from .summary import add_position
+
+            add_position(self)
+
     def was_reversed(self) -> bool:
         if self.type == "reverse":
             return False
@@ -1,10 +1,11 @@
+import hashlib
 import string
-from collections import defaultdict
 from datetime import timedelta
 from decimal import Decimal
-from typing import Dict, List, Union
+from typing import Dict, Iterable, List, Union
 
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.db.models import Sum
 from django.utils.crypto import get_random_string
 from django.utils.timezone import now
@@ -13,7 +14,7 @@ from django.utils.translation import ugettext as _
 from ..mixins import Exportable
 from ..utils import devices
 from ..utils.printing import CashdeskPrinter, DummyPrinter
-from .base import Item, Product, TransactionPosition, TransactionPositionItem
+from .base import Item, Product, TransactionPosition
 
 
 def generate_key() -> str:
@@ -22,6 +23,46 @@ def generate_key() -> str:
     )
 
 
+def get_token_cache_key(token: str) -> str:
+    return "api:token:{}".format(hashlib.sha256(token.encode()).hexdigest())
+
+
+def get_cashdesk_ip_cache_key(ip_address: str) -> str:
+    return "api:cashdesk-ip:{}".format(ip_address)
+
+
+def get_item_ledger(sessions: Iterable) -> Dict[int, List[Dict]]:
+    """
+    Returns the current item balances for all given sessions, keyed by session
+    ID, read from the session item summaries in a single query.
+    """
+    from .summary import SessionItemSummary
+
+    session_ids = [getattr(s, "pk", s) for s in sessions]
+    result = {pk: [] for pk in session_ids}
+    if not session_ids:
+        return result
+
+    summaries = (
+        SessionItemSummary.objects.filter(session__in=session_ids, has_movements=True)
+        .select_related("item")
+        .order_by("session", "item")
+    )
+    for summary in summaries:
+        result[summary.session_id].append(
+            {
+                "item": summary.item,
+                "movements": summary.movements,
+                "transactions": summary.transactions,
+                "final_movements": -summary.post_movements,
+                "total": summary.movements
+                + summary.post_movements
+                - summary.transactions,
+            }
+        )
+    return result
+
+
 class Cashdesk(Exportable, models.Model):
     name = models.CharField(max_length=254)
     record_name = models.CharField(
@@ -57,6 +98,29 @@ class Cashdesk(Exportable, models.Model):
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        previous = None
+        if self.pk:
+            previous = (
+                Cashdesk.objects.filter(pk=self.pk)
+                .values_list("ip_address", flat=True)
+                .first()
+            )
+        super().save(*args, **kwargs)
+        cache.delete_many(
+            [
+                get_cashdesk_ip_cache_key(ip_address)
+                for ip_address in {previous, self.ip_address}
+                if ip_address
+            ]
+        )
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        if self.ip_address:
+            cache.delete(get_cashdesk_ip_cache_key(self.ip_address))
+        return result
+
     @property
     def printer(self) -> Union[CashdeskPrinter, DummyPrinter]:
         if self.printer_queue_name:
@@ -170,6 +234,7 @@ class CashdeskSession(models.Model):
     )
     api_token = models.CharField(
         max_length=254,
+        db_index=True,
         default=generate_key,
         verbose_name="API token",
         help_text="Used for non-browser sessions. Generated automatically.",
@@ -179,60 +244,33 @@ class CashdeskSession(models.Model):
     objects = models.Manager()
     active = ActiveCashdeskSessionManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "end", "start"], name="session_user_end_start")
+        ]
+
     def __str__(self) -> str:
         return "#{2} ({0} on {1})".format(self.user, self.cashdesk, self.pk)
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(get_token_cache_key(self.api_token))
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        cache.delete(get_token_cache_key(self.api_token))
+        return result
+
     def is_active(self) -> bool:
         return (not self.start or self.start < now()) and not self.end
 
     def get_item_set(self) -> List[Item]:
-        return [
-            Item.objects.get(pk=pk)
-            for pk in self.item_movements.order_by()
-            .values_list("item", flat=True)
-            .distinct()
-        ]
-
-    def get_current_items(self) -> List[Dict]:
-        transactions = (
-            TransactionPositionItem.objects.values("item")
-            .filter(position__transaction__session=self)
-            .exclude(position__type="reverse")
-            .filter(position__reversed_by=None)
-            .annotate(total=models.Sum("amount"))
-        )
-        item_movements = self.item_movements.values("item").annotate(
-            total=models.Sum("amount")
+        return list(
+            Item.objects.filter(item_movements__session=self).distinct().order_by("pk")
         )
 
-        transaction_dict = defaultdict(int)
-        movement_dict = defaultdict(int)
-        post_movement_dict = defaultdict(int)
-        if self.end:
-            post_movements = item_movements.filter(timestamp__gte=self.end)
-            item_movements = item_movements.filter(timestamp__lt=self.end)
-            for d in post_movements:
-                post_movement_dict[d["item"]] += d["total"]
-
-        for d in item_movements:
-            movement_dict[d["item"]] += d["total"]
-        for d in transactions:
-            transaction_dict[d["item"]] += d["total"]
-
-        return [
-            {
-                "item": item,
-                "movements": movement_dict.get(item.pk, 0),
-                "transactions": transaction_dict.get(item.pk, 0),
-                "final_movements": -post_movement_dict.get(item.pk, 0)
-                if self.end
-                else 0,
-                "total": movement_dict.get(item.pk, 0)
-                + post_movement_dict.get(item.pk, 0)
-                - transaction_dict.get(item.pk, 0),
-            }
-            for item in sorted(self.get_item_set(), key=lambda x: x.pk)
-        ]
+    def get_current_items(self) -> List[Dict]:
+        return get_item_ledger([self])[self.pk]
 
     @property
     def records(self):
@@ -240,18 +278,31 @@ class CashdeskSession(models.Model):
 
         return Record.objects.filter(cash_movement__cashdesk_session=self)
 
+    def get_summary(self):
+        """ The running cash totals, see ``SessionSummary``. """
+        from .summary import SessionSummary
+
+        try:
+            return SessionSummary.objects.get(session=self.pk)
+        except SessionSummary.DoesNotExist:
+            return SessionSummary(session=self)
+
     @property
     def cash_remaining(self) -> Decimal:
-        return self.cash_before + self.get_cash_transaction_total()
+        summary = self.get_summary()
+        return self._cash_before(summary) + summary.transaction_total
 
     @property
     def final_cash_movement(self):
-        movement = self.cash_movements.all().order_by("-timestamp").first()
-        if (
-            not self.end
-            or not hasattr(movement, "record")
-            or not movement.record.closes_session
-        ):
+        if not self.end:
+            return None
+        movement = (
+            self.cash_movements.all()
+            .select_related("record")
+            .order_by("-timestamp")
+            .first()
+        )
+        if not hasattr(movement, "record") or not movement.record.closes_session:
             return None
         return movement
 
@@ -270,20 +321,19 @@ class CashdeskSession(models.Model):
         movement.create_record(closes_session=True, carrier=carrier)
         return movement
 
+    def _cash_before(self, summary) -> Decimal:
+        cash = summary.cash_in + summary.cash_out
+        final_movement = self.final_cash_movement
+        if final_movement:
+            cash -= final_movement.cash
+        return cash
+
     @property
     def cash_before(self) -> Decimal:
-        qs = self.cash_movements.all()
-        if self.end and self.final_cash_movement:
-            qs = qs.exclude(pk=self.final_cash_movement.pk)
-        return qs.aggregate(total=Sum("cash"))["total"] or Decimal("0.00")
+        return self._cash_before(self.get_summary())
 
     def get_cash_transaction_total(self) -> Decimal:
-        return (
-            TransactionPosition.objects.filter(transaction__session=self).aggregate(
-                total=models.Sum("value")
-            )["total"]
-            or 0
-        )
+        return self.get_summary().transaction_total
 
     def get_product_sales(self) -> List[Dict]:
         qs = TransactionPosition.objects.filter(transaction__session=self)
@@ -314,9 +364,12 @@ class CashdeskSession(models.Model):
         return result
 
     def request_resupply(self) -> None:
-        TroubleshooterNotification.objects.create(
+        from postix.troubleshooter.events import EVENT_NEW, publish
+
+        notification = TroubleshooterNotification.objects.create(
             session=self, modified_by=self.user, message="Requesting resupply"
         )
+        publish(EVENT_NEW, [notification])
 
     def has_open_requests(self) -> bool:
         return TroubleshooterNotification.objects.active(session=self).exists()
@@ -358,6 +411,28 @@ class ItemMovement(models.Model):
     class Meta:
         ordering = ("timestamp",)
 
+    @transaction.atomic(savepoint=False)
+    def save(self, *args, **kwargs):
+        from .summary import add_item_movement
+
+        previous = 0
+        if self.pk:
+            previous = (
+                ItemMovement.objects.filter(pk=self.pk)
+                .values_list("amount", flat=True)
+                .first()
+                or 0
+            )
+        super().save(*args, **kwargs)
+        add_item_movement(self, previous, self.amount)
+
+    @transaction.atomic(savepoint=False)
+    def delete(self, *args, **kwargs):
+        from .summary import add_item_movement
+
+        add_item_movement(self, self.amount, 0)
+        return super().delete(*args, **kwargs)
+
     def __str__(self) -> str:
         return "ItemMovement ({} {} at {})".format(
             self.amount, self.item, self.session.cashdesk.name
@@ -387,8 +462,30 @@ class CashMovement(models.Model):
     )
     timestamp = models.DateTimeField(default=now, editable=False)
 
+    @transaction.atomic(savepoint=False)
+    def save(self, *args, **kwargs):
+        from .summary import add_cash_movement
+
+        previous = Decimal("0.00")
+        if self.pk:
+            previous = (
+                CashMovement.objects.filter(pk=self.pk)
+                .values_list("cash", flat=True)
+                .first()
+                or previous
+            )
+        super().save(*args, **kwargs)
+        add_cash_movement(self.session_id, previous, self.cash)
+
+    @transaction.atomic(savepoint=False)
+    def delete(self, *args, **kwargs):
+        from .summary import add_cash_movement
+
+        add_cash_movement(self.session_id, self.cash, Decimal("0.00"))
+        return super().delete(*args, **kwargs)
+
     def create_record(self, closes_session=False, carrier=None):
-        from postix.backoffice.report import generate_record
+        from postix.backoffice.rendering import queue_record
         from postix.core.models import Record
 
         record = getattr(self, "record", None)
@@ -401,7 +498,7 @@ class CashMovement(models.Model):
         record.closes_session = closes_session
         record.carrier = carrier
         record.save()
-        generate_record(record)
+        queue_record(record)
         return record
 
 
@@ -437,6 +534,14 @@ class TroubleshooterNotification(models.Model):
 
     objects = NotificationsManager()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "created", "session"],
+                name="notification_status_created",
+            )
+        ]
+
     def save(self, *args, **kwargs):
         self.modified = now()
         return super().save(*args, **kwargs)
@@ -1,8 +1,10 @@
+import math
+from datetime import datetime
 from tempfile import TemporaryFile
+from typing import Dict
 
-import qrcode
-import requests
 from django.db import models
+from django.db.models import Avg, Count, F, Max, Min, Sum
 from django.utils.crypto import get_random_string
 from django.utils.timezone import now
 
@@ -16,18 +18,65 @@ def generate_ping(cashdesk: Cashdesk) -> None:
     cashdesk.printer.print_image(ping.get_qr_code())
 
 
+PERCENTILES = (50, 90, 99)
+
+
+def get_ping_stats(since: datetime = None) -> Dict:
+    """
+    Round-trip statistics of all pings sent after ``since``, in seconds,
+    computed in the database: one aggregate query and one indexed lookup per
+    percentile (nearest-rank method).
+    """
+    pings = Ping.objects.all()
+    if since:
+        pings = pings.filter(pinged__gte=since)
+    stats = pings.aggregate(
+        count=Count("id"),
+        received=Count("rtt"),
+        first=Min("pinged"),
+        last=Max("pinged"),
+        min=Min("rtt"),
+        max=Max("rtt"),
+        mean=Avg("rtt"),
+        squares=Sum(F("rtt") * F("rtt")),
+    )
+    squares = stats.pop("squares")
+    stats["loss"] = (
+        (stats["count"] - stats["received"]) * 100 / stats["count"]
+        if stats["count"]
+        else 0
+    )
+    stats["stddev"] = None
+    stats["percentiles"] = {}
+    if stats["received"]:
+        variance = squares / stats["received"] - stats["mean"] ** 2
+        stats["stddev"] = math.sqrt(max(variance, 0))
+        durations = pings.filter(rtt__isnull=False).order_by("rtt")
+        for percentile in PERCENTILES:
+            rank = max(math.ceil(percentile / 100 * stats["received"]), 1)
+            stats["percentiles"][percentile] = durations.values_list("rtt", flat=True)[
+                rank - 1
+            ]
+    return stats
+
+
 def generate_ping_secret():
     prefix = "/ping "
     return prefix + get_random_string(length=MAX_LENGTH - len(prefix))
 
 
 class Ping(models.Model):
-    pinged = models.DateTimeField(auto_now_add=True)
+    pinged = models.DateTimeField(auto_now_add=True, db_index=True)
     ponged = models.DateTimeField(null=True, blank=True)
+    rtt = models.FloatField(
+        null=True, blank=True, db_index=True, help_text="Round-trip time in seconds"
+    )
     secret = models.CharField(max_length=MAX_LENGTH, default=generate_ping_secret)
     synced = models.BooleanField(default=False)
 
     def get_qr_code(self):
+        import qrcode
+
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -44,33 +93,21 @@ class Ping(models.Model):
     def pong(self):
         if not self.ponged:
             self.ponged = now()
+            self.rtt = (self.ponged - self.pinged).total_seconds()
             self.save()
 
     def sync(self, force=False):
         if self.synced and not force:
             return
 
-        from .settings import EventSettings
+        from ..utils.queue_sync import PingSyncer
 
-        settings = EventSettings.get_solo()
-        if not settings.queue_sync_url or not settings.queue_sync_token:
+        syncer = PingSyncer.from_settings()
+        if not syncer:
             return
-
-        url = settings.queue_sync_url
-        if not url.endswith("/"):
-            url += "/"
-        url += "pong"
-        fmt = "%Y-%m-%d %H:%M:%S"
-        response = requests.post(
-            url,
-            headers={"Authorization": settings.queue_sync_token},
-            data={"ping": self.pinged.strftime(fmt), "pong": self.ponged.strftime(fmt)},
-        )
-        if response.status_code != 201:
-            raise Exception(
-                "Received non-201 status response from {}: {}".format(
-                    url, response.status_code
-                )
-            )
+        try:
+            syncer.post(self)
+        finally:
+            syncer.close()
         self.synced = True
         self.save()
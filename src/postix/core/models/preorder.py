@@ -1,4 +1,9 @@
-from django.db import models
+import sys
+from typing import Optional
+
+from django.db import connections, models
+from django.db.models import Count, OuterRef, Prefetch, QuerySet, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.translation import ugettext as _
 
@@ -13,11 +18,97 @@ class Preorder(models.Model):
         return self.order_code
 
 
+def normalize_secret(secret: str) -> str:
+    return secret.lower()
+
+
+def get_prefix_upper_bound(prefix: str) -> Optional[str]:
+    """
+    The smallest string that sorts after all strings starting with ``prefix``,
+    by code point, or None if there is none.
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    following = ord(prefix[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:  # Surrogates can't be encoded
+        following = 0xE000
+    return prefix[:-1] + chr(following)
+
+
+def filter_secret_prefix(queryset: QuerySet, prefix: str) -> QuerySet:
+    """
+    Positions whose secret starts with ``prefix``, ignoring case.
+
+    PostgreSQL uses the ``varchar_pattern_ops`` index it creates for the
+    ``secret_lookup`` column for ``LIKE`` queries. Other backends, like
+    SQLite, only use an index for a range condition, which we add.
+    """
+    prefix = normalize_secret(prefix)
+    queryset = queryset.filter(secret_lookup__startswith=prefix)
+    if connections[queryset.db].vendor == "postgresql":
+        return queryset
+    queryset = queryset.filter(secret_lookup__gte=prefix)
+    upper_bound = get_prefix_upper_bound(prefix)
+    if upper_bound is not None:
+        queryset = queryset.filter(secret_lookup__lt=upper_bound)
+    return queryset
+
+
+class PreorderPositionQuerySet(models.QuerySet):
+    def with_redemption_info(self) -> QuerySet:
+        """
+        Loads everything the ``is_redeemed``, ``is_paid``, ``product_name``,
+        ``pack_list`` and ``redemption_message`` properties need along with the
+        positions, so that they don't run queries per position.
+        """
+        from .base import ProductItem, TransactionPosition
+
+        transaction_positions = TransactionPosition.objects.filter(
+            preorder_position=OuterRef("pk")
+        ).order_by()
+
+        def count(position_type):
+            return Coalesce(
+                Subquery(
+                    transaction_positions.filter(type=position_type)
+                    .values("preorder_position")
+                    .annotate(count=Count("pk"))
+                    .values("count"),
+                    output_field=models.IntegerField(),
+                ),
+                0,
+            )
+
+        return (
+            self.select_related("preorder", "product")
+            .prefetch_related(
+                Prefetch(
+                    "product__product_items",
+                    queryset=ProductItem.objects.select_related("item").order_by("pk"),
+                )
+            )
+            .annotate(
+                redeem_count=count("redeem"),
+                reverse_count=count("reverse"),
+                last_redemption=Subquery(
+                    transaction_positions.filter(type="redeem")
+                    .order_by("-pk")
+                    .values("transaction__datetime")[:1]
+                ),
+            )
+        )
+
+
 class PreorderPosition(models.Model):
     preorder = models.ForeignKey(
         Preorder, related_name="positions", on_delete=models.PROTECT
     )
     secret = models.CharField(max_length=254, db_index=True, unique=True)
+    # The case-folded secret, for case-insensitive lookups that can use an index
+    secret_lookup = models.CharField(
+        max_length=254, db_index=True, editable=False, default=""
+    )
     price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
     product = models.ForeignKey(
         "Product", related_name="preorder_positions", on_delete=models.PROTECT
@@ -27,11 +118,20 @@ class PreorderPosition(models.Model):
     last_transaction = models.IntegerField(null=True, blank=True)
     information = models.CharField(max_length=1000, null=True, blank=True)
 
+    objects = PreorderPositionQuerySet.as_manager()
+
     def __str__(self) -> str:
         return "{}-{}".format(self.preorder.order_code, self.secret[:10])
 
+    def save(self, *args, **kwargs) -> None:
+        self.secret_lookup = normalize_secret(self.secret)
+        super().save(*args, **kwargs)
+
     @property
     def is_redeemed(self) -> bool:
+        if hasattr(self, "redeem_count"):
+            return self.redeem_count > self.reverse_count
+
         from ..utils.checks import is_redeemed
 
         return is_redeemed(self)
@@ -57,16 +157,21 @@ class PreorderPosition(models.Model):
         from . import TransactionPosition
 
         if self.is_redeemed:
-            last_r = TransactionPosition.objects.filter(
-                preorder_position=self, type="redeem"
-            ).last()
+            if hasattr(self, "last_redemption"):
+                redeemed = self.last_redemption
+            else:
+                redeemed = (
+                    TransactionPosition.objects.filter(
+                        preorder_position=self, type="redeem"
+                    )
+                    .last()
+                    .transaction.datetime
+                )
             tz = timezone.get_current_timezone()
 
             return _(
                 "This ticket ({secret}…) has already been redeemed at {datetime}."
             ).format(
-                datetime=last_r.transaction.datetime.astimezone(tz).strftime(
-                    "%Y-%m-%d %H:%M:%S"
-                ),
+                datetime=redeemed.astimezone(tz).strftime("%Y-%m-%d %H:%M:%S"),
                 secret=self.secret[:6],
             )
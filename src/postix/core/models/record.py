@@ -1,26 +1,59 @@
 import glob
 import hashlib
 import os
+from decimal import Decimal
+from typing import Dict
 
 from django.conf import settings
 from django.core.files.storage import default_storage
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Sum, When
 from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
+from solo.models import SingletonModel
 
 from .settings import EventSettings
 
 
+def signed_amount():
+    """ Database expression for a record's amount, negative for outflows. """
+    return Case(
+        When(type="inflow", then=F("amount")),
+        When(type="outflow", then=-F("amount")),
+        default=0,
+        output_field=models.DecimalField(decimal_places=2, max_digits=10),
+    )
+
+
 def record_balance():
-    balance = 0
-    for record in Record.objects.all():
-        if record.type == "inflow":
-            balance += record.amount
-        elif record.type == "outflow":
-            balance -= record.amount
-    return balance
+    return RecordLedger.get_solo().balance
+
+
+def get_record_file_index(short_name: str = None) -> Dict[int, str]:
+    """
+    Maps record IDs to the absolute path of their most recent PDF. Lists the
+    records directory once instead of globbing it for every record, as
+    ``Record.record_path`` does.
+    """
+    if short_name is None:
+        short_name = EventSettings.get_solo().short_name
+    base = default_storage.path("records")
+    prefix = "{}_record_".format(short_name)
+    try:
+        names = sorted(os.listdir(base))
+    except FileNotFoundError:
+        return {}
+
+    index = {}
+    for name in names:
+        if not name.startswith(prefix) or not name.endswith(".pdf"):
+            continue
+        pk, _, timestamp = name[len(prefix) : -len(".pdf")].partition("-")
+        if pk.isdigit() and timestamp:
+            index[int(pk)] = os.path.join(base, name)
+    return index
 
 
 class RecordEntity(models.Model):
@@ -199,10 +232,35 @@ class Record(models.Model):
             return str(self.cash_movement.session.user.get_full_name())
         return self.carrier or ""
 
+    @property
+    def signed_amount(self) -> Decimal:
+        if self.type == "inflow":
+            return Decimal(self.amount)
+        elif self.type == "outflow":
+            return -Decimal(self.amount)
+        return Decimal("0.00")
+
+    def _stored_amount(self) -> Decimal:
+        """ The signed amount in the database, locked until the transaction ends. """
+        if not self.pk:
+            return Decimal("0.00")
+        stored = Record.objects.select_for_update().filter(pk=self.pk).first()
+        return stored.signed_amount if stored else Decimal("0.00")
+
+    @transaction.atomic(savepoint=False)
     def save(self, *args, **kwargs):
         if not self.datetime:
             self.datetime = now()
+        previous = self._stored_amount()
         super().save(*args, **kwargs)
+        RecordLedger.add(self.signed_amount - previous)
+
+    @transaction.atomic(savepoint=False)
+    def delete(self, *args, **kwargs):
+        amount = self._stored_amount()
+        result = super().delete(*args, **kwargs)
+        RecordLedger.add(-amount)
+        return result
 
     @property
     def record_path(self):
@@ -225,3 +283,74 @@ class Record(models.Model):
                 now().strftime("%Y%m%d-%H%M"),
             ),
         )
+
+
+class RecordLedger(SingletonModel):
+    """
+    Holds the running cash balance of all records, so that it does not need to
+    be summed up over the whole record table. ``Record.save`` and
+    ``Record.delete`` keep it up to date; bulk updates bypass it, so call
+    ``recalculate`` after those.
+    """
+
+    balance = models.DecimalField(decimal_places=2, max_digits=12, default=0)
+
+    def __str__(self):
+        return "Record ledger ({})".format(self.balance)
+
+    @classmethod
+    def add(cls, amount: Decimal) -> None:
+        if not amount:
+            return
+        ledger = cls.get_solo()
+        cls.objects.filter(pk=ledger.pk).update(balance=F("balance") + amount)
+
+    @classmethod
+    def recalculate(cls) -> Decimal:
+        balance = Record.objects.aggregate(balance=Sum(signed_amount()))["balance"]
+        ledger = cls.get_solo()
+        ledger.balance = balance or Decimal("0.00")
+        ledger.save()
+        return ledger.balance
+
+
+class RecordRenderJob(models.Model):
+    """
+    A request to render the PDF of a record, processed by the ``render_records``
+    worker. Finished jobs double as a render cache keyed by the record checksum.
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, _("Queued")),
+        (STATUS_RUNNING, _("Rendering")),
+        (STATUS_DONE, _("Done")),
+        (STATUS_FAILED, _("Failed")),
+    ]
+
+    record = models.ForeignKey(
+        Record, on_delete=models.CASCADE, related_name="render_jobs"
+    )
+    checksum = models.CharField(max_length=40, db_index=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED
+    )
+    path = models.CharField(max_length=500, null=True, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(default=now, editable=False)
+    modified = models.DateTimeField(default=now)
+
+    class Meta:
+        ordering = ("created",)
+
+    def __str__(self):
+        return "RecordRenderJob #{} ({}, {})".format(
+            self.pk, self.record_id, self.status
+        )
+
+    def save(self, *args, **kwargs):
+        self.modified = now()
+        return super().save(*args, **kwargs)
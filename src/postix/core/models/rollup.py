@@ -0,0 +1,193 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Sum
+from django.utils.timezone import utc
+
+from .base import TransactionPosition
+
+BUCKET_SIZE = timedelta(minutes=5)
+
+RollupKey = Tuple[datetime, int, int, str, bool]
+
+
+def get_bucket(dt: datetime) -> datetime:
+    """ The start of the rollup bucket containing ``dt``, in UTC. """
+    timestamp = dt.timestamp()
+    size = BUCKET_SIZE.total_seconds()
+    return datetime.fromtimestamp(timestamp - timestamp % size, tz=utc)
+
+
+class SalesRollup(models.Model):
+    """
+    Number and value of transaction positions per time bucket, cashdesk,
+    product, position type, and whether the position belongs to a preorder.
+    Rows are updated whenever a position is created, so that statistics do not
+    have to scan all transaction positions. ``rollup_sales verify`` compares
+    them with the positions.
+    """
+
+    bucket = models.DateTimeField(db_index=True)
+    cashdesk = models.ForeignKey(
+        "Cashdesk", related_name="sales_rollups", on_delete=models.PROTECT
+    )
+    product = models.ForeignKey(
+        "Product", related_name="sales_rollups", on_delete=models.PROTECT
+    )
+    type = models.CharField(choices=TransactionPosition.TYPES, max_length=100)
+    is_preorder = models.BooleanField(default=False)
+    count = models.IntegerField(default=0)
+    value = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = (("bucket", "cashdesk", "product", "type", "is_preorder"),)
+
+    def __str__(self):
+        return "{} {} {}: {}".format(
+            self.bucket, self.product_id, self.type, self.count
+        )
+
+    @classmethod
+    def add(cls, key: RollupKey, count: int, value: Decimal) -> None:
+        bucket, cashdesk_id, product_id, position_type, is_preorder = key
+        rows = cls.objects.filter(
+            bucket=bucket,
+            cashdesk_id=cashdesk_id,
+            product_id=product_id,
+            type=position_type,
+            is_preorder=is_preorder,
+        )
+        if rows.update(count=F("count") + count, value=F("value") + value):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    bucket=bucket,
+                    cashdesk_id=cashdesk_id,
+                    product_id=product_id,
+                    type=position_type,
+                    is_preorder=is_preorder,
+                    count=count,
+                    value=value,
+                )
+        except IntegrityError:  # Somebody else created the row in the meantime
+            rows.update(count=F("count") + count, value=F("value") + value)
+
+
+def get_rollup_key(position: TransactionPosition) -> RollupKey:
+    return (
+        get_bucket(position.transaction.datetime),
+        position.transaction.session.cashdesk_id,
+        position.product_id,
+        position.type,
+        position.preorder_position_id is not None,
+    )
+
+
+def record_position(position: TransactionPosition) -> None:
+    SalesRollup.add(get_rollup_key(position), 1, position.value)
+
+
+def compute_rollup() -> Dict[RollupKey, List]:
+    """ Computes the rollup from scratch, streaming over all positions. """
+    result = defaultdict(lambda: [0, Decimal("0.00")])
+    positions = TransactionPosition.objects.values_list(
+        "transaction__datetime",
+        "transaction__session__cashdesk_id",
+        "product_id",
+        "type",
+        "preorder_position_id",
+        "value",
+    ).order_by()
+    for (
+        dt,
+        cashdesk_id,
+        product_id,
+        position_type,
+        preorder,
+        value,
+    ) in positions.iterator():
+        entry = result[
+            (
+                get_bucket(dt),
+                cashdesk_id,
+                product_id,
+                position_type,
+                preorder is not None,
+            )
+        ]
+        entry[0] += 1
+        entry[1] += value
+    return result
+
+
+def rebuild_rollup() -> int:
+    rollup = compute_rollup()
+    with transaction.atomic():
+        SalesRollup.objects.all().delete()
+        SalesRollup.objects.bulk_create(
+            [
+                SalesRollup(
+                    bucket=key[0],
+                    cashdesk_id=key[1],
+                    product_id=key[2],
+                    type=key[3],
+                    is_preorder=key[4],
+                    count=count,
+                    value=value,
+                )
+                for key, (count, value) in rollup.items()
+            ],
+            batch_size=100,
+        )
+    return len(rollup)
+
+
+def diff_rollup() -> Dict[RollupKey, Tuple]:
+    """
+    Compares the stored rollup with the positions. Returns the differing keys,
+    mapped to the stored and the expected (count, value) pairs.
+    """
+    expected = {key: tuple(value) for key, value in compute_rollup().items()}
+    stored = {
+        tuple(row[:5]): tuple(row[5:])
+        for row in SalesRollup.objects.values_list(
+            "bucket",
+            "cashdesk_id",
+            "product_id",
+            "type",
+            "is_preorder",
+            "count",
+            "value",
+        )
+    }
+    empty = (0, Decimal("0.00"))
+    return {
+        key: (stored.get(key, empty), expected.get(key, empty))
+        for key in set(stored) | set(expected)
+        if stored.get(key, empty) != expected.get(key, empty)
+    }
+
+
+def get_product_totals() -> Dict[int, Dict[str, int]]:
+    """
+    Net number of sold and redeemed positions per product, equivalent to
+    ``Product.amount_sold`` and ``Product.amount_redeemed``.
+    """
+    totals = defaultdict(lambda: {"sold": 0, "redeemed": 0})
+    rows = (
+        SalesRollup.objects.order_by()
+        .values_list("product_id", "type", "is_preorder")
+        .annotate(total=Sum("count"))
+    )
+    for product_id, position_type, is_preorder, count in rows:
+        if position_type == "sell":
+            totals[product_id]["sold"] += count
+        elif position_type == "redeem":
+            totals[product_id]["redeemed"] += count
+        elif position_type == "reverse":
+            totals[product_id]["redeemed" if is_preorder else "sold"] -= count
+    return totals
@@ -0,0 +1,285 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable, Tuple
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Q, Sum, Value, When
+
+from .base import Transaction, TransactionPosition, TransactionPositionItem
+from .cashdesk import CashdeskSession, CashMovement, ItemMovement
+
+CASH_FIELDS = ("cash_in", "cash_out", "transaction_total")
+ITEM_FIELDS = ("has_movements", "movements", "post_movements", "transactions")
+
+SummaryKey = Tuple[int, int, str]  # session, item (or None), field
+
+
+class SessionSummary(models.Model):
+    """
+    Running cash totals of a session, updated whenever a cash movement or a
+    transaction position is saved, so that the cash balance of a session is a
+    primary key lookup. ``session_summaries verify`` compares them with the
+    movements and positions.
+    """
+
+    session = models.OneToOneField(
+        "CashdeskSession",
+        primary_key=True,
+        related_name="summary",
+        on_delete=models.CASCADE,
+    )
+    cash_in = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="Cash moved into the session",
+    )
+    cash_out = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="Cash moved out of the session, negative",
+    )
+    transaction_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    def __str__(self):
+        return "Summary of session {}".format(self.session_id)
+
+
+class SessionItemSummary(models.Model):
+    """
+    Running item balance of a session, in the terms of ``get_item_ledger``:
+    item movements before and after the end of the session, and items handed
+    out in positions that were not reversed.
+    """
+
+    session = models.ForeignKey(
+        "CashdeskSession", related_name="item_summaries", on_delete=models.CASCADE
+    )
+    item = models.ForeignKey(
+        "Item", related_name="session_summaries", on_delete=models.PROTECT
+    )
+    has_movements = models.BooleanField(default=False)
+    movements = models.IntegerField(default=0)
+    post_movements = models.IntegerField(default=0)
+    transactions = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = (("session", "item"),)
+
+    def __str__(self):
+        return "Summary of {} in session {}".format(self.item_id, self.session_id)
+
+
+def _add(model, keys: Dict, changes: Dict, defaults: Dict = None) -> None:
+    """ Adds ``changes`` to the row identified by ``keys``, creating it. """
+    changes = {field: value for field, value in changes.items() if value}
+    if not changes and not defaults:
+        return
+    rows = model.objects.filter(**keys)
+    updates = dict(
+        {field: F(field) + value for field, value in changes.items()}, **defaults or {}
+    )
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **changes, **defaults or {})
+    except IntegrityError:  # Somebody else created the row in the meantime
+        rows.update(**updates)
+
+
+def _split_cash(cash: Decimal) -> Tuple[Decimal, Decimal]:
+    return max(cash, Decimal("0.00")), min(cash, Decimal("0.00"))
+
+
+def add_cash_movement(session_id: int, previous: Decimal, cash: Decimal) -> None:
+    """ Records a cash movement that changed from ``previous`` to ``cash``. """
+    previous_in, previous_out = _split_cash(previous)
+    cash_in, cash_out = _split_cash(cash)
+    _add(
+        SessionSummary,
+        {"session_id": session_id},
+        {"cash_in": cash_in - previous_in, "cash_out": cash_out - previous_out},
+    )
+
+
+def add_item_movement(movement: ItemMovement, previous: int, amount: int) -> None:
+    """ Records an item movement that changed from ``previous`` to ``amount``. """
+    end = (
+        CashdeskSession.objects.filter(pk=movement.session_id)
+        .values_list("end", flat=True)
+        .first()
+    )
+    field = (
+        "post_movements"
+        if end is not None and movement.timestamp >= end
+        else "movements"
+    )
+    _add(
+        SessionItemSummary,
+        {"session_id": movement.session_id, "item_id": movement.item_id},
+        {field: amount - previous},
+        defaults={"has_movements": True},
+    )
+
+
+def add_position(position: TransactionPosition) -> None:
+    """
+    Records a new position with its items. Reversals take the items of the
+    reversed position back from the session that handed them out, which can
+    be a different one than the session reversing it; the money goes to the
+    reversing session.
+    """
+    _add(
+        SessionSummary,
+        {"session_id": position.transaction.session_id},
+        {"transaction_total": position.value},
+    )
+    if position.type == "reverse":
+        original = position.reverses
+        # Not original.transaction: reversals are shallow copies sharing the
+        # related object cache with the position they reverse
+        session_id = (
+            Transaction.objects.filter(pk=original.transaction_id)
+            .values_list("session_id", flat=True)
+            .get()
+        )
+        items, sign = original.transaction_position_items.all(), -1
+    else:
+        session_id = position.transaction.session_id
+        items, sign = position.transaction_position_items.all(), 1
+    for item_id, amount in items.values_list("item_id", "amount"):
+        _add(
+            SessionItemSummary,
+            {"session_id": session_id, "item_id": item_id},
+            {"transactions": sign * amount},
+        )
+
+
+def compute_summaries(sessions: Iterable = None) -> Dict[SummaryKey, object]:
+    """
+    Computes the summaries of ``sessions`` (or of all sessions) from the
+    movements and positions, in four grouped queries. Returns the values keyed
+    by session, item and field, leaving out zeros.
+    """
+    session_ids = None if sessions is None else [getattr(s, "pk", s) for s in sessions]
+
+    def of_sessions(queryset, field):
+        if session_ids is None:
+            return queryset.order_by()
+        return queryset.filter(**{field + "__in": session_ids}).order_by()
+
+    result = {}
+    zero = Value(0, output_field=DecimalField())
+    for row in (
+        of_sessions(CashMovement.objects, "session")
+        .values("session")
+        .annotate(
+            cash_in=Sum(Case(When(cash__gt=0, then="cash"), default=zero)),
+            cash_out=Sum(Case(When(cash__lt=0, then="cash"), default=zero)),
+        )
+    ):
+        result[(row["session"], None, "cash_in")] = row["cash_in"]
+        result[(row["session"], None, "cash_out")] = row["cash_out"]
+    for row in (
+        of_sessions(TransactionPosition.objects, "transaction__session")
+        .values("transaction__session")
+        .annotate(total=Sum("value"))
+    ):
+        result[(row["transaction__session"], None, "transaction_total")] = row["total"]
+
+    after_end = Q(session__end__isnull=False, timestamp__gte=F("session__end"))
+    for row in (
+        of_sessions(ItemMovement.objects, "session")
+        .values("session", "item")
+        .annotate(
+            movements=Sum(
+                Case(
+                    When(after_end, then=Value(0)),
+                    default="amount",
+                    output_field=IntegerField(),
+                )
+            ),
+            post_movements=Sum(
+                Case(
+                    When(after_end, then="amount"),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                )
+            ),
+        )
+    ):
+        key = (row["session"], row["item"])
+        result[key + ("has_movements",)] = True
+        result[key + ("movements",)] = row["movements"]
+        result[key + ("post_movements",)] = row["post_movements"]
+    for row in (
+        of_sessions(TransactionPositionItem.objects, "position__transaction__session")
+        .exclude(position__type="reverse")
+        .filter(position__reversed_by=None)
+        .values("position__transaction__session", "item")
+        .annotate(transactions=Sum("amount"))
+    ):
+        key = (row["position__transaction__session"], row["item"], "transactions")
+        result[key] = row["transactions"]
+    return {key: value for key, value in result.items() if value}
+
+
+def _stored_summaries(sessions: Iterable = None) -> Dict[SummaryKey, object]:
+    summaries = SessionSummary.objects.all()
+    items = SessionItemSummary.objects.all()
+    if sessions is not None:
+        session_ids = [getattr(s, "pk", s) for s in sessions]
+        summaries = summaries.filter(session__in=session_ids)
+        items = items.filter(session__in=session_ids)
+    result = {}
+    for row in summaries.values("session", *CASH_FIELDS):
+        for field in CASH_FIELDS:
+            result[(row["session"], None, field)] = row[field]
+    for row in items.values("session", "item", *ITEM_FIELDS):
+        for field in ITEM_FIELDS:
+            result[(row["session"], row["item"], field)] = row[field]
+    return {key: value for key, value in result.items() if value}
+
+
+def rebuild_summaries() -> int:
+    summaries = compute_summaries()
+    sessions, items = defaultdict(dict), defaultdict(dict)
+    for (session_id, item_id, field), value in summaries.items():
+        if item_id is None:
+            sessions[session_id][field] = value
+        else:
+            items[(session_id, item_id)][field] = value
+    with transaction.atomic():
+        SessionSummary.objects.all().delete()
+        SessionItemSummary.objects.all().delete()
+        SessionSummary.objects.bulk_create(
+            [
+                SessionSummary(session_id=session_id, **values)
+                for session_id, values in sessions.items()
+            ],
+            batch_size=100,
+        )
+        SessionItemSummary.objects.bulk_create(
+            [
+                SessionItemSummary(session_id=session_id, item_id=item_id, **values)
+                for (session_id, item_id), values in items.items()
+            ],
+            batch_size=100,
+        )
+    return len(sessions)
+
+
+def diff_summaries(sessions: Iterable = None) -> Dict[SummaryKey, Tuple]:
+    """
+    Compares the stored summaries with the movements and positions. Returns
+    the differing values, mapped to the stored and the expected value.
+    """
+    expected = compute_summaries(sessions)
+    stored = _stored_summaries(sessions)
+    return {
+        key: (stored.get(key, 0), expected.get(key, 0))
+        for key in set(stored) | set(expected)
+        if stored.get(key, 0) != expected.get(key, 0)
+    }
@@ -0,0 +1,98 @@
+"""
+SQLite database backend tuned for several cashdesks writing at the same time.
+
+* The journal is a write-ahead log, so that reading does not block writing and
+  vice versa, with ``synchronous=NORMAL``: committing does not wait for the
+  disk, and a power loss can only lose the latest transactions, never corrupt
+  the database.
+* Connections wait up to ``timeout`` seconds (the ``busy_timeout``) for a lock
+  instead of failing with "database is locked" right away.
+* Transactions begin with ``BEGIN IMMEDIATE`` and take the write lock at the
+  start. A transaction that only takes it at its first write can fail without
+  waiting for the timeout, if another connection wrote in between. As only
+  one transaction can write at a time, this also makes up for
+  ``select_for_update``, which SQLite ignores.
+* Within a process, transactions also wait for each other on a lock, which
+  hands over right away; SQLite itself retries locked databases after
+  increasing sleeps, which makes for long waits under load.
+
+Use the ``transaction_mode`` option to begin transactions with ``DEFERRED``
+or ``EXCLUSIVE`` instead.
+"""
+import threading
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+# One lock per database file, shared by the connections of all threads
+_write_locks = defaultdict(threading.Lock)
+_write_locks_lock = threading.Lock()
+
+
+def get_write_lock(name: str) -> threading.Lock:
+    with _write_locks_lock:
+        return _write_locks[name]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.write_lock = get_write_lock(self.settings_dict["NAME"])
+        self.write_lock_timeout = self.settings_dict["OPTIONS"].get("timeout", 5)
+        self.holds_write_lock = False
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.transaction_mode = kwargs.pop("transaction_mode", "IMMEDIATE").upper()
+        if self.transaction_mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                "The transaction_mode option must be one of {}.".format(
+                    ", ".join(TRANSACTION_MODES)
+                )
+            )
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        # Ignored by in-memory databases
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode != "DEFERRED":
+            # If the lock is not free in time, we leave the waiting to SQLite
+            self.holds_write_lock = self.write_lock.acquire(
+                timeout=self.write_lock_timeout
+            )
+        try:
+            self.cursor().execute("BEGIN {}".format(self.transaction_mode))
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        if self.holds_write_lock:
+            self.holds_write_lock = False
+            self.write_lock.release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
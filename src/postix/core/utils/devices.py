@@ -2,8 +2,6 @@ import json
 import logging
 from abc import ABCMeta, abstractmethod
 
-import requests
-
 logger = logging.getLogger("django")
 
 
@@ -35,6 +33,8 @@ class OverheadDisplay(AbstractDevice):
         headers = {"Content-Type": "application/json"}
         url = "http://{}:8888/jsonrpc".format(self.ip_address)
         try:
+            import requests
+
             response = requests.post(
                 url, data=json.dumps(payload), headers=headers, timeout=0.5
             )
@@ -1,6 +1,7 @@
 import copy
 from decimal import Decimal
 
+from django.db import transaction
 from django.utils import timezone
 from django.utils.translation import ugettext as _
 
@@ -16,6 +17,7 @@ from ..models import (
     User,
 )
 from .checks import is_redeemed
+from .metrics import timed
 
 
 class FlowError(Exception):
@@ -35,6 +37,8 @@ class FlowError(Exception):
         return self.message
 
 
+@timed("redeem")
+@transaction.atomic
 def redeem_preorder_ticket(**kwargs) -> TransactionPosition:
     """
     Creates a TransactionPosition object that validates a given preorder position.
@@ -63,7 +67,9 @@ def redeem_preorder_ticket(**kwargs) -> TransactionPosition:
         # second transactions blocks at the select_for_update call until the first one
         # is finished. Once the lock is released, it continues -- but with the updated
         # PreorderPosition that now has a different last_transaction. In this case,
-        # we fail loudly.
+        # we fail loudly. SQLite ignores SELECT FOR UPDATE, but with the
+        # postix.core.sqlite backend, transactions take the write lock when
+        # they begin, so they cannot run concurrently in the first place.
         trans_id = kwargs.get("transaction_id", None)
         pp = PreorderPosition.objects.get(secret=kwargs.get("secret"))
         last_trans_id = pp.last_transaction
@@ -194,6 +200,8 @@ def redeem_preorder_ticket(**kwargs) -> TransactionPosition:
     return pos
 
 
+@timed("sell")
+@transaction.atomic
 def sell_ticket(**kwargs) -> TransactionPosition:
     """
     Creates a TransactionPosition object that sells a given product.
@@ -290,6 +298,8 @@ def sell_ticket(**kwargs) -> TransactionPosition:
     return pos
 
 
+@timed("reverse")
+@transaction.atomic
 def reverse_transaction(
     trans_id: int, current_session: CashdeskSession, authorized_by=None
 ) -> int:
@@ -339,6 +349,8 @@ def reverse_transaction(
     return new_transaction.pk
 
 
+@timed("reverse")
+@transaction.atomic
 def reverse_transaction_position(
     trans_pos_id: int, current_session: CashdeskSession, authorized_by=None
 ) -> int:
@@ -386,6 +398,7 @@ def reverse_transaction_position(
     return new_transaction.pk
 
 
+@transaction.atomic
 def reverse_session(session: CashdeskSession) -> int:
     """
     Creates a Transaction that reverses all earlier transactions of this
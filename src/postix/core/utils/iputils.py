@@ -1,8 +1,11 @@
-from typing import Union
+from typing import Optional, Union
 
+from django.conf import settings
+from django.core.cache import cache
 from django.http import HttpRequest
 
 from postix.core.models import Cashdesk
+from postix.core.models.cashdesk import get_cashdesk_ip_cache_key
 
 
 def get_ip_address(request: HttpRequest) -> str:
@@ -18,3 +21,26 @@ def detect_cashdesk(request: HttpRequest) -> Union[Cashdesk, None]:
         return Cashdesk.objects.get(ip_address=get_ip_address(request), is_active=True)
     except Cashdesk.DoesNotExist:
         return None
+
+
+def detect_cashdesk_id(request: HttpRequest) -> Optional[int]:
+    """
+    Like ``detect_cashdesk``, but only returns the ID. The result is cached
+    for ``API_AUTH_CACHE`` seconds, and dropped when a cashdesk is saved or
+    deleted.
+    """
+    ip_address = get_ip_address(request)
+    timeout = getattr(settings, "API_AUTH_CACHE", 0)
+    key = get_cashdesk_ip_cache_key(ip_address)
+    if timeout > 0:
+        cashdesk_id = cache.get(key)
+        if cashdesk_id is not None:
+            return cashdesk_id or None
+    cashdesk_id = (
+        Cashdesk.objects.filter(ip_address=ip_address, is_active=True)
+        .values_list("pk", flat=True)
+        .first()
+    )
+    if timeout > 0:
+        cache.set(key, cashdesk_id or 0, timeout)
+    return cashdesk_id
@@ -0,0 +1,358 @@
+"""
+Load generator simulating several cashdesks against a running postix instance.
+
+``create_load_event`` adds a synthetic event to the database: a ticket product
+with presale positions, a product with a warning constraint, and one cashdesk
+with an open session (and thereby an API token) per simulated desk. Cashdesks
+have no printer, so receipts go to the ``DummyPrinter``.
+
+``run_load`` then starts one thread per desk. Each desk sends its requests
+with its own API token and IP address (as ``X-Forwarded-For``, which postix
+uses to detect the cashdesk) and picks actions from a weighted mix until the
+time is up. Timings are measured for whole actions, so a scan followed by a
+redemption counts as one "redeem".
+"""
+import random
+import string
+import threading
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import requests
+from django.db import transaction
+from django.utils.crypto import get_random_string
+from django.utils.timezone import now
+
+from postix.core.models import (
+    Cashdesk,
+    CashdeskSession,
+    Preorder,
+    PreorderPosition,
+    Product,
+    User,
+    WarningConstraint,
+    WarningConstraintProduct,
+)
+from postix.core.models.preorder import normalize_secret
+
+DEFAULT_MIX = {"redeem": 5, "sell": 3, "reverse": 0.5, "products": 1, "resupply": 0.1}
+
+# Outcomes of an action
+OK = "ok"
+REJECTED = "rejected"  # refused by the flow, e.g. a ticket already redeemed
+RACE = "race"  # "Race condition. Please try again."
+SERVER_ERROR = "server_error"  # status 500 and above, e.g. "database is locked"
+CONNECTION_ERROR = "connection_error"
+
+RACE_MESSAGE = "Race condition. Please try again."
+
+
+class LoadDesk:
+    def __init__(self, name: str, ip: str, token: str):
+        self.name = name
+        self.ip = ip
+        self.token = token
+
+
+class LoadEvent:
+    def __init__(
+        self,
+        desks: List[LoadDesk],
+        secrets: List[str],
+        product: int,
+        warning: int,
+        sessions: List[int],
+    ):
+        self.desks = desks
+        self.secrets = secrets
+        self.product = product
+        self.warning = warning
+        self.sessions = sessions
+
+    def finish(self) -> None:
+        """ Ends the sessions and deactivates the cashdesks, freeing their IPs. """
+        for session in CashdeskSession.objects.filter(
+            pk__in=self.sessions
+        ).select_related("cashdesk"):
+            session.end = now()
+            session.save()
+            session.cashdesk.is_active = False
+            session.cashdesk.save()
+
+
+def _random_secret() -> str:
+    return get_random_string(24, string.ascii_letters + string.digits)
+
+
+@transaction.atomic
+def create_load_event(desks: int, preorders: int) -> LoadEvent:
+    """
+    Creates ``desks`` cashdesks with open sessions and ``preorders`` paid
+    presale tickets. All names start with "Load test" and a random run ID.
+    The cashdesks use IP addresses from 10.200.0.0 upwards, so only one load
+    test can run at a time.
+    """
+    run = get_random_string(6, string.ascii_lowercase)
+    name = "Load test {}".format(run)
+    ticket = Product.objects.create(
+        name="{} ticket".format(name), price=Decimal("0.00"), tax_rate=Decimal("0.00")
+    )
+    product = Product.objects.create(
+        name="{} drink".format(name), price=Decimal("2.50"), tax_rate=Decimal("19.00")
+    )
+    warning = WarningConstraint.objects.create(
+        name=name, message="Please check that the customer is 16 or older."
+    )
+    WarningConstraintProduct.objects.create(product=product, constraint=warning)
+
+    orders = Preorder.objects.bulk_create(
+        Preorder(order_code="LT{}{:06d}".format(run.upper(), index), is_paid=True)
+        for index in range(preorders)
+    )
+    if not orders[0].pk:  # Only PostgreSQL returns primary keys from bulk_create
+        orders = list(
+            Preorder.objects.filter(order_code__startswith="LT" + run.upper()).order_by(
+                "order_code"
+            )
+        )
+    secrets = [_random_secret() for _ in orders]
+    PreorderPosition.objects.bulk_create(
+        PreorderPosition(
+            preorder=order,
+            secret=secret,
+            secret_lookup=normalize_secret(secret),
+            product=ticket,
+        )
+        for order, secret in zip(orders, secrets)
+    )
+
+    backoffice_user = User.objects.create(
+        username="loadtest-{}-backoffice".format(run), is_backoffice_user=True
+    )
+    load_desks, sessions = [], []
+    ips = [
+        "10.{}.{}.{}".format(200 + index // 65536, index // 256 % 256, index % 256)
+        for index in range(desks)
+    ]
+    if Cashdesk.objects.filter(ip_address__in=ips, is_active=True).exists():
+        raise RuntimeError(
+            "Active cashdesks are using the IP addresses of the load test."
+        )
+    for index, ip in enumerate(ips):
+        desk_name = "{} desk {}".format(name, index + 1)
+        cashdesk = Cashdesk.objects.create(name=desk_name, ip_address=ip)
+        session = CashdeskSession.objects.create(
+            cashdesk=cashdesk,
+            user=User.objects.create(username="loadtest-{}-{}".format(run, index)),
+            backoffice_user_before=backoffice_user,
+            start=now(),
+        )
+        load_desks.append(LoadDesk(desk_name, ip, session.api_token))
+        sessions.append(session.pk)
+    return LoadEvent(load_desks, secrets, product.pk, warning.pk, sessions)
+
+
+class LoadResult:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)  # type: Dict[str, List[float]]
+        self.outcomes = defaultdict(Counter)  # type: Dict[str, Counter]
+        self.requests = 0
+        self.duration = 0.0
+
+    def add(self, action: str, duration: float, outcome: str, requests: int) -> None:
+        with self.lock:
+            self.timings[action].append(duration)
+            self.outcomes[action][outcome] += 1
+            self.requests += requests
+
+    @property
+    def actions(self) -> int:
+        return sum(len(timings) for timings in self.timings.values())
+
+    def count(self, outcome: str) -> int:
+        return sum(counter[outcome] for counter in self.outcomes.values())
+
+    def percentile(self, q: float, action: str = None) -> float:
+        if action:
+            values = self.timings[action]
+        else:
+            values = [value for timings in self.timings.values() for value in timings]
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _outcome(response: requests.Response) -> str:
+    if response.status_code >= 500:
+        return SERVER_ERROR
+    if response.status_code >= 400:
+        if RACE_MESSAGE in response.text:
+            return RACE
+        return REJECTED
+    return OK
+
+
+class DeskSimulator(threading.Thread):
+    def __init__(
+        self,
+        base_url: str,
+        desk: LoadDesk,
+        event: LoadEvent,
+        result: LoadResult,
+        mix: Dict[str, float],
+        duration: float,
+        timeout: float = 30,
+        seed: Optional[int] = None,
+    ):
+        super().__init__(name=desk.name, daemon=True)
+        self.base_url = base_url.rstrip("/")
+        self.desk = desk
+        self.event = event
+        self.result = result
+        self.actions = list(mix)
+        self.weights = [mix[action] for action in self.actions]
+        self.duration = duration
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.transactions = []  # type: List[int]
+        self.http = requests.Session()
+        self.http.headers.update(
+            {"Authorization": "Token {}".format(desk.token), "X-Forwarded-For": desk.ip}
+        )
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        return self.http.request(
+            method, self.base_url + path, timeout=self.timeout, **kwargs
+        )
+
+    def post_transaction(self, position: dict) -> requests.Response:
+        response = self.request(
+            "POST", "/api/transactions/", json={"positions": [position]}
+        )
+        if response.status_code == 201:
+            self.transactions.append(response.json()["id"])
+        return response
+
+    def redeem(self):
+        secret = self.random.choice(self.event.secrets)
+        response = self.request("GET", "/api/preorderpositions/?secret=" + secret)
+        if response.status_code != 200:
+            return response, 1
+        return self.post_transaction({"type": "redeem", "secret": secret}), 2
+
+    def sell(self):
+        position = {"type": "sell", "product": self.event.product}
+        response = self.post_transaction(position)
+        if response.status_code != 400 or RACE_MESSAGE in response.text:
+            return response, 1
+        # Like the desk, acknowledge the warning and try again
+        position["warning_{}_acknowledged".format(self.event.warning)] = True
+        return self.post_transaction(position), 2
+
+    def reverse(self):
+        if not self.transactions:
+            return self.sell()
+        transaction_id = self.transactions.pop(
+            self.random.randrange(len(self.transactions))
+        )
+        return (
+            self.request(
+                "POST", "/api/transactions/{}/reverse/".format(transaction_id)
+            ),
+            1,
+        )
+
+    def products(self):
+        return self.request("GET", "/api/products/"), 1
+
+    def resupply(self):
+        return self.request("POST", "/api/cashdesk/request-resupply/"), 1
+
+    def run(self):
+        deadline = time.perf_counter() + self.duration
+        while time.perf_counter() < deadline:
+            action = self.random.choices(self.actions, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                response, requests_sent = getattr(self, action)()
+                outcome = _outcome(response)
+            except requests.RequestException:
+                requests_sent, outcome = 1, CONNECTION_ERROR
+            self.result.add(action, time.perf_counter() - start, outcome, requests_sent)
+        self.http.close()
+
+
+def run_load(
+    base_url: str,
+    event: LoadEvent,
+    duration: float,
+    desks: int = None,
+    mix: Dict[str, float] = None,
+    seed: int = None,
+) -> LoadResult:
+    """
+    Runs the first ``desks`` desks of ``event`` (all by default) concurrently
+    for ``duration`` seconds and returns the collected timings.
+    """
+    result = LoadResult()
+    simulators = [
+        DeskSimulator(
+            base_url,
+            desk,
+            event,
+            result,
+            mix or DEFAULT_MIX,
+            duration,
+            seed=None if seed is None else seed + index,
+        )
+        for index, desk in enumerate(event.desks[:desks])
+    ]
+    start = time.perf_counter()
+    for simulator in simulators:
+        simulator.start()
+    for simulator in simulators:
+        simulator.join()
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """ Parses a mix like ``redeem=5,sell=3``; actions not listed are left out. """
+    mix = {}
+    for part in value.split(","):
+        action, _, weight = part.partition("=")
+        action = action.strip()
+        if action not in DEFAULT_MIX:
+            raise ValueError("Unknown action: {}".format(action))
+        mix[action] = float(weight or 1)
+    return mix
+
+
+def scrape_request_totals(base_url: str, token: str) -> Dict[str, float]:
+    """
+    Sums the request metrics of the API views from the server's Prometheus
+    endpoint: the number of requests, their total duration, and the time
+    spent in database queries.
+    """
+    response = requests.get(
+        base_url.rstrip("/") + "/backoffice/wizard/metrics/prometheus",
+        headers={"Authorization": "Bearer {}".format(token)},
+        timeout=10,
+    )
+    response.raise_for_status()
+    totals = {"count": 0.0, "duration": 0.0, "db_time": 0.0}
+    names = {
+        "postix_request_duration_seconds_count": "count",
+        "postix_request_duration_seconds_sum": "duration",
+        "postix_request_db_seconds_total": "db_time",
+    }
+    for line in response.text.splitlines():
+        metric, _, rest = line.partition("{")
+        labels = rest.partition("}")[0].split(",")
+        if metric in names and any(label.startswith('view="api:') for label in labels):
+            totals[names[metric]] += float(line.rsplit(" ", 1)[1])
+    return totals
@@ -0,0 +1,249 @@
+"""
+Request and operation metrics, kept in memory per process.
+
+``MetricsMiddleware`` records every request under the name of the URL pattern
+it resolved to, and the hot operations of the desk (redeem, sell, reverse,
+receipt printing, record rendering and imports) are recorded with ``timed``.
+For each, we keep the number of calls and errors, a latency histogram, and the
+number and duration of database queries. The numbers are exported in the
+Prometheus text format and shown in the backoffice.
+
+Recording takes a lock and a few additions, so it is cheap enough to stay
+enabled in production. With several worker processes, every worker keeps its
+own numbers: each scrape only returns the numbers of the worker that answered
+it, labelled with its ``pid``, so sum over the ``pid`` label in Prometheus.
+"""
+import os
+import threading
+from contextlib import ContextDecorator
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connection
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST = "request"
+OPERATION = "operation"
+
+
+class Metric:
+    __slots__ = ("count", "errors", "duration", "buckets", "queries", "db_time")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.duration = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.queries = 0
+        self.db_time = 0.0
+
+    def add(self, duration: float, queries: int, db_time: float, error: bool):
+        self.count += 1
+        self.errors += error
+        self.duration += duration
+        self.queries += queries
+        self.db_time += db_time
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if duration <= bound:
+                self.buckets[index] += 1
+                break
+
+    def copy(self) -> "Metric":
+        metric = Metric()
+        for attr in self.__slots__:
+            value = getattr(self, attr)
+            setattr(metric, attr, list(value) if attr == "buckets" else value)
+        return metric
+
+    @property
+    def cumulative_buckets(self) -> List[int]:
+        result, total = [], 0
+        for count in self.buckets:
+            total += count
+            result.append(total)
+        return result
+
+    @property
+    def average(self) -> float:
+        return self.duration / self.count if self.count else 0.0
+
+    @property
+    def average_queries(self) -> float:
+        return self.queries / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """ Upper bound of the histogram bucket containing the quantile ``q``. """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, count in zip(LATENCY_BUCKETS, self.cumulative_buckets):
+            if count >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}  # type: Dict[Tuple[str, str], Metric]
+
+    def observe(
+        self,
+        kind: str,
+        name: str,
+        duration: float,
+        queries: int = 0,
+        db_time: float = 0.0,
+        error: bool = False,
+    ) -> None:
+        with self.lock:
+            metric = self.metrics.get((kind, name))
+            if metric is None:
+                metric = self.metrics[(kind, name)] = Metric()
+            metric.add(duration, queries, db_time, error)
+
+    def snapshot(self, kind: str) -> Dict[str, Metric]:
+        with self.lock:
+            return {
+                name: metric.copy()
+                for (metric_kind, name), metric in self.metrics.items()
+                if metric_kind == kind
+            }
+
+    def reset(self) -> None:
+        with self.lock:
+            self.metrics.clear()
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """ Database execute wrapper counting queries and the time spent in them. """
+
+    def __init__(self):
+        self.queries = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += perf_counter() - start
+            self.queries += 1
+
+
+class measure(ContextDecorator):
+    """
+    Records the block (or every call of the decorated function) as one call
+    of ``name``. Exceptions are counted as errors. Inside the block, ``name``
+    can be changed, ``error`` can be set to record a failure without raising,
+    and ``discard`` can be set to not record the call at all.
+    """
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.error = False
+        self.discard = False
+
+    def _recreate_cm(self):
+        return type(self)(self.kind, self.name)
+
+    def __enter__(self) -> "measure":
+        self.enabled = settings.METRICS
+        if self.enabled:
+            self.recorder = QueryRecorder()
+            connection.execute_wrappers.append(self.recorder)
+            self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self.enabled:
+            return
+        duration = perf_counter() - self.start
+        connection.execute_wrappers.remove(self.recorder)
+        if self.discard:
+            return
+        registry.observe(
+            self.kind,
+            self.name,
+            duration,
+            queries=self.recorder.queries,
+            db_time=self.recorder.time,
+            error=self.error or exc_type is not None,
+        )
+
+
+def timed(operation: str):
+    """
+    Records a hot operation, either as a decorator or as a context manager::
+
+        @timed("sell")
+        def sell_ticket(...):
+            ...
+    """
+    return measure(OPERATION, operation)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return "{:g}".format(bound)
+
+
+def render_prometheus() -> str:
+    lines = []
+    pid = os.getpid()
+    for kind, label, description in (
+        (REQUEST, "view", "Requests by URL name"),
+        (OPERATION, "operation", "Hot operations"),
+    ):
+        prefix = "postix_{}".format(kind)
+        metrics = sorted(registry.snapshot(kind).items())
+        lines += [
+            "# HELP {}_duration_seconds {}, duration.".format(prefix, description),
+            "# TYPE {}_duration_seconds histogram".format(prefix),
+        ]
+        for name, metric in metrics:
+            labels = 'pid="{}",{}="{}"'.format(pid, label, _escape(name))
+            for bound, count in zip(LATENCY_BUCKETS, metric.cumulative_buckets):
+                lines.append(
+                    '{}_duration_seconds_bucket{{{},le="{}"}} {}'.format(
+                        prefix, labels, _format_bound(bound), count
+                    )
+                )
+            lines += [
+                '{}_duration_seconds_bucket{{{},le="+Inf"}} {}'.format(
+                    prefix, labels, metric.count
+                ),
+                "{}_duration_seconds_sum{{{}}} {}".format(
+                    prefix, labels, metric.duration
+                ),
+                "{}_duration_seconds_count{{{}}} {}".format(
+                    prefix, labels, metric.count
+                ),
+            ]
+        for suffix, attr, kind_description in (
+            ("errors_total", "errors", "failed calls"),
+            ("db_queries_total", "queries", "database queries"),
+            ("db_seconds_total", "db_time", "time spent in database queries"),
+        ):
+            lines += [
+                "# HELP {}_{} {}, {}.".format(
+                    prefix, suffix, description, kind_description
+                ),
+                "# TYPE {}_{} counter".format(prefix, suffix),
+            ]
+            for name, metric in metrics:
+                lines.append(
+                    '{}_{}{{pid="{}",{}="{}"}} {}'.format(
+                        prefix, suffix, pid, label, _escape(name), getattr(metric, attr)
+                    )
+                )
+    return "\n".join(lines) + "\n"
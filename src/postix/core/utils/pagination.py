@@ -0,0 +1,111 @@
+"""
+Keyset ("cursor") pagination for querysets ordered newest first.
+
+Instead of counting all rows and skipping ``OFFSET`` rows, every page starts
+right after the last row of the previous one, so that deep pages are as cheap
+as the first one. Pages are identified by an opaque cursor built from the
+timestamp and primary key of the row at the page boundary.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+from django.utils.timezone import utc
+
+EPOCH = datetime(1970, 1, 1, tzinfo=utc)
+
+
+class KeysetPage:
+    def __init__(
+        self,
+        object_list: List,
+        next_cursor: Optional[str],
+        previous_cursor: Optional[str],
+    ):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(dt: datetime, pk: int) -> str:
+    delta = dt - EPOCH
+    microseconds = (delta.days * 86400 + delta.seconds) * 10 ** 6 + delta.microseconds
+    return "{}-{}".format(microseconds, pk)
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    """ Returns ``None`` for cursors that were not created by ``encode_cursor``. """
+    try:
+        microseconds, pk = cursor.rsplit("-", 1)
+        return EPOCH + timedelta(microseconds=int(microseconds)), int(pk)
+    except (AttributeError, TypeError, ValueError, OverflowError):
+        return None
+
+
+def paginate_keyset(
+    queryset: QuerySet,
+    datetime_field: str,
+    page_size: int,
+    after: str = None,
+    before: str = None,
+) -> KeysetPage:
+    """
+    Returns the page of ``queryset``, ordered by ``datetime_field`` and primary
+    key descending, that starts after the cursor ``after`` (going to older
+    rows) or ends before the cursor ``before`` (going to newer rows). Without
+    a cursor, the newest rows are returned. Runs exactly one query.
+    """
+    ordering = ("-" + datetime_field, "-pk")
+    after, before = decode_cursor(after), decode_cursor(before)
+    if before:
+        dt, pk = before
+        rows = list(
+            queryset.filter(
+                Q(**{datetime_field + "__gt": dt})
+                | Q(**{datetime_field: dt, "pk__gt": pk})
+            ).order_by(datetime_field, "pk")[: page_size + 1]
+        )
+        more = len(rows) > page_size
+        rows = rows[:page_size][::-1]
+        has_previous, has_next = more, True
+    else:
+        if after:
+            dt, pk = after
+            queryset = queryset.filter(
+                Q(**{datetime_field + "__lt": dt})
+                | Q(**{datetime_field: dt, "pk__lt": pk})
+            )
+        rows = list(queryset.order_by(*ordering)[: page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = bool(after)
+
+    def cursor(row):
+        value = row
+        for attr in datetime_field.split("__"):
+            value = getattr(value, attr)
+        return encode_cursor(value, row.pk)
+
+    return KeysetPage(
+        rows,
+        next_cursor=cursor(rows[-1]) if rows and has_next else None,
+        previous_cursor=cursor(rows[0]) if rows and has_previous else None,
+    )
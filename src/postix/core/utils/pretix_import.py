@@ -4,6 +4,8 @@ from decimal import Decimal
 from django.db import transaction
 
 from postix.core.models import Cashdesk, Preorder, PreorderPosition, Product
+from postix.core.models.preorder import normalize_secret
+from postix.core.utils.metrics import timed
 
 
 class FakeStyle:
@@ -70,6 +72,7 @@ def _build_product_dict(data, log, style):
     return product_dict
 
 
+@timed("import_presale")
 @transaction.atomic
 def import_pretix_data(
     data, add_cashdesks=False, log=FakeLog(), style=FakeStyle(), questions=None
@@ -131,7 +134,11 @@ def import_pretix_data(
                 pp = preorder_positions[position["secret"]]
                 del preorder_positions[position["secret"]]
             else:
-                pp = PreorderPosition(preorder=preorder, secret=position["secret"])
+                pp = PreorderPosition(
+                    preorder=preorder,
+                    secret=position["secret"],
+                    secret_lookup=normalize_secret(position["secret"]),
+                )
 
             information = ""
             if questions and "answers" in position:
@@ -10,9 +10,9 @@ from typing import List, Union
 
 from django.utils import timezone
 from django.utils.translation import ugettext as _
-from PIL import Image
 
 from postix.core.models import Transaction
+from postix.core.utils.metrics import timed
 
 SEPARATOR_CHAR = "\u2500"
 SEPARATOR = "\u2500" * 42 + "\r\n"
@@ -214,6 +214,7 @@ class CashdeskPrinter:
         receipt += "\r\n\r\n\r\n"
         return receipt
 
+    @timed("receipt_print")
     def print_receipt(
         self, transaction: Transaction, do_open_drawer: bool = True
     ) -> None:
@@ -356,6 +357,8 @@ class CashdeskPrinter:
         return int(pixel_value)
 
     def print_image(self, fileish):
+        from PIL import Image
+
         image = Image.open(fileish)
 
         image = image.convert("1")
@@ -414,6 +417,7 @@ class DummyPrinter:
     def cut_tape(self) -> None:
         self.logger.info("[DummyPrinter] Cut tape")
 
+    @timed("receipt_print")
     def print_receipt(
         self, transaction: Transaction, do_open_drawer: bool = True
     ) -> Union[str, None]:
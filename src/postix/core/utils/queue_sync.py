@@ -0,0 +1,131 @@
+"""
+Sends ping results to the c3queue server configured in the event settings.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from postix.core.models import EventSettings, Ping
+
+logger = logging.getLogger(__name__)
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class QueueSyncError(Exception):
+    pass
+
+
+class PingSyncer:
+    """
+    Posts pings to c3queue over one shared HTTP session, with bounded
+    concurrency and a timeout per request. Pings that fail are retried with
+    exponential backoff, without holding up the others.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        token: str,
+        concurrency: int = 4,
+        timeout: float = 5,
+        backoff_base: float = 2,
+        backoff_max: float = 300,
+    ):
+        self.url = url if url.endswith("/") else url + "/"
+        self.url += "pong"
+        self.token = token
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failures = {}  # type: Dict[int, Tuple[int, float]]
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["Authorization"] = token
+
+    @classmethod
+    def from_settings(cls, **kwargs):
+        settings = EventSettings.get_solo()
+        if not settings.queue_sync_url or not settings.queue_sync_token:
+            return None
+        return cls(settings.queue_sync_url, settings.queue_sync_token, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def post(self, ping: Ping) -> None:
+        try:
+            response = self.session.post(
+                self.url,
+                data={
+                    "ping": ping.pinged.strftime(DATE_FORMAT),
+                    "pong": ping.ponged.strftime(DATE_FORMAT),
+                },
+                timeout=self.timeout,
+            )
+        except requests.RequestException as e:
+            raise QueueSyncError("Could not reach {}: {}".format(self.url, e))
+        if response.status_code != 201:
+            raise QueueSyncError(
+                "Received non-201 status response from {}: {}".format(
+                    self.url, response.status_code
+                )
+            )
+
+    def is_due(self, ping: Ping, current: float) -> bool:
+        failures = self.failures.get(ping.pk)
+        return not failures or failures[1] <= current
+
+    def _post(self, ping: Ping) -> Tuple[Ping, Exception]:
+        try:
+            self.post(ping)
+        except QueueSyncError as e:
+            return ping, e
+        return ping, None
+
+    def sync(self, pings: List[Ping]) -> Tuple[List[int], List[int]]:
+        """
+        Sends all given pings that are not backing off, and marks the successful
+        ones as synced. Returns the IDs of synced and of failed pings.
+        """
+        current = time.monotonic()
+        pings = [ping for ping in pings if self.is_due(ping, current)]
+        synced, failed = [], []
+        if not pings:
+            return synced, failed
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for ping, error in executor.map(self._post, pings):
+                if error:
+                    count = self.failures.get(ping.pk, (0, 0))[0] + 1
+                    delay = min(self.backoff_base * 2 ** (count - 1), self.backoff_max)
+                    self.failures[ping.pk] = (count, time.monotonic() + delay)
+                    failed.append(ping.pk)
+                    logger.warning("Syncing ping %s failed: %s", ping.pk, error)
+                else:
+                    self.failures.pop(ping.pk, None)
+                    synced.append(ping.pk)
+        if synced:
+            Ping.objects.filter(pk__in=synced).update(synced=True)
+        return synced, failed
+
+    def sync_pending(self, batch_size: int = 100) -> Tuple[List[int], List[int]]:
+        """ Syncs all pings that have been ponged but not synced yet, in batches. """
+        synced, failed = [], []
+        pending = Ping.objects.filter(synced=False, ponged__isnull=False).order_by("pk")
+        last_pk = 0
+        while True:
+            batch = list(pending.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            batch_synced, batch_failed = self.sync(batch)
+            synced += batch_synced
+            failed += batch_failed
+        return synced, failed
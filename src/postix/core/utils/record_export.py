@@ -0,0 +1,65 @@
+import csv
+from typing import Iterator, TextIO
+
+from django.db.models import QuerySet
+
+from postix.core.models import Record
+
+RECORD_EXPORT_FIELDS = [
+    ("date", "Datum"),
+    ("time", "Uhrzeit"),
+    ("direction", "Richtung"),
+    ("amount", "Betrag"),
+    ("entity", "Quelle/Ziel"),
+    ("entity_detail", "Detail"),
+    ("cashdesk_session", "Kassensession"),
+    ("supervisor", "Person"),
+    ("user", "Einlieferer/Empfänger"),
+    ("checksum", "Prüfsumme"),
+]
+CHUNK_SIZE = 2000
+
+
+def get_export_queryset() -> QuerySet:
+    """ All records, joined with everything ``Record.export_data`` looks at. """
+    return Record.objects.select_related(
+        "entity",
+        "backoffice_user",
+        "cash_movement__session__cashdesk",
+        "cash_movement__session__user",
+        "cash_movement__session__backoffice_user_after",
+    ).order_by("datetime", "pk")
+
+
+def iter_export_rows(queryset: QuerySet = None) -> Iterator[dict]:
+    """
+    Yields the export data of every record. Records are fetched in chunks,
+    so memory usage does not grow with the number of records.
+    """
+    if queryset is None:
+        queryset = get_export_queryset()
+    for record in queryset.iterator(chunk_size=CHUNK_SIZE):
+        yield record.export_data
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def write_records_csv(stream: TextIO, queryset: QuerySet = None) -> int:
+    writer = csv.DictWriter(stream, fieldnames=[k[0] for k in RECORD_EXPORT_FIELDS])
+    writer.writerow(dict(RECORD_EXPORT_FIELDS))
+    count = 0
+    for row in iter_export_rows(queryset):
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def iter_records_csv(queryset: QuerySet = None) -> Iterator[str]:
+    """ Yields the CSV export line by line, e.g. for a ``StreamingHttpResponse``. """
+    writer = csv.DictWriter(_Echo(), fieldnames=[k[0] for k in RECORD_EXPORT_FIELDS])
+    yield writer.writerow(dict(RECORD_EXPORT_FIELDS))
+    for row in iter_export_rows(queryset):
+        yield writer.writerow(row)
@@ -0,0 +1,175 @@
+"""
+Substring search for order codes and list constraint entries.
+
+A plain ``icontains`` filter scans the whole table, which is slow for large
+member lists and presale imports. Instead, the searchable columns are indexed
+by trigrams:
+
+* On PostgreSQL, with ``pg_trgm`` GIN indexes on ``UPPER(column)``, which the
+  ``icontains`` lookups Django generates there can use directly.
+* On SQLite, with FTS5 tables using the trigram tokenizer (SQLite 3.34+). They
+  are kept up to date by triggers, so bulk imports are indexed, too.
+
+Other databases, old SQLite versions, and queries shorter than three
+characters fall back to ``icontains``. Results are ranked: exact matches
+first, then prefix matches, then all others.
+"""
+import logging
+from typing import Dict, Tuple
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Case, IntegerField, Q, QuerySet, Value, When
+
+logger = logging.getLogger(__name__)
+
+MIN_LENGTH = 3
+
+SEARCH_FIELDS = {
+    "core_preorder": ("order_code",),
+    "core_listconstraintentry": ("name", "identifier"),
+}  # type: Dict[str, Tuple[str, ...]]
+
+_installed = {}  # type: Dict[str, bool]
+
+
+def get_search_table(table: str) -> str:
+    return table + "_search"
+
+
+def _sqlite_statements(table: str, fields: Tuple[str, ...]) -> Tuple[list, str]:
+    search_table = get_search_table(table)
+    columns = ", ".join(fields)
+    new = ", ".join("new." + field for field in fields)
+    old = ", ".join("old." + field for field in fields)
+    insert = "INSERT INTO {t}(rowid, {c}) VALUES (new.id, {new});".format(
+        t=search_table, c=columns, new=new
+    )
+    delete = "INSERT INTO {t}({t}, rowid, {c}) VALUES ('delete', old.id, {old});".format(
+        t=search_table, c=columns, old=old
+    )
+    statements = [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {t} USING fts5({c}, content='{table}', "
+        "content_rowid='id', tokenize='trigram')".format(
+            t=search_table, c=columns, table=table
+        ),
+        "CREATE TRIGGER IF NOT EXISTS {t}_insert AFTER INSERT ON {table} "
+        "BEGIN {insert} END".format(t=search_table, table=table, insert=insert),
+        "CREATE TRIGGER IF NOT EXISTS {t}_delete AFTER DELETE ON {table} "
+        "BEGIN {delete} END".format(t=search_table, table=table, delete=delete),
+        "CREATE TRIGGER IF NOT EXISTS {t}_update AFTER UPDATE ON {table} "
+        "BEGIN {delete} {insert} END".format(
+            t=search_table, table=table, delete=delete, insert=insert
+        ),
+    ]
+    rebuild = "INSERT INTO {t}({t}) VALUES ('rebuild')".format(t=search_table)
+    return statements, rebuild
+
+
+def _sqlite_is_installed(cursor, table: str) -> bool:
+    search_table = get_search_table(table)
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+        [
+            search_table,
+            search_table + "_insert",
+            search_table + "_delete",
+            search_table + "_update",
+        ],
+    )
+    return cursor.fetchone()[0] == 4
+
+
+def install_search_index(using: str = "default", rebuild: bool = False) -> bool:
+    """
+    Creates the search indexes if they are missing, and returns whether they
+    are available. Safe to call repeatedly. Missing SQLite triggers (for
+    example after a migration re-created a table) are restored and the index
+    is rebuilt from the table contents.
+    """
+    connection = connections[using]
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                for table, fields in SEARCH_FIELDS.items():
+                    if _sqlite_is_installed(cursor, table) and not rebuild:
+                        continue
+                    statements, rebuild_statement = _sqlite_statements(table, fields)
+                    for statement in statements:
+                        cursor.execute(statement)
+                    cursor.execute(rebuild_statement)
+            elif connection.vendor == "postgresql":
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                for table, fields in SEARCH_FIELDS.items():
+                    for field in fields:
+                        cursor.execute(
+                            "CREATE INDEX IF NOT EXISTS {table}_{field}_trgm ON {table} "
+                            "USING gin (UPPER({field}::text) gin_trgm_ops)".format(
+                                table=table, field=field
+                            )
+                        )
+            else:
+                return False
+    except DatabaseError as e:
+        logger.warning("Could not create the search index: %s", e)
+        return False
+    return True
+
+
+def has_search_index(using: str = "default") -> bool:
+    """ Whether the SQLite FTS tables can be used, checked once per process. """
+    if using not in _installed:
+        _installed[using] = connections[
+            using
+        ].vendor == "sqlite" and install_search_index(using)
+    return _installed[using]
+
+
+def fts_phrase(query: str) -> str:
+    return '"{}"'.format(query.replace('"', '""'))
+
+
+def search(queryset: QuerySet, query: str, limit: int = None) -> QuerySet:
+    """
+    Filters ``queryset`` (of a model in ``SEARCH_FIELDS``) to the rows where
+    any search field contains ``query``, ignoring case, and orders them by
+    relevance. Returns at most ``limit`` rows if given.
+    """
+    table = queryset.model._meta.db_table
+    fields = SEARCH_FIELDS[table]
+    query = query.strip()
+    if not query:
+        return queryset.none()
+
+    if len(query) >= MIN_LENGTH and has_search_index(queryset.db):
+        search_table = get_search_table(table)
+        # Not filter(pk__in=RawSQL(...)): SQLite reads the parenthesized
+        # subquery Django generates for that as a scalar.
+        queryset = queryset.extra(
+            where=[
+                "{}.id IN (SELECT rowid FROM {t} WHERE {t} MATCH %s)".format(
+                    table, t=search_table
+                )
+            ],
+            params=[fts_phrase(query)],
+        )
+    else:
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{field + "__icontains": query})
+        queryset = queryset.filter(condition)
+
+    exact, prefix = Q(), Q()
+    for field in fields:
+        exact |= Q(**{field + "__iexact": query})
+        prefix |= Q(**{field + "__istartswith": query})
+    queryset = queryset.annotate(
+        search_rank=Case(
+            When(exact, then=Value(0)),
+            When(prefix, then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        )
+    ).order_by("search_rank", *fields, "pk")
+    if limit is not None:
+        queryset = queryset[:limit]
+    return queryset
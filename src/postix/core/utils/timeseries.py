@@ -0,0 +1,246 @@
+"""
+Time-bucketed statistics over transactions and cashdesk sessions.
+
+Everything is loaded with one query per source into NumPy arrays of POSIX
+timestamps, and then binned or swept over as a whole, so the cost does not
+depend on the number of days or buckets requested. Transactions are read from
+the sales rollup whenever the requested buckets line up with it.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+from django.db.models import QuerySet, Sum
+from django.utils.timezone import get_current_timezone, now
+
+from postix.core.models import CashdeskSession, SalesRollup, TransactionPosition
+from postix.core.models.rollup import BUCKET_SIZE
+
+POSITION_TYPES = [t[0] for t in TransactionPosition.TYPES]
+
+
+def local_midnight(day: date) -> float:
+    tz = get_current_timezone()
+    return tz.localize(datetime.combine(day, time())).timestamp()
+
+
+def day_offsets(start: date, days: int) -> np.ndarray:
+    """
+    Seconds from local midnight of ``start`` to local midnight of each of the
+    following ``days`` days, including the one after the last. Days around a
+    change to or from daylight saving time are 23 or 25 hours long.
+    """
+    origin = local_midnight(start)
+    return np.array(
+        [
+            local_midnight(start + timedelta(days=day)) - origin
+            for day in range(days + 1)
+        ]
+    )
+
+
+def get_default_range() -> Tuple[date, date]:
+    """ The local dates of the first session start and the last session end. """
+    tz = get_current_timezone()
+    first = CashdeskSession.objects.order_by("start").first()
+    if not first:
+        today = now().astimezone(tz).date()
+        return today, today
+    last_end = (
+        CashdeskSession.objects.filter(end__isnull=False).order_by("-end").first()
+    )
+    end = last_end.end if last_end else now()
+    return first.start.astimezone(tz).date(), end.astimezone(tz).date()
+
+
+def _to_datetime(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=get_current_timezone())
+
+
+def load_positions(start: float, end: float) -> Dict[str, Tuple]:
+    """
+    Timestamps of all transaction positions in [start, end) and their weights,
+    by position type.
+    """
+    rows = TransactionPosition.objects.filter(
+        transaction__datetime__gte=_to_datetime(start),
+        transaction__datetime__lt=_to_datetime(end),
+    ).values_list("transaction__datetime", "type")
+    timestamps = np.fromiter(
+        (dt.timestamp() for dt, _ in rows), dtype=np.float64, count=len(rows)
+    )
+    types = np.array([t for _, t in rows], dtype=object)
+    return {
+        t: (timestamps[types == t], np.ones((types == t).sum(), dtype=np.int64))
+        for t in POSITION_TYPES
+    }
+
+
+def load_rollup(start: float, end: float) -> Dict[str, Tuple]:
+    """
+    Like ``load_positions``, but reads the sales rollup, so that the cost depends
+    on the number of rollup buckets instead of the number of positions.
+    """
+    rows = (
+        SalesRollup.objects.filter(
+            bucket__gte=_to_datetime(start), bucket__lt=_to_datetime(end)
+        )
+        .order_by()
+        .values_list("bucket", "type")
+        .annotate(total=Sum("count"))
+    )
+    rows = list(rows)
+    timestamps = np.array([b.timestamp() for b, _, _ in rows], dtype=np.float64)
+    types = np.array([t for _, t, _ in rows], dtype=object)
+    counts = np.array([c for _, _, c in rows], dtype=np.int64)
+    return {t: (timestamps[types == t], counts[types == t]) for t in POSITION_TYPES}
+
+
+def get_default_sessions() -> QuerySet:
+    """
+    The sessions of cashdesks that hand out items, without hand-held cash
+    boxes ("Handkasse"), which would count as open cashdesks all day.
+    """
+    return CashdeskSession.objects.filter(cashdesk__handles_items=True).exclude(
+        cashdesk__name__icontains="handkasse"
+    )
+
+
+def load_sessions(
+    sessions: QuerySet = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Start timestamps, end timestamps and cashdesk IDs of the given sessions,
+    or of the default sessions. Sessions that are still open end now.
+    """
+    if sessions is None:
+        sessions = get_default_sessions()
+    rows = list(sessions.values_list("start", "end", "cashdesk_id"))
+    current = now().timestamp()
+    starts = np.array([s.timestamp() for s, _, _ in rows], dtype=np.float64)
+    ends = np.array(
+        [e.timestamp() if e else current for _, e, _ in rows], dtype=np.float64
+    )
+    cashdesks = np.array([c for _, _, c in rows], dtype=np.int64)
+    return starts, ends, cashdesks
+
+
+def count_open_cashdesks(
+    starts: np.ndarray, ends: np.ndarray, cashdesks: np.ndarray, points: np.ndarray
+) -> np.ndarray:
+    """
+    Number of distinct cashdesks with an open session at each point in time,
+    where a session is open from its start to its end, both inclusive.
+
+    For every cashdesk, the number of sessions open at a point is the number of
+    starts at or before the point minus the number of ends before it, which is
+    a binary search in the sorted endpoints. Overlapping sessions on the same
+    cashdesk count once.
+    """
+    counts = np.zeros(len(points), dtype=np.int64)
+    for cashdesk in np.unique(cashdesks):
+        mask = cashdesks == cashdesk
+        started = np.searchsorted(np.sort(starts[mask]), points, side="right")
+        ended = np.searchsorted(np.sort(ends[mask]), points, side="left")
+        counts += (started - ended) > 0
+    return counts
+
+
+def get_timeline(
+    start: date = None,
+    end: date = None,
+    bucket: timedelta = timedelta(minutes=30),
+    resolution: timedelta = timedelta(minutes=5),
+    sessions: QuerySet = None,
+    max_days: int = None,
+    max_samples: int = None,
+) -> Dict:
+    """
+    Transaction position counts per bucket and position type, and the number of
+    open cashdesks sampled at the given resolution, for the local days from
+    ``start`` to ``end`` (inclusive). Both series are aligned to local midnight
+    of the first day and are given in seconds relative to it.
+
+    Raises ``ValueError`` if the range spans more than ``max_days`` days, or
+    if either series would have more than ``max_samples`` values.
+    """
+    bucket_size = bucket.total_seconds()
+    step = resolution.total_seconds()
+    if bucket_size <= 0 or step <= 0:
+        raise ValueError("Bucket size and resolution need to be positive.")
+    if start is None or end is None:
+        default_start, default_end = get_default_range()
+        start = start or default_start
+        end = end or default_end
+    if end < start:
+        raise ValueError("The end date needs to be after the start date.")
+
+    days = (end - start).days + 1
+    if max_days is not None and days > max_days:
+        raise ValueError("The range may span at most {} days.".format(max_days))
+    origin = local_midnight(start)
+    length = local_midnight(end + timedelta(days=1)) - origin
+    if max_samples is not None and length / min(bucket_size, step) > max_samples:
+        raise ValueError(
+            "Too many buckets or samples, at most {} are allowed.".format(max_samples)
+        )
+    edges = np.arange(0, length + bucket_size, bucket_size)
+    edges[-1] = min(edges[-1], length)
+    points = np.arange(0, length, step)
+
+    # The rollup can be used if every bucket consists of whole rollup buckets
+    rollup_size = BUCKET_SIZE.total_seconds()
+    if bucket_size % rollup_size == 0 and origin % rollup_size == 0:
+        positions = load_rollup(origin, origin + length)
+    else:
+        positions = load_positions(origin, origin + length)
+    transactions = {}
+    for position_type, (timestamps, weights) in positions.items():
+        counts, _ = np.histogram(timestamps - origin, bins=edges, weights=weights)
+        transactions[position_type] = counts.astype(np.int64)
+    starts, ends, cashdesks = load_sessions(sessions)
+    open_cashdesks = count_open_cashdesks(
+        starts - origin, ends - origin, cashdesks, points
+    )
+    return {
+        "start": start,
+        "days": days,
+        "origin": origin,
+        "bucket_size": bucket_size,
+        "resolution": step,
+        "buckets": edges[:-1],
+        "transactions": transactions,
+        "points": points,
+        "open_cashdesks": open_cashdesks,
+    }
+
+
+def serialize_timeline(timeline: Dict) -> Dict:
+    """ Converts the result of ``get_timeline`` into plain JSON-compatible data. """
+    return {
+        "start": timeline["start"].isoformat(),
+        "days": timeline["days"],
+        "origin": timeline["origin"],
+        "bucket_size": timeline["bucket_size"],
+        "resolution": timeline["resolution"],
+        "buckets": timeline["buckets"].tolist(),
+        "transactions": {
+            position_type: counts.tolist()
+            for position_type, counts in timeline["transactions"].items()
+        },
+        "points": timeline["points"].tolist(),
+        "open_cashdesks": timeline["open_cashdesks"].tolist(),
+    }
+
+
+def split_days(
+    values: np.ndarray, offsets: np.ndarray, start: date, days: int
+) -> Iterable:
+    """
+    Splits a series sampled at ``offsets`` seconds from local midnight of
+    ``start`` into one slice per local day, relative to that day's midnight.
+    """
+    bounds = day_offsets(start, days)
+    for day in range(days):
+        mask = (offsets >= bounds[day]) & (offsets < bounds[day + 1])
+        yield offsets[mask] - bounds[day], values[mask]
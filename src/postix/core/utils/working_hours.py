@@ -0,0 +1,130 @@
+"""
+Working hours of the cashdesk users, summed up over their ended sessions by
+the database. Shown in the backoffice user list, exported as CSV from there,
+and available from the API for volunteer management.
+"""
+import csv
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator
+
+from django.db.models import (
+    Count,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Q,
+    QuerySet,
+    Sum,
+)
+from django.db.models.functions import Coalesce, TruncDate
+
+from postix.core.models import CashdeskSession, User
+
+GROUPS = ("day", "role")
+EXPORT_FIELDS = [
+    ("username", "nick"),
+    ("name", "name"),
+    ("day", "day"),
+    ("role", "role"),
+    ("minutes", "minutes"),
+]
+
+
+def session_duration(prefix: str = "") -> ExpressionWrapper:
+    return ExpressionWrapper(
+        F(prefix + "end") - F(prefix + "start"), output_field=DurationField()
+    )
+
+
+def with_working_time(queryset: QuerySet) -> QuerySet:
+    """ Annotates users with the total duration of their ended sessions. """
+    return queryset.annotate(
+        working_time=Sum(
+            session_duration("cashdesksession__"),
+            filter=Q(cashdesksession__end__isnull=False),
+        )
+    )
+
+
+def get_user_working_time(user: User) -> timedelta:
+    return (
+        CashdeskSession.objects.filter(user=user, end__isnull=False).aggregate(
+            total=Sum(session_duration())
+        )["total"]
+        or timedelta()
+    )
+
+
+def get_working_hours(group_by: Iterable[str] = ()) -> QuerySet:
+    """
+    One row per user, and per day and/or role if listed in ``group_by``, with
+    the total duration and number of the user's ended sessions, longest
+    first. Sessions count for the day they started on; the role is the
+    record name of the cashdesk (like "Bar"), or its name.
+    """
+    group_by = [group for group in GROUPS if group in group_by]
+    queryset = CashdeskSession.objects.filter(end__isnull=False, user__isnull=False)
+    if "day" in group_by:
+        queryset = queryset.annotate(day=TruncDate("start"))
+    if "role" in group_by:
+        queryset = queryset.annotate(
+            role=Coalesce("cashdesk__record_name", "cashdesk__name")
+        )
+    return (
+        queryset.values(
+            "user", "user__username", "user__firstname", "user__lastname", *group_by
+        )
+        .annotate(duration=Sum(session_duration()), sessions=Count("pk"))
+        .order_by("-duration", "user__username", *group_by)
+    )
+
+
+def parse_groups(value: str) -> list:
+    """ Parses a ``group_by`` parameter like ``day,role``. """
+    groups = [group.strip() for group in value.split(",") if group.strip()]
+    for group in groups:
+        if group not in GROUPS:
+            raise ValueError("Unknown group: {}".format(group))
+    return groups
+
+
+def get_name(row: Dict) -> str:
+    """ Like ``User.get_full_name``, for a row of ``get_working_hours``. """
+    if row["user__firstname"] and row["user__lastname"]:
+        return "{} {}".format(row["user__firstname"], row["user__lastname"])
+    return row["user__firstname"] or row["user__username"]
+
+
+def get_minutes(duration: timedelta) -> int:
+    return int(duration.total_seconds() // 60)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def iter_working_hours_csv(group_by: Iterable[str] = ()) -> Iterator[str]:
+    """ Yields the CSV export line by line, e.g. for a ``StreamingHttpResponse``. """
+    fields = [
+        (key, header)
+        for key, header in EXPORT_FIELDS
+        if key not in GROUPS or key in group_by
+    ]
+    writer = csv.DictWriter(
+        _Echo(),
+        fieldnames=[key for key, _ in fields],
+        extrasaction="ignore",
+        lineterminator="\n",
+    )
+    yield writer.writerow(dict(fields))
+    for row in get_working_hours(group_by).iterator():
+        yield writer.writerow(
+            {
+                "username": row["user__username"],
+                "name": get_name(row),
+                "day": row.get("day"),
+                "role": row.get("role"),
+                "minutes": get_minutes(row["duration"]),
+            }
+        )
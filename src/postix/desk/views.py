@@ -5,13 +5,13 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
 from django.shortcuts import redirect, render
-from django.utils.functional import cached_property
 from django.utils.timezone import now
 from django.utils.translation import ugettext as _
 from django.views.generic import TemplateView
 
+from ..core.middleware import get_cashdesk_context
 from ..core.models import Cashdesk
-from ..core.utils.iputils import detect_cashdesk, get_ip_address
+from ..core.utils.iputils import get_ip_address
 
 
 class LoginView(TemplateView):
@@ -64,16 +64,13 @@ class LoginView(TemplateView):
             )
         return redirect("desk:login")
 
-    @cached_property
+    @property
     def cashdesk(self) -> Cashdesk:
-        return detect_cashdesk(self.request)
+        return get_cashdesk_context(self.request).cashdesk
 
 
 def logout_view(request: HttpRequest) -> HttpResponseRedirect:
-    if request.user.is_authenticated:
-        session = request.user.get_current_session()
-    else:
-        session = None
+    session = get_cashdesk_context(request).session
     logout(request)
     if session:
         session.cashdesk.signal_close()
@@ -82,8 +79,8 @@ def logout_view(request: HttpRequest) -> HttpResponseRedirect:
 
 @login_required(login_url="/login/")
 def main_view(request: HttpRequest) -> HttpResponse:
-    cashdesk = detect_cashdesk(request)
-    session = request.user.get_current_session()
+    context = get_cashdesk_context(request)
+    cashdesk, session = context.cashdesk, context.session
     if not cashdesk or session is None or session.cashdesk != cashdesk:
         return render(
             request,
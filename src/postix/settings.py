@@ -53,10 +53,12 @@ except ImportError:
 
 
 MIDDLEWARE = [
+    "postix.core.middleware.MetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "postix.core.middleware.CashdeskContextMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -73,11 +75,18 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTIX_DB_PASS", ""),
         "HOST": os.getenv("POSTIX_DB_HOST", ""),
         "PORT": os.getenv("POSTIX_DB_PORT", ""),
-        "CONN_MAX_AGE": 300
-        if os.getenv("POSTIX_DB_TYPE", "sqlite3") != "sqlite3"
-        else 0,
+        "CONN_MAX_AGE": 300,
     }
 }
+if (
+    os.getenv("POSTIX_DB_TYPE", "sqlite3") == "sqlite3"
+    and os.getenv("POSTIX_DB_SQLITE_TUNED", "True") == "True"
+):
+    # WAL journal, busy timeout and immediate transactions, see postix.core.sqlite
+    DATABASES["default"]["ENGINE"] = "postix.core.sqlite"
+    DATABASES["default"]["OPTIONS"] = {
+        "timeout": int(os.getenv("POSTIX_DB_SQLITE_TIMEOUT", "20"))
+    }
 
 TEMPLATES = [
     {
@@ -127,6 +136,34 @@ STATICFILES_FINDERS = (
 )
 MEDIA_ROOT = os.path.join(BASE_DIR, "postix", "media")
 
+# All worker processes need to share the cache, so that saving a session or
+# cashdesk invalidates the cached API authentication everywhere
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "POSTIX_CACHE_BACKEND",
+            "django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": os.getenv(
+            "POSTIX_CACHE_LOCATION", os.path.join(BASE_DIR, "postix", "cache")
+        ),
+    }
+}
+
+# Render record PDFs in the render_records worker instead of the request
+RECORD_RENDER_BACKGROUND = os.getenv("POSTIX_RECORD_RENDER_BACKGROUND", "") == "True"
+RECORD_RENDER_TIMEOUT = int(os.getenv("POSTIX_RECORD_RENDER_TIMEOUT", "300"))
+TROUBLESHOOTER_DASHBOARD_CACHE = int(
+    os.getenv("POSTIX_TROUBLESHOOTER_DASHBOARD_CACHE", "3")
+)
+TROUBLESHOOTER_EVENT_STREAMS = int(
+    os.getenv("POSTIX_TROUBLESHOOTER_EVENT_STREAMS", "10")
+)
+API_AUTH_CACHE = int(os.getenv("POSTIX_API_AUTH_CACHE", "10"))
+BACKOFFICE_CHECKS_CACHE = int(os.getenv("POSTIX_BACKOFFICE_CHECKS_CACHE", "300"))
+METRICS = os.getenv("POSTIX_METRICS", "True") == "True"
+METRICS_TOKEN = os.getenv("POSTIX_METRICS_TOKEN", "")
+
 AUTH_USER_MODEL = "core.User"
 
 MESSAGE_TAGS = {
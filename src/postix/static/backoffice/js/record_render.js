@@ -0,0 +1,16 @@
+$(function () {
+    var container = $("#record-render");
+    var intv = window.setInterval(function () {
+        $.getJSON(container.data("status-url"), function (data) {
+            if (data.status === "done") {
+                window.clearInterval(intv);
+                window.location.replace(data.url);
+            } else if (data.status === "failed") {
+                window.clearInterval(intv);
+                $("#record-render-error").text(data.error);
+                $("#record-render-pending").hide();
+                $("#record-render-failed").show();
+            }
+        });
+    }, 1000);
+});
@@ -109,10 +109,9 @@ var preorder = {
         queryTokenizer: Bloodhound.tokenizers.whitespace,
         limit: 4,
         remote: {
-            url: '/api/preorderpositions/?search=%QUERY',
+            url: '/api/preorderpositions/typeahead/?search=%QUERY',
             wildcard: '%QUERY',
-            transform: function (object) {
-                var results = object.results;
+            transform: function (results) {
                 var secrets = [];
                 var reslen = results.length;
                 for (var i = 0; i < reslen; i++) {
@@ -11,14 +11,46 @@ $(function () {
             }
         }
     }, 400);
-    if (!$(".has-request").length) {
+    if ($(".has-request").length) {
+        return;
+    }
+
+    function showRequests(hasRequests) {
+        $("#nav-sessions").toggleClass("has-request", hasRequests);
+    }
+
+    function poll() {
         var intv = window.setInterval(function () {
             $.getJSON("/troubleshooter/session/check_requests", function (data) {
-                $("#nav-sessions").toggleClass("has-request", data.has_requests);
+                showRequests(data.has_requests);
                 if (data.has_requests) {
                     window.clearInterval(intv);
                 }
             });
         }, 1000);
     }
+
+    if (!window.EventSource) {
+        poll();
+        return;
+    }
+
+    // The server closes the stream regularly and the browser reconnects on its
+    // own. Only if the stream can't be opened at all, we go back to polling.
+    var source = new EventSource("/troubleshooter/session/events");
+    var failures = 0;
+    var update = function (e) {
+        failures = 0;
+        showRequests(JSON.parse(e.data).has_requests);
+    };
+    ["state", "new", "ack", "expired"].forEach(function (type) {
+        source.addEventListener(type, update);
+    });
+    source.onerror = function () {
+        failures += 1;
+        if (source.readyState === EventSource.CLOSED || failures > 3) {
+            source.close();
+            poll();
+        }
+    };
 });
@@ -1,7 +1,7 @@
 from django.http import Http404
 from django.urls import resolve
 
-from ..core.models import TroubleshooterNotification
+from .events import has_active_requests
 
 
 def processor(request):
@@ -20,6 +20,6 @@ def processor(request):
     if not request.path.startswith("/troubleshooter"):
         return ctx
 
-    if TroubleshooterNotification.objects.active().exists():
+    if has_active_requests():
         ctx["has_request"] = True
     return ctx
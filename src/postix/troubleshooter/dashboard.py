@@ -0,0 +1,66 @@
+from typing import Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.utils.timezone import now
+
+from postix.core.models import CashdeskSession, TroubleshooterNotification
+from postix.core.models.base import ItemSupplyPack
+from postix.core.models.cashdesk import get_item_ledger
+
+CACHE_KEY = "troubleshooter:dashboard"
+
+
+def build_dashboard() -> Dict:
+    """
+    Collects everything the troubleshooter dashboard shows: active sessions
+    with their cashdesk, user, open resupply requests and item balances, and
+    the troubleshooter stock. Runs a fixed number of queries, independent of the
+    number of cashdesks, sessions or items.
+    """
+    sessions = list(
+        CashdeskSession.objects.filter(
+            Q(start__isnull=True) | Q(start__lt=now()),
+            cashdesk__is_active=True,
+            end__isnull=True,
+        )
+        .select_related("cashdesk", "user")
+        .order_by("cashdesk__name", "cashdesk", "pk")
+    )
+    ledger = get_item_ledger(sessions)
+    requests = set(
+        TroubleshooterNotification.objects.active()
+        .filter(session__in=[sess.pk for sess in sessions])
+        .values_list("session_id", flat=True)
+    )
+    for sess in sessions:
+        sess.current_items = ledger[sess.pk]
+        sess.open_requests = sess.pk in requests
+
+    troubleshooter_stock = list(
+        ItemSupplyPack.objects.filter(state="troubleshooter")
+        .order_by()
+        .values("item", "item__name")
+        .annotate(s=Sum("amount"))
+    )
+    return {"sessions": sessions, "troubleshooter_stock": troubleshooter_stock}
+
+
+def get_dashboard() -> Dict:
+    """
+    Returns the dashboard data, cached for ``TROUBLESHOOTER_DASHBOARD_CACHE``
+    seconds so that all troubleshooters refreshing the page share one result.
+    """
+    timeout = getattr(settings, "TROUBLESHOOTER_DASHBOARD_CACHE", 0)
+    if timeout <= 0:
+        return build_dashboard()
+    data = cache.get(CACHE_KEY)
+    if data is None:
+        data = build_dashboard()
+        cache.set(CACHE_KEY, data, timeout)
+    return data
+
+
+def invalidate_dashboard() -> None:
+    cache.delete(CACHE_KEY)
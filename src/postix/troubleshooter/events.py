@@ -0,0 +1,250 @@
+"""
+In-process bus for troubleshooter notification events.
+
+Resupply requests and confirmations publish events here, and every open
+``session/events`` stream waits on the bus instead of polling the database.
+The bus only knows about events of its own process: streams therefore also
+re-check the database every ``RESYNC_INTERVAL`` seconds, so deployments with
+several workers still see every request, just a bit later.
+
+Every open stream occupies a worker thread, so a process serves at most
+``TROUBLESHOOTER_EVENT_STREAMS`` of them at a time. Beyond that, clients fall
+back to polling.
+"""
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from postix.core.models import TroubleshooterNotification
+
+from .dashboard import invalidate_dashboard
+
+EVENT_NEW = "new"
+EVENT_ACK = "ack"
+EVENT_EXPIRED = "expired"
+
+# Must match TroubleshooterNotification.objects.active()
+NOTIFICATION_LIFETIME = timedelta(minutes=10).total_seconds()
+HAS_REQUESTS_CACHE_KEY = "troubleshooter:has_requests"
+
+# Streams end after STREAM_DURATION seconds and the browser reconnects after
+# RECONNECT_DELAY milliseconds, so that no worker thread is held forever.
+STREAM_DURATION = 300
+HEARTBEAT_INTERVAL = 15
+RESYNC_INTERVAL = 30
+RECONNECT_DELAY = 3000
+
+
+class NotificationBus:
+    def __init__(self, size: int = 1000):
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=size)
+        self.counter = itertools.count(1)
+        self.last_id = 0
+        self.expiry = {}
+
+    def publish(self, event_type: str, data: Dict) -> int:
+        with self.condition:
+            self._publish(event_type, data)
+            self.condition.notify_all()
+            last_id = self.last_id
+        self._invalidate()
+        return last_id
+
+    def _publish(self, event_type: str, data: Dict) -> None:
+        self.last_id = next(self.counter)
+        self.events.append((self.last_id, event_type, data))
+        notification = data.get("notification")
+        if event_type == EVENT_NEW:
+            self.expiry[notification] = time.monotonic() + NOTIFICATION_LIFETIME
+        else:
+            self.expiry.pop(notification, None)
+
+    def _invalidate(self) -> None:
+        # Talks to the cache, so this is called without holding the lock
+        cache.delete(HAS_REQUESTS_CACHE_KEY)
+        invalidate_dashboard()
+
+    def _expire(self) -> bool:
+        """ Publishes expiry events, returns whether there were any. """
+        current = time.monotonic()
+        expired = False
+        for notification, expires in list(self.expiry.items()):
+            if expires <= current:
+                self._publish(EVENT_EXPIRED, {"notification": notification})
+                expired = True
+        return expired
+
+    def _next_expiry(self) -> float:
+        return min(self.expiry.values(), default=float("inf"))
+
+    def since(self, last_id: int) -> List:
+        """ Events newer than ``last_id`` that are still buffered. """
+        return [event for event in self.events if event[0] > last_id]
+
+    def wait(self, last_id: int, timeout: float) -> List:
+        """
+        Blocks until there are events newer than ``last_id`` or the timeout
+        passes, and returns the new events. Any number of threads can wait at
+        the same time.
+        """
+        deadline = time.monotonic() + timeout
+        expired = False
+        with self.condition:
+            while True:
+                expired = self._expire() or expired
+                events = self.since(last_id)
+                current = time.monotonic()
+                if events or deadline <= current:
+                    break
+                self.condition.wait(min(deadline, self._next_expiry()) - current)
+        if expired:
+            self._invalidate()
+        return events
+
+
+bus = NotificationBus()
+
+
+def notification_data(notification: TroubleshooterNotification) -> Dict:
+    return {
+        "notification": notification.pk,
+        "session": notification.session_id,
+        "message": notification.message,
+    }
+
+
+def publish(event_type: str, notifications: Iterable) -> None:
+    """ Publishes events for the given notifications once the transaction commits. """
+    data = [notification_data(notification) for notification in notifications]
+
+    def send():
+        for entry in data:
+            bus.publish(event_type, entry)
+
+    transaction.on_commit(send)
+
+
+def has_active_requests() -> bool:
+    """
+    Whether there are unanswered resupply requests. The answer is cached like
+    the dashboard and dropped whenever this process publishes an event.
+    """
+    timeout = getattr(settings, "TROUBLESHOOTER_DASHBOARD_CACHE", 0)
+    if timeout <= 0:
+        return TroubleshooterNotification.objects.active().exists()
+    result = cache.get(HAS_REQUESTS_CACHE_KEY)
+    if result is None:
+        result = TroubleshooterNotification.objects.active().exists()
+        cache.set(HAS_REQUESTS_CACHE_KEY, result, timeout)
+    return result
+
+
+class StreamSlots:
+    """ Counts the open event streams of this process. """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def acquire(self) -> bool:
+        limit = getattr(settings, "TROUBLESHOOTER_EVENT_STREAMS", 0)
+        with self.lock:
+            if self.count >= limit:
+                return False
+            self.count += 1
+            return True
+
+    def release(self) -> None:
+        with self.lock:
+            self.count -= 1
+
+
+stream_slots = StreamSlots()
+
+
+class EventStream:
+    """
+    An ``event_stream`` that holds one of the stream slots of this process
+    until it is closed, which Django does when the response is finished.
+    """
+
+    def __init__(self, duration: float = None):
+        self.events = event_stream(duration)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        return next(self.events)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.events.close()
+            stream_slots.release()
+
+
+def open_event_stream(duration: float = None) -> Optional[EventStream]:
+    """ Returns a new event stream, or None if this process serves enough of them. """
+    if not stream_slots.acquire():
+        return None
+    return EventStream(duration)
+
+
+def format_event(event_type: str, data: Dict, event_id: int = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append("id: {}".format(event_id))
+    lines.append("event: {}".format(event_type))
+    lines.append("data: {}".format(json.dumps(data)))
+    return "\n".join(lines) + "\n\n"
+
+
+def event_stream(duration: float = None) -> Iterator[str]:
+    """
+    Yields server-sent events: the current state first, then every event
+    published on the bus, each with the current ``has_requests`` state. The
+    database is re-checked every ``RESYNC_INTERVAL`` seconds to pick up events
+    published by other processes.
+    """
+    duration = STREAM_DURATION if duration is None else duration
+    deadline = time.monotonic() + duration
+    last_id = bus.last_id
+    has_requests = TroubleshooterNotification.objects.active().exists()
+    last_sync = time.monotonic()
+    yield "retry: {}\n\n".format(RECONNECT_DELAY)
+    yield format_event("state", {"has_requests": has_requests})
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events = bus.wait(last_id, min(HEARTBEAT_INTERVAL, remaining))
+        if events:
+            last_id = events[-1][0]
+            has_requests = TroubleshooterNotification.objects.active().exists()
+            last_sync = time.monotonic()
+            for event_id, event_type, data in events:
+                yield format_event(
+                    event_type, dict(data, has_requests=has_requests), event_id
+                )
+        elif time.monotonic() - last_sync >= RESYNC_INTERVAL:
+            current = TroubleshooterNotification.objects.active().exists()
+            last_sync = time.monotonic()
+            if current != has_requests:
+                has_requests = current
+                yield format_event("state", {"has_requests": has_requests})
+            else:
+                yield ": ping\n\n"
+        else:
+            yield ": ping\n\n"
@@ -56,5 +56,6 @@ urlpatterns = [
         name="confirm-resupply",
     ),
     url("^session/check_requests$", views.check_requests, name="check-requests"),
+    url("^session/events$", views.notification_events, name="notification-events"),
     url("^$", views.main_view, name="main"),
 ]
@@ -1,6 +1,6 @@
 from .auth import LoginView, logout_view
 from .constraints import ListConstraintDetailView, ListConstraintListView
-from .desk import check_requests, confirm_resupply
+from .desk import check_requests, confirm_resupply, notification_events
 from .information import InformationDetailView, InformationListView
 from .main import main_view
 from .ping import PingView
@@ -18,6 +18,7 @@ __all__ = [
     "logout_view",
     "main_view",
     "check_requests",
+    "notification_events",
     "InformationDetailView",
     "InformationListView",
     "ListConstraintDetailView",
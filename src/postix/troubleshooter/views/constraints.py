@@ -1,12 +1,12 @@
 from typing import Any, Dict
 
 from django.contrib import messages
-from django.db.models import Q
 from django.utils.translation import ugettext as _
 from django.views.generic.detail import DetailView
 from django.views.generic.list import ListView
 
 from ...core.models import ListConstraint
+from ...core.utils.search import search
 from .utils import TroubleshooterUserRequiredMixin
 
 
@@ -39,12 +39,12 @@ class ListConstraintDetailView(TroubleshooterUserRequiredMixin, DetailView):
                     ),
                 )
             else:
-                ctx["entries"] = obj.entries.filter(
-                    Q(name__icontains=query) | Q(identifier__icontains=query)
-                )
                 if obj.confidential:
-                    ctx["entries"] = ctx["entries"][:10]
-                    ctx["restricted"] = ctx["entries"].count() > 10
+                    entries = list(search(obj.entries.all(), query, limit=11))
+                    ctx["entries"] = entries[:10]
+                    ctx["restricted"] = len(entries) > 10
+                else:
+                    ctx["entries"] = search(obj.entries.all(), query)
         else:
             if obj.confidential:
                 ctx["entries"] = []
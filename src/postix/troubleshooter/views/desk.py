@@ -1,17 +1,47 @@
 from django.contrib import messages
-from django.http import HttpRequest, HttpResponseRedirect, JsonResponse
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import redirect
 from django.utils.translation import ugettext as _
 
 from ...core.models import CashdeskSession, TroubleshooterNotification
+from ..dashboard import invalidate_dashboard
+from ..events import (
+    EVENT_ACK,
+    RESYNC_INTERVAL,
+    has_active_requests,
+    open_event_stream,
+    publish,
+)
 from .utils import troubleshooter_user_required
 
 
 @troubleshooter_user_required
 def check_requests(request: HttpRequest) -> JsonResponse:
-    return JsonResponse(
-        {"has_requests": TroubleshooterNotification.objects.active().exists()}
-    )
+    return JsonResponse({"has_requests": has_active_requests()})
+
+
+@troubleshooter_user_required
+def notification_events(request: HttpRequest) -> StreamingHttpResponse:
+    """
+    Server-sent events for new, acknowledged and expired resupply requests.
+    Clients fall back to polling ``check_requests`` if the stream fails, e.g.
+    because this process has no stream slots left.
+    """
+    stream = open_event_stream()
+    if stream is None:
+        response = HttpResponse(status=503)
+        response["Retry-After"] = str(RESYNC_INTERVAL)
+        return response
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @troubleshooter_user_required
@@ -19,9 +49,16 @@ def confirm_resupply(request: HttpRequest, pk: int) -> HttpResponseRedirect:
     if request.method == "POST":
         try:
             session = CashdeskSession.objects.get(pk=pk)
-            TroubleshooterNotification.objects.active(session=session).update(
+            notifications = list(
+                TroubleshooterNotification.objects.active(session=session)
+            )
+            TroubleshooterNotification.objects.filter(
+                pk__in=[notification.pk for notification in notifications]
+            ).update(
                 status=TroubleshooterNotification.STATUS_ACK, modified_by=request.user
             )
+            publish(EVENT_ACK, notifications)
+            invalidate_dashboard()
             messages.success(
                 request, _("{} has been resupplied.").format(session.cashdesk)
             )
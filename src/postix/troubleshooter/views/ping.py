@@ -1,46 +1,65 @@
+from datetime import timedelta
+
+from django.core.paginator import Paginator
 from django.urls import reverse
+from django.utils.timezone import now
+from django.utils.translation import ugettext_lazy as _
 from django.views.generic import FormView
 
-from postix.core.models.ping import Ping, generate_ping
+from postix.core.models.ping import Ping, generate_ping, get_ping_stats
 from postix.troubleshooter.forms import CashdeskForm
 from postix.troubleshooter.views.utils import TroubleshooterUserRequiredMixin
 
+WINDOWS = [
+    ("1h", _("Last hour"), timedelta(hours=1)),
+    ("6h", _("Last 6 hours"), timedelta(hours=6)),
+    ("24h", _("Last 24 hours"), timedelta(hours=24)),
+    ("all", _("All"), None),
+]
+
 
-def get_minutes(timedelta):
-    return timedelta.total_seconds() // 60
+def get_minutes(seconds):
+    if seconds is not None:
+        return "{:.2f}".format(seconds / 60)
 
 
 class PingView(TroubleshooterUserRequiredMixin, FormView):
     template_name = "troubleshooter/ping.html"
     form_class = CashdeskForm
+    paginate_by = 50
+
+    def get_window(self):
+        window = self.request.GET.get("window")
+        for key, label, length in WINDOWS:
+            if key == window:
+                return key, length
+        return "all", None
 
     def get_context_data(self):
         ctx = super().get_context_data()
-        if Ping.objects.exists():
-            pings = Ping.objects.order_by("pinged")
-            ping_count = pings.count()
-            ping_success = pings.filter(ponged__isnull=False)
-            ping_success_count = ping_success.count()
-
-            durations = [get_minutes(p.ponged - p.pinged) for p in ping_success]
-
-            ctx["pings"] = pings
-            ctx["ping_success"] = ping_success_count
-            ctx["loss_percent"] = "{:.2f}".format(
-                (ping_count - ping_success_count) * 100 / ping_count
-            )
-
-            if durations:
-                ctx["total_min"] = min(durations)
-                ctx["total_max"] = max(durations)
-                ctx["total_avg"] = sum(durations) / len(durations)
-                ctx["total_mdev"] = sum(
-                    ((duration - ctx["total_avg"]) ** 2) for duration in durations
-                ) / len(durations)
-        else:
-            ctx["pings"] = []
-            ctx["ping_success"] = 0
+        window, length = self.get_window()
+        since = now() - length if length else None
+
+        stats = get_ping_stats(since=since)
+        ctx["stats"] = stats
+        ctx["window"] = window
+        ctx["windows"] = [(key, label) for key, label, length in WINDOWS]
+        ctx["loss_percent"] = "{:.2f}".format(stats["loss"])
+        for key in ("min", "max", "mean", "stddev"):
+            ctx["total_{}".format(key)] = get_minutes(stats[key])
+        ctx["percentiles"] = [
+            (percentile, get_minutes(value))
+            for percentile, value in stats["percentiles"].items()
+        ]
 
+        pings = Ping.objects.order_by("-pinged", "-pk")
+        if since:
+            pings = pings.filter(pinged__gte=since)
+        paginator = Paginator(pings, self.paginate_by)
+        page = paginator.get_page(self.request.GET.get("page"))
+        ctx["pings"] = page.object_list
+        ctx["page_obj"] = page
+        ctx["is_paginated"] = page.has_other_pages()
         return ctx
 
     def post(self, request):
@@ -1,11 +1,12 @@
 from django.contrib import messages
-from django.db.models import QuerySet
+from django.db.models import Prefetch, QuerySet
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect
 from django.utils.translation import ugettext as _
 from django.views.generic import DetailView, ListView
 
 from ...core.models import Preorder, PreorderPosition
+from ...core.utils.search import search
 from ..forms import CashdeskForm
 from .utils import TroubleshooterUserRequiredMixin
 
@@ -29,12 +30,9 @@ class PreorderListView(TroubleshooterUserRequiredMixin, ListView):
         return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self) -> QuerySet:
-        qs = Preorder.objects.all().order_by("order_code")
         if "code" in self.filter:
-            qs = qs.filter(order_code__icontains=self.filter["code"])
-        else:
-            qs = qs.none()
-        return qs
+            return search(Preorder.objects.all(), self.filter["code"])
+        return Preorder.objects.none()
 
 
 class PreorderInformationListView(TroubleshooterUserRequiredMixin, ListView):
@@ -42,7 +40,7 @@ class PreorderInformationListView(TroubleshooterUserRequiredMixin, ListView):
     context_object_name = "positions"
     model = PreorderPosition
     queryset = (
-        PreorderPosition.objects.all()
+        PreorderPosition.objects.with_redemption_info()
         .exclude(information__isnull=True)
         .exclude(information="")
     )
@@ -55,12 +53,11 @@ class PreorderInformationListView(TroubleshooterUserRequiredMixin, ListView):
     def post(self, request, *args, **kwargs):
         form = CashdeskForm(request.POST)
         if form.is_valid():
+            positions = list(self.queryset)
             form.cleaned_data["cashdesk"].printer.print_attendance(
-                arrived=[
-                    position for position in self.queryset if position.is_redeemed
-                ],
+                arrived=[position for position in positions if position.is_redeemed],
                 not_arrived=[
-                    position for position in self.queryset if not position.is_redeemed
+                    position for position in positions if not position.is_redeemed
                 ],
             )
             messages.success(request, _("Attendance print in progress."))
@@ -72,4 +69,6 @@ class PreorderInformationListView(TroubleshooterUserRequiredMixin, ListView):
 class PreorderDetailView(TroubleshooterUserRequiredMixin, DetailView):
     template_name = "troubleshooter/preorder_detail.html"
     context_object_name = "preorder"
-    model = Preorder
+    queryset = Preorder.objects.prefetch_related(
+        Prefetch("positions", queryset=PreorderPosition.objects.with_redemption_info())
+    )
@@ -2,7 +2,7 @@ from typing import Any, Dict, Union
 
 from django.contrib import messages
 from django.core.files.storage import default_storage
-from django.db.models import QuerySet
+from django.db.models import OuterRef, Prefetch, QuerySet, Subquery, Sum
 from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
 from django.shortcuts import redirect, render
 from django.utils.translation import ugettext as _
@@ -10,8 +10,8 @@ from django.views.generic.detail import DetailView
 from django.views.generic.list import ListView
 
 from ...core.models import Cashdesk, CashdeskSession, Transaction, TransactionPosition
+from ...core.utils.pagination import paginate_keyset
 from ..forms import InvoiceAddressForm
-from ..invoicing import generate_invoice
 from .utils import TroubleshooterUserRequiredMixin, troubleshooter_user_required
 
 
@@ -42,11 +42,16 @@ class TransactionListView(TroubleshooterUserRequiredMixin, ListView):
         return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self) -> QuerySet:
-        qs = (
-            TransactionPosition.objects.all()
-            .order_by("-transaction__datetime")
-            .select_related("transaction")
+        transaction_value = (
+            TransactionPosition.objects.filter(transaction=OuterRef("transaction"))
+            .order_by()
+            .values("transaction")
+            .annotate(total=Sum("value"))
+            .values("total")
         )
+        qs = TransactionPosition.objects.select_related(
+            "transaction", "transaction__session__cashdesk", "product"
+        ).annotate(transaction_value=Subquery(transaction_value))
         if "cashdesk" in self.filter:
             qs = qs.filter(transaction__session__cashdesk=self.filter["cashdesk"])
         if "type" in self.filter and self.filter["type"]:
@@ -55,6 +60,20 @@ class TransactionListView(TroubleshooterUserRequiredMixin, ListView):
             qs = qs.filter(transaction__receipt_id=self.filter["receipt"])
         return qs
 
+    def paginate_queryset(self, queryset: QuerySet, page_size: int):
+        """
+        Pages by (transaction datetime, position ID) instead of page numbers,
+        so that no page needs a COUNT or an OFFSET scan.
+        """
+        page = paginate_keyset(
+            queryset,
+            "transaction__datetime",
+            page_size,
+            after=self.request.GET.get("after"),
+            before=self.request.GET.get("before"),
+        )
+        return None, page, page.object_list, page.has_other_pages
+
     def get_context_data(self) -> Dict[str, Any]:
         ctx = super().get_context_data()
         ctx["cashdesks"] = Cashdesk.objects.all()
@@ -65,11 +84,20 @@ class TransactionListView(TroubleshooterUserRequiredMixin, ListView):
 class TransactionDetailView(TroubleshooterUserRequiredMixin, DetailView):
     template_name = "troubleshooter/transaction_detail.html"
     context_object_name = "transaction"
-    model = Transaction
+    queryset = Transaction.objects.select_related(
+        "session__cashdesk", "session__user"
+    ).prefetch_related(
+        Prefetch(
+            "positions",
+            queryset=TransactionPosition.objects.select_related(
+                "product", "reverses"
+            ).prefetch_related("reversed_by"),
+        )
+    )
 
     def get_context_data(self, object):
         ctx = super().get_context_data()
-        ctx["sessions"] = CashdeskSession.active.all()
+        ctx["sessions"] = CashdeskSession.active.select_related("cashdesk", "user")
         return ctx
 
 
@@ -120,6 +148,8 @@ def transaction_invoice(request, pk) -> Union[HttpResponse, HttpResponseRedirect
     if request.method == "POST":
         form = InvoiceAddressForm(request.POST)
         if form.is_valid():
+            from ..invoicing import generate_invoice  # imports reportlab
+
             path = generate_invoice(transaction, form.cleaned_data["address"])
             return return_invoice(path)
         else:
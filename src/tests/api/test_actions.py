@@ -2,6 +2,8 @@ import json
 
 import pytest
 
+from postix.core.models import CashdeskSession
+
 from ..factories import itemsupplypack_factory, ping_factory, transaction_factory
 
 
@@ -109,3 +111,25 @@ def test_supply_valid(api_with_session, session):
     assert im.backoffice_user == session.user
     assert im.item == p.item
     assert im.amount == p.amount
+
+
+@pytest.mark.django_db
+def test_supply_looks_up_session_once(api_with_session, session, monkeypatch):
+    pack = itemsupplypack_factory(state="troubleshooter")
+    calls = []
+    original = session.user.__class__.get_current_session
+
+    def get_current_session(user):
+        calls.append(user)
+        return original(user)
+
+    monkeypatch.setattr(
+        session.user.__class__, "get_current_session", get_current_session
+    )
+    response = api_with_session.post(
+        "/api/cashdesk/supply/", {"identifier": pack.identifier}
+    )
+    assert response.status_code == 200
+    assert response.data["success"]
+    assert len(calls) == 1
+    assert CashdeskSession.objects.get(pk=session.pk).item_movements.exists()
@@ -1,7 +1,15 @@
 from datetime import timedelta
 
 import pytest
+from django.core.cache import cache
 from django.utils.timezone import now
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from postix.api.auth import TokenAuthentication
+from postix.core.models import CashdeskSession, CashMovement
+from postix.core.models.cashdesk import get_cashdesk_ip_cache_key, get_token_cache_key
 
 from ..factories import cashdesk_session_before_factory
 
@@ -49,3 +57,94 @@ def test_valid(api):
     api.credentials(HTTP_AUTHORIZATION="Token " + session.api_token)
     r = api.get("/api/preorders/")
     assert r.status_code in (403, 200)
+
+
+@pytest.fixture
+def auth_cache(settings):
+    settings.API_AUTH_CACHE = 60
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def authenticate(token, ip="127.0.0.1", method="get"):
+    request = Request(
+        getattr(APIRequestFactory(), method)(
+            "/api/preorders/", HTTP_AUTHORIZATION="Token " + token, REMOTE_ADDR=ip
+        )
+    )
+    return TokenAuthentication().authenticate(request)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("method", ["get", "post"])
+def test_cached_token_without_queries(auth_cache, django_assert_num_queries, method):
+    session = cashdesk_session_before_factory(ip="127.0.0.1")
+    with django_assert_num_queries(2):
+        user, token = authenticate(session.api_token, method=method)
+    assert user == session.user
+    assert token == session.api_token
+    with django_assert_num_queries(0):
+        user, token = authenticate(session.api_token, method=method)
+    assert user == session.user
+    assert cache.get(get_token_cache_key(session.api_token))["user"] == user.pk
+    # The remaining fields are loaded when they are used
+    with django_assert_num_queries(1):
+        assert user.username == session.user.username
+
+
+@pytest.mark.django_db
+def test_cached_token_inactive_user(auth_cache):
+    session = cashdesk_session_before_factory(ip="127.0.0.1")
+    authenticate(session.api_token)
+    session.user.is_active = False
+    session.user.save()
+    with pytest.raises(AuthenticationFailed) as excinfo:
+        authenticate(session.api_token, method="post")
+    assert "inactive" in str(excinfo.value)
+
+
+@pytest.mark.django_db
+def test_cached_session_and_cashdesk_deleted(auth_cache):
+    session = cashdesk_session_before_factory(ip="127.0.0.1", create_items=False)
+    authenticate(session.api_token)
+    cashdesk = session.cashdesk
+    CashMovement.objects.filter(session=session).delete()
+    session.delete()
+    with pytest.raises(AuthenticationFailed) as excinfo:
+        authenticate(session.api_token)
+    assert "Invalid token" in str(excinfo.value)
+
+    assert cache.get(get_cashdesk_ip_cache_key("127.0.0.1")) == cashdesk.pk
+    cashdesk.delete()
+    assert cache.get(get_cashdesk_ip_cache_key("127.0.0.1")) is None
+
+
+@pytest.mark.django_db
+def test_cached_token_ended_session(auth_cache):
+    session = cashdesk_session_before_factory(ip="127.0.0.1")
+    authenticate(session.api_token)
+    session.end = now()
+    session.save()
+    with pytest.raises(AuthenticationFailed) as excinfo:
+        authenticate(session.api_token)
+    assert "has ended" in str(excinfo.value)
+
+
+@pytest.mark.django_db
+def test_cached_token_cashdesk_ip_change(auth_cache):
+    session = cashdesk_session_before_factory(ip="127.0.0.1")
+    authenticate(session.api_token)
+
+    session.cashdesk.ip_address = "10.1.1.1"
+    session.cashdesk.save()
+    with pytest.raises(AuthenticationFailed) as excinfo:
+        authenticate(session.api_token)
+    assert "different cashdesk" in str(excinfo.value)
+    assert authenticate(session.api_token, ip="10.1.1.1")[0] == session.user
+
+    session.cashdesk.ip_address = "127.0.0.1"
+    session.cashdesk.save()
+    assert authenticate(session.api_token)[0] == session.user
+    with pytest.raises(AuthenticationFailed):
+        authenticate(session.api_token, ip="10.1.1.1")
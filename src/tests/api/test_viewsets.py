@@ -1,11 +1,20 @@
 import json
+from datetime import timedelta
 
 import pytest
 
+from postix.api.serializers import PreorderPositionSerializer
+from postix.core.models import PreorderPosition, TransactionPosition
+
 from ..factories import (
+    cashdesk_session_before_factory,
     list_constraint_entry_factory,
     list_constraint_factory,
+    preorder_factory,
     preorder_position_factory,
+    product_factory,
+    transaction_factory,
+    user_factory,
 )
 
 
@@ -36,6 +45,123 @@ def test_preorders_with_search(api_with_session, chars):
     assert content["count"] == int(chars >= 6)
 
 
+@pytest.mark.django_db
+def test_preorders_ignore_case(api_with_session):
+    pp = preorder_position_factory(paid=True)
+    response = api_with_session.get(
+        "/api/preorderpositions/?secret=" + pp.secret.swapcase()
+    )
+    assert json.loads(response.content.decode())["count"] == 1
+    response = api_with_session.get(
+        "/api/preorderpositions/?search=" + pp.secret[:8].swapcase()
+    )
+    assert json.loads(response.content.decode())["count"] == 1
+
+
+@pytest.mark.django_db
+def test_preorders_typeahead(api_with_session, django_assert_num_queries):
+    positions = [preorder_position_factory(paid=True) for _ in range(3)]
+    for index, pp in enumerate(positions):
+        pp.secret = "AbCdEf{}{}".format(index, pp.secret)
+        pp.save()
+    for index in range(12):
+        PreorderPosition.objects.create(
+            preorder=positions[0].preorder,
+            product=positions[0].product,
+            secret="abcdef9{:02d}".format(index),
+        )
+    preorder_position_factory(paid=True)
+
+    with django_assert_num_queries(1):
+        response = api_with_session.get(
+            "/api/preorderpositions/typeahead/?search=aBcDeF"
+        )
+    content = json.loads(response.content.decode())
+    assert len(content) == 10
+    assert [entry["secret"] for entry in content[:3]] == [pp.secret for pp in positions]
+
+    response = api_with_session.get("/api/preorderpositions/typeahead/?search=abcdef1")
+    assert json.loads(response.content.decode()) == [{"secret": positions[1].secret}]
+
+    response = api_with_session.get("/api/preorderpositions/typeahead/?search=abcde")
+    assert json.loads(response.content.decode()) == []
+
+
+def preorder_positions(count):
+    products = [product_factory(items=True) for _ in range(3)]
+    session = cashdesk_session_before_factory(create_items=False)
+    positions = []
+    for index in range(count):
+        pp = PreorderPosition.objects.create(
+            preorder=preorder_factory(paid=bool(index % 2)),
+            product=products[index % 3],
+            secret="batch{:04d}".format(index),
+        )
+        if index % 3:
+            redemption = TransactionPosition.objects.create(
+                type="redeem",
+                preorder_position=pp,
+                value=0,
+                tax_rate=0,
+                tax_value=0,
+                product=pp.product,
+                transaction=transaction_factory(session=session),
+            )
+            if index % 3 == 2:
+                TransactionPosition.objects.create(
+                    type="reverse",
+                    preorder_position=pp,
+                    reverses=redemption,
+                    transaction=transaction_factory(session=session),
+                )
+        positions.append(pp)
+    return positions
+
+
+@pytest.mark.django_db
+def test_preorder_position_serializer_annotations():
+    preorder_positions(6)
+    plain = PreorderPositionSerializer(
+        PreorderPosition.objects.order_by("pk"), many=True
+    ).data
+    annotated = PreorderPositionSerializer(
+        PreorderPosition.objects.with_redemption_info().order_by("pk"), many=True
+    ).data
+    assert annotated == plain
+    assert [entry["is_redeemed"] for entry in annotated] == [
+        False,
+        True,
+        False,
+        False,
+        True,
+        False,
+    ]
+    assert "already been redeemed" in annotated[1]["redemption_message"]
+
+
+@pytest.mark.django_db
+def test_preorder_positions_constant_queries(
+    api_with_session, django_assert_num_queries
+):
+    preorder_positions(30)
+    for search in ("batch000", "batch00", "batch0"):
+        with django_assert_num_queries(3):
+            response = api_with_session.get("/api/preorderpositions/?search=" + search)
+    content = json.loads(response.content.decode())
+    assert content["count"] == 30
+    assert len(content["results"]) == 25
+
+
+@pytest.mark.django_db
+def test_preorders_constant_queries(api, django_assert_num_queries):
+    preorder_positions(30)
+    api.force_authenticate(user=user_factory(superuser=True))
+    with django_assert_num_queries(4):
+        response = api.get("/api/preorders/")
+    content = json.loads(response.content.decode())
+    assert len(content["results"]) == 25
+
+
 @pytest.mark.django_db
 def test_listentries(api_with_session):
     list_constraint_entry_factory(list_constraint_factory())
@@ -66,3 +192,27 @@ def test_listentries_with_search(api_with_session, chars):
     )
     content = json.loads(response.content.decode())
     assert content["count"] == int(chars >= 3)
+
+
+@pytest.mark.django_db
+def test_working_hours(api, api_with_session):
+    session = cashdesk_session_before_factory()
+    session.end = session.start + timedelta(minutes=75)
+    session.save()
+    response = api_with_session.get("/api/workinghours/")
+    assert response.status_code == 403
+
+    api.force_authenticate(user=user_factory(backoffice=True))
+    response = api.get("/api/workinghours/?group_by=role")
+    content = json.loads(response.content.decode())
+    assert content["results"] == [
+        {
+            "user": session.user.pk,
+            "username": session.user.username,
+            "name": session.user.get_full_name(),
+            "role": session.cashdesk.name,
+            "minutes": 75,
+            "sessions": 1,
+        }
+    ]
+    assert api.get("/api/workinghours/?group_by=foo").status_code == 400
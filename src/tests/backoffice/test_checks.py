@@ -1,6 +1,16 @@
 import pytest
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.test import override_settings
+from django.utils.translation import get_language
 
-from postix.backoffice.checks import CheckError, check_quotas, check_tax_rates
+from postix.backoffice.checks import (
+    CheckError,
+    _check_registry,
+    all_errors,
+    check_quotas,
+    check_tax_rates,
+)
 from postix.core.models import ListConstraintProduct
 
 from ..factories import list_constraint_factory, product_factory, quota_factory
@@ -31,3 +41,63 @@ def test_backoffice_tax_rate_check():
         check_tax_rates()
 
     assert "7" in str(error_info.value)
+
+
+def cached(name):
+    results = cache.get(_check_registry[name].cache_key)
+    return None if results is None else results[get_language()]
+
+
+@pytest.fixture
+def check_cache():
+    cache.clear()
+    with override_settings(BACKOFFICE_CHECKS_CACHE=60):
+        yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+def test_check_results_are_cached(check_cache, django_assert_num_queries):
+    product = product_factory()
+    errors = all_errors()
+    assert len(errors) == 1 and product.name in errors[0]
+
+    with django_assert_num_queries(0):
+        assert all_errors() == errors
+
+
+@pytest.mark.django_db
+def test_changes_only_rerun_affected_checks(check_cache):
+    product = product_factory()
+    all_errors()
+
+    quota = quota_factory()
+    assert cached("check_quotas") is None
+    assert cached("check_tax_rates") == ""
+    all_errors()
+
+    quota.products.add(product)
+    assert cached("check_quotas") is None
+    assert all_errors() == []
+
+    product.delete()
+    assert cached("check_quotas") is None
+    assert cached("check_tax_rates") is None
+
+
+@pytest.mark.django_db
+def test_recheck_view(check_cache, backoffice_client):
+    product = product_factory()
+    all_errors()
+    # Like a result cached before the product was created
+    check = _check_registry["check_quotas"]
+    cache.set(check.cache_key, {get_language(): ""})
+
+    response = backoffice_client.post("/backoffice/recheck/", {"next": "/foo/"})
+    assert response.status_code == 302
+    assert response["Location"] == "/foo/"
+    assert product.name in cached("check_quotas")
+    assert cached("check_tax_rates") == ""
+    assert [str(m) for m in get_messages(response.wsgi_request)] == [
+        "The settings have been checked again. Problems found: 1"
+    ]
@@ -0,0 +1,58 @@
+import os
+import zipfile
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from postix.backoffice.rendering import queue_record
+from postix.core.models.record import get_record_file_index
+
+from ..factories import record_factory
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmpdir):
+    settings.MEDIA_ROOT = str(tmpdir.join("media"))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_record_file_index(event_settings):
+    records = [record_factory() for _ in range(3)]
+    queue_record(records[0])
+    queue_record(records[2])
+    index = get_record_file_index()
+    assert set(index) == {records[0].pk, records[2].pk}
+    assert index[records[0].pk] == records[0].record_path
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_reports_directory(event_settings, tmpdir, monkeypatch):
+    monkeypatch.chdir(str(tmpdir))
+    records = [record_factory() for _ in range(3)]
+    queue_record(records[0])
+    out = StringIO()
+    call_command("export_reports", "--link", stdout=out)
+    assert "Exported 1 records" in out.getvalue()
+    assert "Use --force" in out.getvalue()
+
+    second = tmpdir.mkdir("second")
+    monkeypatch.chdir(str(second))
+    out = StringIO()
+    call_command("export_reports", "--force", stdout=out)
+    assert "Exported 3 records" in out.getvalue()
+    assert "Use --force" not in out.getvalue()
+    (export_dir,) = os.listdir(str(second))
+    assert len(os.listdir(os.path.join(str(second), export_dir))) == 3
+
+
+@pytest.mark.django_db
+def test_export_reports_zip(event_settings, tmpdir):
+    records = [record_factory() for _ in range(2)]
+    target = os.path.join(str(tmpdir), "records.zip")
+    call_command("export_reports", "--force", "--zip", target, stdout=StringIO())
+    with zipfile.ZipFile(target) as zf:
+        names = zf.namelist()
+    assert sorted(names) == sorted(
+        os.path.basename(record.record_path) for record in records
+    )
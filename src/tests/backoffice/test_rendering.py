@@ -0,0 +1,100 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+from django.utils.timezone import now
+
+from postix.backoffice.rendering import get_cached_record, queue_record
+from postix.core.models import RecordRenderJob
+
+from ..factories import record_factory
+
+
+@pytest.mark.django_db(transaction=True)
+def test_render_inline_and_reuse_cache(event_settings):
+    record = record_factory()
+    job = queue_record(record)
+    assert job.status == RecordRenderJob.STATUS_DONE
+    assert get_cached_record(record) == job.path
+
+    assert queue_record(record).pk == job.pk
+    assert RecordRenderJob.objects.count() == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_changed_record_is_rendered_again(event_settings):
+    record = record_factory()
+    job = queue_record(record)
+    record.carrier = "Someone else"
+    record.amount += 1
+    record.save()
+    assert get_cached_record(record) is None
+    new_job = queue_record(record)
+    assert new_job.pk != job.pk
+    assert new_job.status == RecordRenderJob.STATUS_DONE
+
+
+@pytest.mark.django_db(transaction=True)
+def test_render_waits_for_commit(event_settings):
+    record = record_factory()
+    with transaction.atomic():
+        job = queue_record(record)
+        assert job.status == RecordRenderJob.STATUS_QUEUED
+    job.refresh_from_db()
+    assert job.status == RecordRenderJob.STATUS_DONE
+
+
+@pytest.mark.django_db
+def test_stale_running_job_is_queued_again(event_settings, settings):
+    settings.RECORD_RENDER_BACKGROUND = True
+    record = record_factory()
+    job = queue_record(record)
+    RecordRenderJob.objects.filter(pk=job.pk).update(
+        status=RecordRenderJob.STATUS_RUNNING, modified=now() - timedelta(minutes=1)
+    )
+    assert queue_record(record).status == RecordRenderJob.STATUS_RUNNING
+
+    RecordRenderJob.objects.filter(pk=job.pk).update(
+        modified=now() - timedelta(seconds=settings.RECORD_RENDER_TIMEOUT + 1)
+    )
+    assert queue_record(record).status == RecordRenderJob.STATUS_QUEUED
+    call_command("render_records")
+    job.refresh_from_db()
+    assert job.status == RecordRenderJob.STATUS_DONE
+
+
+@pytest.mark.django_db
+def test_background_render_is_deduplicated(event_settings, settings):
+    settings.RECORD_RENDER_BACKGROUND = True
+    record = record_factory()
+    job = queue_record(record)
+    assert job.status == RecordRenderJob.STATUS_QUEUED
+    assert queue_record(record).pk == job.pk
+    assert queue_record(record, force=True).pk == job.pk
+
+    call_command("render_records")
+    job.refresh_from_db()
+    assert job.status == RecordRenderJob.STATUS_DONE
+    assert get_cached_record(record) == job.path
+
+
+@pytest.mark.django_db
+def test_record_print_polls_background_render(
+    backoffice_client, event_settings, settings
+):
+    settings.RECORD_RENDER_BACKGROUND = True
+    record = record_factory()
+    response = backoffice_client.get("/backoffice/records/{}/print/".format(record.pk))
+    assert response.status_code == 200
+    assert "being rendered" in response.content.decode()
+
+    response = backoffice_client.get("/backoffice/records/{}/status/".format(record.pk))
+    assert json.loads(response.content.decode())["status"] == "queued"
+
+    call_command("render_records")
+    response = backoffice_client.get("/backoffice/records/{}/status/".format(record.pk))
+    assert json.loads(response.content.decode())["status"] == "done"
+    response = backoffice_client.get("/backoffice/records/{}/print/".format(record.pk))
+    assert response["Content-Type"] == "application/pdf"
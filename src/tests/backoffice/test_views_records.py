@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 import pytest
 
 from postix.core.models import Record, RecordEntity
@@ -103,3 +105,20 @@ def test_backoffice_delete_record_entity(superuser_client, event_settings):
     )
     assert response.status_code == 200
     assert RecordEntity.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_backoffice_record_list_running_total(backoffice_client, monkeypatch):
+    from postix.backoffice.views.record import RecordListView
+
+    monkeypatch.setattr(RecordListView, "paginate_by", 2)
+    for incoming in (True, True, False, True, True):
+        record_factory(incoming=incoming)
+
+    response = backoffice_client.get("/backoffice/records/")
+    page = response.context["records"]
+    assert [r.running_total for r in page] == [Decimal("300.00"), Decimal("200.00")]
+
+    response = backoffice_client.get("/backoffice/records/?page=3")
+    page = response.context["records"]
+    assert [r.running_total for r in page] == [Decimal("100.00")]
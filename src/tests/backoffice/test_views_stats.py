@@ -0,0 +1,73 @@
+import json
+
+import pytest
+from django.test import override_settings
+
+from postix.core.utils.metrics import REQUEST, registry
+
+from ..factories import transaction_position_factory
+
+
+@pytest.mark.django_db
+def test_stats_timeline(backoffice_client):
+    transaction_position_factory()
+    response = backoffice_client.get("/backoffice/stats/timeline/?bucket=60")
+    assert response.status_code == 200
+    data = json.loads(response.content.decode())
+    assert len(data["buckets"]) == 24 * data["days"]
+    assert sum(data["transactions"]["sell"]) == 1
+    assert max(data["open_cashdesks"]) == 1
+
+
+@pytest.mark.parametrize(
+    "query",
+    (
+        "bucket=0",
+        "bucket=-5",
+        "resolution=99999999999999",
+        "start=2019-01-01&end=2019-03-01",
+        "start=2019-01-01&end=2019-01-10&resolution=1",
+    ),
+)
+@pytest.mark.django_db
+def test_stats_timeline_invalid(backoffice_client, query):
+    response = backoffice_client.get("/backoffice/stats/timeline/?" + query)
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_metrics_view(superuser_client):
+    registry.reset()
+    superuser_client.get("/backoffice/")
+    response = superuser_client.get("/backoffice/wizard/metrics/")
+    assert response.status_code == 200
+    assert "backoffice:main" in response.content.decode()
+
+    response = superuser_client.post("/backoffice/wizard/metrics/")
+    assert response.status_code == 302
+    assert "backoffice:main" not in registry.snapshot(REQUEST)
+
+
+@pytest.mark.django_db
+def test_metrics_view_requires_superuser(backoffice_client):
+    response = backoffice_client.get("/backoffice/wizard/metrics/")
+    assert response.status_code == 302
+
+
+@pytest.mark.django_db
+def test_metrics_prometheus(superuser_client):
+    response = superuser_client.get("/backoffice/wizard/metrics/prometheus")
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert (
+        "# TYPE postix_request_duration_seconds histogram" in response.content.decode()
+    )
+
+
+@pytest.mark.django_db
+def test_metrics_prometheus_token(client):
+    url = "/backoffice/wizard/metrics/prometheus"
+    assert client.get(url).status_code == 403
+    with override_settings(METRICS_TOKEN="secret"):
+        assert client.get(url, HTTP_AUTHORIZATION="Bearer wrong").status_code == 403
+        assert client.get(url, HTTP_AUTHORIZATION="Bearer secret").status_code == 200
@@ -1,7 +1,7 @@
 import pytest
 from django.contrib.auth import authenticate, get_user_model
 
-from ..factories import user_factory
+from ..factories import cashdesk_session_after_factory, user_factory
 
 User = get_user_model()
 
@@ -63,3 +63,24 @@ def test_backoffice_cannot_reset_password_on_superuser(backoffice_client):
     )
     assert response.status_code == 200
     assert not authenticate(username=user.username, password="testpassword12")
+
+
+@pytest.mark.django_db
+def test_backoffice_user_export(backoffice_client):
+    session = cashdesk_session_after_factory(create_items=False)
+    response = backoffice_client.get("/backoffice/users/?export&group_by=day")
+    assert response.status_code == 200
+    lines = b"".join(response.streaming_content).decode().splitlines()
+    assert lines[0] == "nick,name,day,minutes"
+    assert lines[1].startswith("{},".format(session.user.username))
+
+    response = backoffice_client.get("/backoffice/users/?export&group_by=foo")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_anonymous_cannot_export(client):
+    cashdesk_session_after_factory(create_items=False)
+    response = client.get("/backoffice/users/?export")
+    assert response.status_code == 302
+    assert response["Location"] == "/backoffice/login/"
@@ -17,6 +17,7 @@ from postix.core.models import (
     ProductItem,
     TransactionPosition,
 )
+from postix.core.models.cashdesk import get_item_ledger
 from postix.core.utils import times
 from postix.core.utils.flow import reverse_transaction
 
@@ -103,6 +104,27 @@ def test_current_items():
     ]
 
 
+@pytest.mark.django_db
+def test_item_ledger_multiple_sessions(django_assert_num_queries):
+    sessions = [cashdesk_session_before_factory() for _ in times(3)]
+    product = Product.objects.create(name="Full ticket", price=23, tax_rate=19)
+    item = sessions[0].get_item_set()[0]
+    ProductItem.objects.create(product=product, item=item, amount=1)
+    for _ in times(2):
+        transaction_position_factory(transaction_factory(sessions[0]), product)
+
+    with django_assert_num_queries(1):
+        ledger = get_item_ledger(sessions)
+
+    assert set(ledger) == {session.pk for session in sessions}
+    for session in sessions:
+        assert ledger[session.pk] == session.get_current_items()
+        assert len(ledger[session.pk]) == 3
+    assert ledger[sessions[0].pk][0]["item"] == item
+    assert ledger[sessions[0].pk][0]["transactions"] == 2
+    assert get_item_ledger([]) == {}
+
+
 @pytest.mark.django_db
 def test_cash_transaction_total():
     session = cashdesk_session_before_factory(create_items=False)
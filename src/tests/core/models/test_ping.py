@@ -0,0 +1,48 @@
+import math
+from datetime import timedelta
+
+import pytest
+from django.utils.timezone import now
+
+from postix.core.models import Ping
+from postix.core.models.ping import get_ping_stats
+
+from ...factories import ping_factory
+
+
+@pytest.mark.django_db
+def test_pong_stores_rtt():
+    ping = ping_factory(ponged=True)
+    assert ping.rtt == (ping.ponged - ping.pinged).total_seconds()
+
+
+@pytest.mark.django_db
+def test_ping_stats(django_assert_num_queries):
+    durations = list(range(1, 11))
+    for duration in durations:
+        ping = ping_factory()
+        Ping.objects.filter(pk=ping.pk).update(rtt=duration)
+    ping_factory()
+    old = ping_factory()
+    Ping.objects.filter(pk=old.pk).update(pinged=now() - timedelta(days=1), rtt=100)
+
+    with django_assert_num_queries(4):
+        stats = get_ping_stats(since=now() - timedelta(hours=1))
+    assert stats["count"] == 11
+    assert stats["received"] == 10
+    assert stats["loss"] == pytest.approx(100 / 11)
+    assert stats["min"] == 1
+    assert stats["max"] == 10
+    assert stats["mean"] == 5.5
+    assert stats["stddev"] == pytest.approx(math.sqrt(8.25))
+    assert stats["percentiles"] == {50: 5, 90: 9, 99: 10}
+
+    assert get_ping_stats()["max"] == 100
+
+
+@pytest.mark.django_db
+def test_ping_stats_without_pings():
+    stats = get_ping_stats()
+    assert stats["count"] == 0
+    assert stats["stddev"] is None
+    assert stats["percentiles"] == {}
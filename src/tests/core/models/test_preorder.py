@@ -0,0 +1,34 @@
+import pytest
+
+from postix.core.models import PreorderPosition
+from postix.core.models.preorder import filter_secret_prefix, get_prefix_upper_bound
+
+from ...factories import preorder_position_factory
+
+
+@pytest.mark.parametrize(
+    "prefix,upper_bound",
+    (
+        ("abc", "abd"),
+        ("ab\U0010ffff", "ac"),
+        ("a\ud7ff", "a\ue000"),
+        ("\U0010ffff", None),
+        ("", None),
+    ),
+)
+def test_prefix_upper_bound(prefix, upper_bound):
+    assert get_prefix_upper_bound(prefix) == upper_bound
+
+
+@pytest.mark.django_db
+def test_filter_secret_prefix():
+    positions = [preorder_position_factory() for _ in range(3)]
+    position = positions[0]
+    position.secret = "AbCdef"
+    position.save()
+    positions[1].secret = "abd"
+    positions[1].save()
+
+    assert list(filter_secret_prefix(PreorderPosition.objects, "abc")) == [position]
+    assert list(filter_secret_prefix(PreorderPosition.objects, "ABCDEF")) == [position]
+    assert filter_secret_prefix(PreorderPosition.objects, "").count() == 3
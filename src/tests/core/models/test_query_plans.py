@@ -0,0 +1,113 @@
+"""
+Makes sure the hot queries of the desk and troubleshooter keep using indexes:
+each query is run through EXPLAIN, and fails if the database would read any of
+the large tables in full.
+"""
+import re
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils.timezone import now
+
+from postix.core.models import (
+    CashdeskSession,
+    PreorderPosition,
+    TransactionPosition,
+    TroubleshooterNotification,
+)
+from postix.core.models.preorder import filter_secret_prefix
+
+HOT_TABLES = {
+    "core_cashdesksession",
+    "core_preorderposition",
+    "core_transaction",
+    "core_transactionposition",
+    "core_troubleshooternotification",
+}
+
+
+def explain(queryset: QuerySet) -> list:
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+        # Tables in tests are tiny, so make the planner use every index it can
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("EXPLAIN " + sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def full_scans(plan: list) -> set:
+    if connection.vendor == "sqlite":
+        pattern = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+    else:
+        pattern = re.compile(r"Seq Scan on (\w+)")
+    tables = set()
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match:
+            tables.add(match.group(1))
+    return tables & HOT_TABLES
+
+
+HOT_QUERIES = {
+    "preorder position redemptions": lambda: TransactionPosition.objects.filter(
+        preorder_position_id=1, type__in=["redeem"]
+    ),
+    "preorder position reversals": lambda: TransactionPosition.objects.filter(
+        preorder_position_id=1, type="reverse"
+    ),
+    "list entry redemptions": lambda: TransactionPosition.objects.filter(
+        listentry_id=1, type__in=["redeem", "sell"]
+    ),
+    "position was reversed": lambda: TransactionPosition.objects.filter(
+        reverses_id=1, type="reverse"
+    ),
+    "product amount sold": lambda: TransactionPosition.objects.filter(
+        product_id=1, type="sell"
+    ),
+    "product reversals": lambda: TransactionPosition.objects.filter(
+        product_id=1, type="reverse"
+    ).exclude(preorder_position__isnull=False),
+    "session positions": lambda: TransactionPosition.objects.filter(
+        transaction__session_id=1
+    ),
+    "session transactions": lambda: CashdeskSession(pk=1)
+    .transactions.all()
+    .order_by("datetime"),
+    "active notifications": lambda: TroubleshooterNotification.objects.active(),
+    "session notifications": lambda: TroubleshooterNotification.objects.active(
+        session=CashdeskSession(pk=1)
+    ),
+    "current session": lambda: CashdeskSession.objects.filter(
+        user_id=1, end__isnull=True
+    ).order_by("-start"),
+    "open sessions of cashdesk": lambda: CashdeskSession.objects.filter(
+        cashdesk_id=1, end__isnull=True
+    ),
+    "api token": lambda: CashdeskSession.objects.filter(api_token="foo"),
+    "secret lookup": lambda: PreorderPosition.objects.filter(secret_lookup="foo"),
+    "secret prefix": lambda: filter_secret_prefix(PreorderPosition.objects, "Foo"),
+    "transaction list": lambda: TransactionPosition.objects.filter(
+        transaction__datetime__lt=now() - timedelta(hours=1)
+    ).order_by("-transaction__datetime", "-pk"),
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    connection.vendor not in ("sqlite", "postgresql"), reason="Unsupported database"
+)
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_indexes(name):
+    plan = explain(HOT_QUERIES[name]())
+    assert not full_scans(plan), "\n".join(plan)
+
+
+@pytest.mark.django_db
+def test_full_scans_are_detected():
+    plan = explain(TransactionPosition.objects.filter(value=1))
+    assert full_scans(plan) == {"core_transactionposition"}
@@ -0,0 +1,57 @@
+from decimal import Decimal
+
+import pytest
+
+from postix.core.models import Record, RecordLedger
+from postix.core.models.record import record_balance
+
+from ...factories import record_factory
+
+
+@pytest.mark.django_db
+def test_record_balance_is_maintained():
+    assert record_balance() == 0
+    inflow = record_factory(incoming=True)
+    outflow = record_factory(incoming=False)
+    record_factory(incoming=True)
+    assert record_balance() == Decimal("100.00")
+
+    outflow.amount = Decimal("30.00")
+    outflow.save()
+    assert record_balance() == Decimal("170.00")
+
+    inflow.type = "outflow"
+    inflow.save()
+    assert record_balance() == Decimal("-30.00")
+
+    inflow.delete()
+    assert record_balance() == Decimal("70.00")
+    assert RecordLedger.recalculate() == Decimal("70.00")
+
+
+@pytest.mark.django_db
+def test_record_balance_is_constant_time(django_assert_num_queries):
+    for _ in range(3):
+        record_factory()
+    with django_assert_num_queries(1):
+        assert record_balance() == Decimal("300.00")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_record_is_not_saved_without_ledger(monkeypatch):
+    record = record_factory(incoming=True)
+    pk = record.pk
+
+    def fail(amount):
+        raise RuntimeError("ledger unavailable")
+
+    monkeypatch.setattr(RecordLedger, "add", fail)
+    record.amount = Decimal("80.00")
+    with pytest.raises(RuntimeError):
+        record.save()
+    with pytest.raises(RuntimeError):
+        record.delete()
+    monkeypatch.undo()
+
+    assert Record.objects.get(pk=pk).amount == Decimal("100.00")
+    assert record_balance() == RecordLedger.recalculate() == Decimal("100.00")
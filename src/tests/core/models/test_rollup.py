@@ -0,0 +1,68 @@
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from postix.core.models import SalesRollup
+from postix.core.models.rollup import diff_rollup, get_product_totals
+from postix.core.utils.flow import reverse_transaction
+
+from ...factories import (
+    cashdesk_session_before_factory,
+    product_factory,
+    transaction_factory,
+    transaction_position_factory,
+)
+
+
+@pytest.fixture
+def sales():
+    session = cashdesk_session_before_factory(create_items=False)
+    product = product_factory()
+    transactions = [transaction_factory(session) for _ in range(3)]
+    for trans in transactions:
+        transaction_position_factory(trans, product)
+    reverse_transaction(trans_id=transactions[0].pk, current_session=session)
+    return session, product
+
+
+@pytest.mark.django_db
+def test_rollup_is_maintained(sales):
+    session, product = sales
+    rows = {row.type: row for row in SalesRollup.objects.all()}
+    assert rows["sell"].count == 3
+    assert rows["sell"].value == 3 * product.price
+    assert rows["sell"].cashdesk == session.cashdesk
+    assert rows["reverse"].count == 1
+    assert rows["reverse"].value == -product.price
+    assert diff_rollup() == {}
+
+    assert get_product_totals()[product.pk] == {
+        "sold": product.amount_sold,
+        "redeemed": product.amount_redeemed,
+    }
+    assert product.amount_sold == 2
+
+
+@pytest.mark.django_db
+def test_rollup_verify_and_rebuild(sales):
+    call_command("rollup_sales", "verify", stdout=StringIO())
+
+    SalesRollup.objects.filter(type="sell").update(count=1)
+    SalesRollup.objects.filter(type="reverse").delete()
+    assert len(diff_rollup()) == 2
+    with pytest.raises(CommandError):
+        call_command("rollup_sales", "verify", stdout=StringIO())
+
+    call_command("rollup_sales", "rebuild", stdout=StringIO())
+    assert diff_rollup() == {}
+
+
+@pytest.mark.django_db
+def test_stats_reads_rollup(sales, django_assert_num_queries):
+    session, product = sales
+    out = StringIO()
+    with django_assert_num_queries(1):
+        call_command("stats", stdout=out)
+    assert "{}".format(product.name) in out.getvalue()
+    assert out.getvalue().splitlines()[0].endswith(" 2")
@@ -0,0 +1,132 @@
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils.timezone import now
+
+from postix.core.models import (
+    CashMovement,
+    ItemMovement,
+    ProductItem,
+    SessionItemSummary,
+    SessionSummary,
+)
+from postix.core.models.summary import compute_summaries, diff_summaries
+from postix.core.utils.flow import reverse_transaction
+
+from ...factories import (
+    cashdesk_session_before_factory,
+    product_factory,
+    transaction_factory,
+    transaction_position_factory,
+    user_factory,
+)
+
+
+@pytest.fixture
+def sales():
+    session = cashdesk_session_before_factory()
+    item = session.get_item_set()[0]
+    product = product_factory()
+    product.price = Decimal("50.00")  # The factory can pick free products
+    product.save()
+    ProductItem.objects.create(product=product, item=item, amount=2)
+    transactions = [transaction_factory(session) for _ in range(3)]
+    for trans in transactions:
+        transaction_position_factory(trans, product)
+    reverse_transaction(trans_id=transactions[0].pk, current_session=session)
+    return session, product, item
+
+
+@pytest.mark.django_db
+def test_summary_is_maintained(sales):
+    session, product, item = sales
+    summary = SessionSummary.objects.get(session=session)
+    assert summary.transaction_total == 2 * product.price
+    assert summary.cash_in == session.cash_movements.get().cash
+    assert summary.cash_out == 0
+    row = SessionItemSummary.objects.get(session=session, item=item)
+    assert row.transactions == 4
+    assert row.has_movements
+    assert diff_summaries() == {}
+
+
+@pytest.mark.django_db
+def test_summary_cross_session_reversal(sales):
+    session, product, item = sales
+    other = cashdesk_session_before_factory(
+        user=user_factory(troubleshooter=True), create_items=False
+    )
+    trans = transaction_factory(session)
+    transaction_position_factory(trans, product)
+    reverse_transaction(trans_id=trans.pk, current_session=other)
+
+    assert SessionItemSummary.objects.get(session=session, item=item).transactions == 4
+    assert not SessionItemSummary.objects.filter(session=other).exists()
+    summary = SessionSummary.objects.get(session=other)
+    assert summary.transaction_total == -product.price
+    assert diff_summaries() == {}
+
+
+@pytest.mark.django_db
+def test_summary_follows_cash_movements(sales):
+    session, product, item = sales
+    cash_before = session.cash_before
+    movement = CashMovement.objects.create(
+        session=session, cash=Decimal("-20.00"), backoffice_user=session.user
+    )
+    assert session.cash_before == cash_before - 20
+    movement.cash = Decimal("30.00")
+    movement.save()
+    assert session.cash_before == cash_before + 30
+    movement.delete()
+    assert session.cash_before == cash_before
+    assert session.cash_remaining == cash_before + 2 * product.price
+    assert diff_summaries() == {}
+
+
+@pytest.mark.django_db
+def test_summary_after_end(sales):
+    session, product, item = sales
+    session.end = now()
+    session.cash_after = Decimal("12.00")
+    session.backoffice_user_after = session.backoffice_user_before
+    session.save()
+    session.create_final_movement()
+    ItemMovement.objects.create(
+        session=session, item=item, amount=-3, backoffice_user=session.user
+    )
+
+    summary = SessionSummary.objects.get(session=session)
+    assert summary.cash_out == Decimal("-12.00")
+    assert session.cash_before == summary.cash_in
+    row = SessionItemSummary.objects.get(session=session, item=item)
+    assert row.post_movements == -3
+    assert session.get_current_items()[0]["final_movements"] == 3
+    assert diff_summaries() == {}
+
+
+@pytest.mark.django_db
+def test_cash_reads_are_lookups(sales, django_assert_num_queries):
+    session, product, item = sales
+    with django_assert_num_queries(1):
+        session.cash_remaining
+
+
+@pytest.mark.django_db
+def test_summary_verify_and_rebuild(sales):
+    session, product, item = sales
+    call_command("session_summaries", "verify", stdout=StringIO())
+
+    SessionSummary.objects.update(transaction_total=0)
+    SessionItemSummary.objects.filter(item=item).delete()
+    assert len(diff_summaries()) == 4
+    out = StringIO()
+    with pytest.raises(CommandError):
+        call_command("session_summaries", "verify", stdout=out)
+    assert "session={} transaction_total".format(session.pk) in out.getvalue()
+
+    call_command("session_summaries", "rebuild", stdout=StringIO())
+    assert diff_summaries() == {}
+    assert compute_summaries([session])[(session.pk, item.pk, "transactions")] == 4
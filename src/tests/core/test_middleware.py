@@ -0,0 +1,33 @@
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory
+
+from postix.core.middleware import CashdeskContextMiddleware, get_cashdesk_context
+
+from ..factories import cashdesk_session_before_factory
+
+
+@pytest.mark.django_db
+def test_context_resolves_once(django_assert_num_queries):
+    session = cashdesk_session_before_factory(ip="10.2.3.4")
+    request = RequestFactory().get("/", REMOTE_ADDR="10.2.3.4")
+    request.user = session.user
+    CashdeskContextMiddleware(lambda request: None)(request)
+
+    with django_assert_num_queries(2):
+        for _ in range(3):
+            context = get_cashdesk_context(request)
+            assert context.cashdesk == session.cashdesk
+            assert context.session == session
+            assert context.session.cashdesk.name == session.cashdesk.name
+            assert context.session.user == session.user
+    assert request.cashdesk_context is context
+
+
+@pytest.mark.django_db
+def test_context_without_session(django_assert_num_queries):
+    request = RequestFactory().get("/", REMOTE_ADDR="10.2.3.4")
+    request.user = AnonymousUser()
+    with django_assert_num_queries(1):
+        assert get_cashdesk_context(request).session is None
+        assert get_cashdesk_context(request).cashdesk is None
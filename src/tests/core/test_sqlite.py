@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+
+import pytest
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+
+ALIAS = "tuned_sqlite"
+
+
+@pytest.fixture
+def tuned_database(tmpdir):
+    settings_dict = dict(connections[DEFAULT_DB_ALIAS].settings_dict)
+    settings_dict.update(
+        ENGINE="postix.core.sqlite",
+        NAME=str(tmpdir.join("tuned.sqlite3")),
+        OPTIONS={"timeout": 20},
+        TEST={},
+    )
+    connections.databases[ALIAS] = settings_dict
+    with connections[ALIAS].cursor() as cursor:
+        cursor.execute("CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)")
+        cursor.execute("INSERT INTO counter VALUES (1, 0)")
+    yield connections[ALIAS]
+    connections[ALIAS].close()
+    del connections[ALIAS]
+    del connections.databases[ALIAS]
+
+
+def pragma(connection, name):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA {}".format(name))
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_pragmas(tuned_database):
+    assert pragma(tuned_database, "journal_mode") == "wal"
+    assert pragma(tuned_database, "synchronous") == 1  # NORMAL
+    assert pragma(tuned_database, "busy_timeout") == 20000
+    assert tuned_database.vendor == "sqlite"
+
+
+@pytest.mark.django_db
+def test_transactions_take_write_lock(tuned_database):
+    with transaction.atomic(using=ALIAS):
+        with tuned_database.cursor() as cursor:
+            cursor.execute("SELECT value FROM counter")
+
+        # Another connection cannot write, although this one only read
+        raw = sqlite3.connect(tuned_database.settings_dict["NAME"], timeout=0)
+        with pytest.raises(sqlite3.OperationalError):
+            raw.execute("UPDATE counter SET value = 1")
+        raw.close()
+
+
+@pytest.mark.django_db
+def test_concurrent_read_then_write(tuned_database):
+    desks, writes = 8, 25
+    errors = []
+
+    def desk():
+        try:
+            for _ in range(writes):
+                with transaction.atomic(using=ALIAS):
+                    with connections[ALIAS].cursor() as cursor:
+                        cursor.execute("SELECT value FROM counter WHERE id = 1")
+                        value = cursor.fetchone()[0]
+                        cursor.execute(
+                            "UPDATE counter SET value = %s WHERE id = 1", [value + 1]
+                        )
+        except OperationalError as e:
+            errors.append(e)
+        finally:
+            connections[ALIAS].close()
+
+    threads = [threading.Thread(target=desk) for _ in range(desks)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with tuned_database.cursor() as cursor:
+        cursor.execute("SELECT value FROM counter WHERE id = 1")
+        assert cursor.fetchone()[0] == desks * writes
@@ -0,0 +1,63 @@
+"""
+Starting a worker or running a management command should not import heavy
+libraries that only a few views and commands need. Checked in a fresh
+interpreter, as the test process has imported everything already.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+
+# requests is left out: Django REST framework imports it if it is installed.
+HEAVY_MODULES = ("PIL", "qrcode", "reportlab", "numpy", "matplotlib", "pylab")
+# Seconds for django.setup() and the first request together, about 0.7s on a
+# single core, leaving plenty of room for slow test machines
+STARTUP_BUDGET = 5
+
+SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+import django
+
+django.setup()
+setup = time.perf_counter()
+
+from django.test import Client
+
+status = Client().get("/api/products/").status_code
+first_request = time.perf_counter()
+print(json.dumps({
+    "setup": setup - start,
+    "first_request": first_request - setup,
+    "status": status,
+    "modules": sorted(m for m in %r if m in sys.modules),
+}))
+""" % (
+    HEAVY_MODULES,
+)
+
+
+@pytest.fixture(scope="module")
+def startup():
+    environment = dict(os.environ, DJANGO_SETTINGS_MODULE="tests.settings")
+    output = subprocess.check_output(
+        [sys.executable, "-c", SCRIPT], cwd=settings.BASE_DIR, env=environment
+    )
+    result = json.loads(output.decode().splitlines()[-1])
+    assert result["status"] == 401
+    return result
+
+
+def test_startup_does_not_import_heavy_modules(startup):
+    assert startup["modules"] == []
+
+
+def test_startup_time(startup):
+    total = startup["setup"] + startup["first_request"]
+    assert total < STARTUP_BUDGET, "Setup took {:.2f}s, first request {:.2f}s".format(
+        startup["setup"], startup["first_request"]
+    )
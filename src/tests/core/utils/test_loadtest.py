@@ -0,0 +1,112 @@
+import threading
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import pytest
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+
+from postix.core.models import (
+    Cashdesk,
+    CashdeskSession,
+    PreorderPosition,
+    TransactionPosition,
+)
+from postix.core.utils.loadtest import (
+    CONNECTION_ERROR,
+    OK,
+    SERVER_ERROR,
+    create_load_event,
+    parse_mix,
+    run_load,
+    scrape_request_totals,
+)
+from postix.core.utils.metrics import REQUEST, registry
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = make_server(
+        "127.0.0.1", 0, WSGIHandler(), WSGIServer, handler_class=QuietHandler
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}".format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.django_db
+def test_create_load_event():
+    event = create_load_event(desks=3, preorders=20)
+    assert len(event.desks) == 3
+    assert len({desk.ip for desk in event.desks}) == 3
+    assert PreorderPosition.objects.filter(secret__in=event.secrets).count() == 20
+    assert CashdeskSession.objects.filter(end__isnull=True).count() == 3
+
+    with pytest.raises(RuntimeError):
+        create_load_event(desks=1, preorders=1)
+
+    event.finish()
+    assert CashdeskSession.objects.filter(end__isnull=True).count() == 0
+    assert not Cashdesk.objects.filter(is_active=True).exists()
+    create_load_event(desks=1, preorders=1)
+
+
+def test_parse_mix():
+    assert parse_mix("redeem=2,sell") == {"redeem": 2.0, "sell": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("dance=1")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_load(server_url):
+    event = create_load_event(desks=2, preorders=50)
+    result = run_load(server_url, event, duration=1.5, seed=1)
+    event.finish()
+
+    assert result.actions > 0
+    assert result.requests >= result.actions
+    assert result.count(CONNECTION_ERROR) == result.count(SERVER_ERROR) == 0
+    assert result.outcomes["redeem"][OK] > 0
+    assert result.outcomes["sell"][OK] > 0
+    assert TransactionPosition.objects.filter(type="redeem").count() == (
+        result.outcomes["redeem"][OK]
+    )
+    assert result.percentile(0.5) <= result.percentile(0.99)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_loadtest_command(server_url, capsys):
+    call_command(
+        "loadtest",
+        "--url",
+        server_url,
+        "--desks",
+        "1,2",
+        "--duration",
+        "0.5",
+        "--preorders",
+        "20",
+        "--mix",
+        "products=1,resupply=1",
+    )
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith("desks  actions/s")
+    assert [line.split()[0] for line in lines[1:]] == ["1", "2"]
+    assert CashdeskSession.objects.filter(end__isnull=True).count() == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_scrape_request_totals(server_url, settings):
+    settings.METRICS_TOKEN = "metrics"
+    registry.reset()
+    registry.observe(REQUEST, "api:transaction-list", 0.5, db_time=0.25)
+    registry.observe(REQUEST, "backoffice:main", 1)
+    totals = scrape_request_totals(server_url, "metrics")
+    registry.reset()
+    assert totals == {"count": 1, "duration": 0.5, "db_time": 0.25}
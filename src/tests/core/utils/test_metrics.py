@@ -0,0 +1,122 @@
+import os
+
+import pytest
+from django.test import override_settings
+
+from postix.core.models import Transaction
+from postix.core.utils.flow import FlowError, reverse_transaction
+from postix.core.utils.metrics import (
+    LATENCY_BUCKETS,
+    OPERATION,
+    REQUEST,
+    Metric,
+    registry,
+    render_prometheus,
+    timed,
+)
+
+from ...factories import cashdesk_session_before_factory
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def test_metric_histogram():
+    metric = Metric()
+    for duration in (0.001, 0.002, 0.02, 0.3, 20):
+        metric.add(duration, queries=2, db_time=0.001, error=False)
+    assert metric.count == 5
+    assert metric.queries == 10
+    assert metric.cumulative_buckets[0] == 2
+    assert metric.cumulative_buckets[-1] == 4
+    assert metric.quantile(0.4) == LATENCY_BUCKETS[0]
+    assert metric.quantile(0.5) == 0.025
+    assert metric.quantile(1) == float("inf")
+    assert Metric().quantile(0.5) == 0
+
+
+@pytest.mark.django_db
+def test_timed_counts_queries_and_errors():
+    @timed("something")
+    def something(fail=False):
+        Transaction.objects.count()
+        Transaction.objects.exists()
+        if fail:
+            raise ValueError()
+
+    something()
+    with pytest.raises(ValueError):
+        something(fail=True)
+
+    metric = registry.snapshot(OPERATION)["something"]
+    assert metric.count == 2
+    assert metric.errors == 1
+    assert metric.queries == 4
+    assert 0 < metric.db_time <= metric.duration
+
+
+@pytest.mark.django_db
+def test_flow_operations_are_timed():
+    session = cashdesk_session_before_factory()
+    with pytest.raises(FlowError):
+        reverse_transaction(trans_id=1234678, current_session=session)
+    metric = registry.snapshot(OPERATION)["reverse"]
+    assert metric.count == metric.errors == 1
+    assert metric.queries >= 1
+
+
+@pytest.mark.django_db
+def test_timed_disabled():
+    with override_settings(METRICS=False), timed("something"):
+        Transaction.objects.count()
+    assert registry.snapshot(OPERATION) == {}
+
+
+@pytest.mark.django_db
+def test_middleware_records_url_names(backoffice_client, client):
+    backoffice_client.get("/backoffice/")
+    backoffice_client.get("/backoffice/")
+    client.get("/does/not/exist/")
+    requests = registry.snapshot(REQUEST)
+    assert requests["backoffice:main"].count == 2
+    assert requests["backoffice:main"].queries > 0
+    assert requests["backoffice:main"].errors == 0
+    assert "<unresolved>" in requests
+
+
+@pytest.mark.django_db
+def test_middleware_skips_streaming_responses(backoffice_client):
+    response = backoffice_client.get("/backoffice/records/export/")
+    assert response.streaming
+    b"".join(response.streaming_content)
+    assert "backoffice:record-export" not in registry.snapshot(REQUEST)
+
+
+def test_render_prometheus():
+    registry.observe(OPERATION, "sell", 0.02, queries=5, db_time=0.01)
+    registry.observe(OPERATION, "sell", 0.2, queries=5, db_time=0.01, error=True)
+    registry.observe(REQUEST, 'api:"odd"', 0.001)
+    text = render_prometheus()
+    assert (
+        'postix_operation_errors_total{{pid="{}",operation="sell"}} 1'.format(
+            os.getpid()
+        )
+        in text.splitlines()
+    )
+    text = text.replace('pid="{}",'.format(os.getpid()), "")
+    assert (
+        'postix_operation_duration_seconds_bucket{operation="sell",le="0.025"} 1'
+        in text
+    )
+    assert (
+        'postix_operation_duration_seconds_bucket{operation="sell",le="+Inf"} 2' in text
+    )
+    assert 'postix_operation_duration_seconds_count{operation="sell"} 2' in text
+    assert 'postix_operation_errors_total{operation="sell"} 1' in text
+    assert 'postix_operation_db_queries_total{operation="sell"} 10' in text
+    assert 'postix_request_duration_seconds_count{view="api:\\"odd\\""} 1' in text
+    assert "# TYPE postix_request_db_seconds_total counter" in text
@@ -16,6 +16,9 @@ def test_pretix_import_from_string(normal_pretix_data):
     assert Product.objects.count() == 1
     assert Preorder.objects.count() == 2
     assert PreorderPosition.objects.count() == 3
+    assert all(
+        pp.secret_lookup == pp.secret.lower() for pp in PreorderPosition.objects.all()
+    )
     assert Cashdesk.objects.count() == 5
 
 
@@ -0,0 +1,159 @@
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+from django.core.management import call_command
+from django.utils.timezone import now
+
+from postix.core.models import Ping
+from postix.core.utils.queue_sync import DATE_FORMAT, PingSyncer, QueueSyncError
+
+from ...factories import ping_factory
+
+
+class QueueHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        data = parse_qs(self.rfile.read(length).decode())
+        server = self.server
+        with server.lock:
+            server.received.append((self.headers["Authorization"], data["ping"][0]))
+        self.send_response(500 if data["ping"][0] in server.failing else 201)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def queue_server():
+    server = HTTPServer(("127.0.0.1", 0), QueueHandler)
+    server.lock = threading.Lock()
+    server.received = []
+    server.failing = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def queue_settings(event_settings, queue_server):
+    event_settings.queue_sync_url = "http://127.0.0.1:{}".format(
+        queue_server.server_port
+    )
+    event_settings.queue_sync_token = "sometoken"
+    event_settings.save()
+    return event_settings
+
+
+def make_pings(count):
+    pings = []
+    for index in range(count):
+        ping = ping_factory(ponged=True)
+        Ping.objects.filter(pk=ping.pk).update(
+            pinged=now() - timedelta(minutes=index + 1)
+        )
+        ping.refresh_from_db()
+        pings.append(ping)
+    return pings
+
+
+@pytest.mark.django_db
+def test_syncer_requires_settings(event_settings):
+    assert PingSyncer.from_settings() is None
+
+
+@pytest.mark.django_db
+def test_sync_pending_marks_pings(queue_settings, queue_server):
+    pings = make_pings(5)
+    ping_factory(ponged=False)
+    syncer = PingSyncer.from_settings(concurrency=3)
+    synced, failed = syncer.sync_pending(batch_size=2)
+    syncer.close()
+
+    assert sorted(synced) == sorted(ping.pk for ping in pings)
+    assert failed == []
+    assert len(queue_server.received) == 5
+    assert {auth for auth, _ in queue_server.received} == {"sometoken"}
+    assert Ping.objects.filter(synced=True).count() == 5
+    assert Ping.objects.filter(synced=False).count() == 1
+
+
+@pytest.mark.django_db
+def test_sync_continues_after_failure(queue_settings, queue_server):
+    pings = make_pings(4)
+    queue_server.failing.add(pings[1].pinged.strftime(DATE_FORMAT))
+    syncer = PingSyncer.from_settings()
+    synced, failed = syncer.sync_pending()
+
+    assert failed == [pings[1].pk]
+    assert len(synced) == 3
+    assert list(Ping.objects.filter(synced=False).values_list("pk", flat=True)) == [
+        pings[1].pk
+    ]
+
+    # The failed ping backs off and is not sent again right away
+    received = len(queue_server.received)
+    assert syncer.sync_pending() == ([], [])
+    assert len(queue_server.received) == received
+    syncer.close()
+
+
+@pytest.mark.django_db
+def test_sync_retries_after_backoff(queue_settings, queue_server):
+    ping = make_pings(1)[0]
+    queue_server.failing.add(ping.pinged.strftime(DATE_FORMAT))
+    syncer = PingSyncer.from_settings(backoff_base=0)
+    assert syncer.sync_pending() == ([], [ping.pk])
+    assert syncer.failures[ping.pk][0] == 1
+
+    queue_server.failing.clear()
+    assert syncer.sync_pending() == ([ping.pk], [])
+    assert ping.pk not in syncer.failures
+    syncer.close()
+
+
+@pytest.mark.django_db
+def test_sync_unreachable_server(queue_settings, queue_server):
+    ping = make_pings(1)[0]
+    queue_server.shutdown()
+    queue_server.server_close()
+    syncer = PingSyncer.from_settings(timeout=1)
+    with pytest.raises(QueueSyncError):
+        syncer.post(ping)
+    syncer.close()
+
+
+@pytest.mark.django_db
+def test_ping_sync(queue_settings, queue_server):
+    ping = make_pings(1)[0]
+    ping.sync()
+    ping.refresh_from_db()
+    assert ping.synced
+    assert len(queue_server.received) == 1
+
+    ping.sync()
+    assert len(queue_server.received) == 1
+
+
+@pytest.mark.django_db
+def test_ping_sync_raises_on_failure(queue_settings, queue_server):
+    ping = make_pings(1)[0]
+    queue_server.failing.add(ping.pinged.strftime(DATE_FORMAT))
+    with pytest.raises(QueueSyncError):
+        ping.sync()
+    ping.refresh_from_db()
+    assert not ping.synced
+
+
+@pytest.mark.django_db
+def test_runperiodic(queue_settings, queue_server, capsys):
+    pings = make_pings(3)
+    queue_server.failing.add(pings[0].pinged.strftime(DATE_FORMAT))
+    call_command("runperiodic", "--concurrency", "2", "--batch-size", "2")
+    assert "Synced 2 pings, 1 failed." in capsys.readouterr().out
+    assert Ping.objects.filter(synced=True).count() == 2
@@ -0,0 +1,48 @@
+import csv
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from postix.core.models import Record
+from postix.core.utils.record_export import iter_records_csv, write_records_csv
+
+from ...factories import cashdesk_session_after_factory, record_factory
+
+
+@pytest.fixture
+def records(event_settings):
+    cashdesk_session_after_factory()
+    cashdesk_session_after_factory()
+    record_factory(incoming=True)
+    record_factory(incoming=False)
+    return Record.objects.all()
+
+
+@pytest.mark.django_db
+def test_export_uses_constant_queries(records, django_assert_num_queries):
+    count = records.count()
+    stream = StringIO()
+    with django_assert_num_queries(1):
+        assert write_records_csv(stream) == count
+
+    rows = list(csv.reader(StringIO(stream.getvalue())))
+    assert rows[0][0] == "Datum"
+    assert len(rows) == count + 1
+    assert {row[-1] for row in rows[1:]} == {record.checksum for record in records}
+
+
+@pytest.mark.django_db
+def test_export_command_and_stream_match(records, capsys):
+    call_command("export_records")
+    assert capsys.readouterr().out == "".join(iter_records_csv())
+
+
+@pytest.mark.django_db
+def test_backoffice_record_export(backoffice_client, records):
+    response = backoffice_client.get("/backoffice/records/export/")
+    assert response.status_code == 200
+    assert response.streaming
+    assert response["Content-Type"] == "text/csv; charset=utf-8"
+    content = b"".join(response.streaming_content).decode()
+    assert content == "".join(iter_records_csv())
@@ -0,0 +1,93 @@
+import pytest
+from django.db import connection
+
+from postix.core.models import ListConstraintEntry, Preorder
+from postix.core.utils.search import (
+    get_search_table,
+    has_search_index,
+    install_search_index,
+    search,
+)
+
+from ...factories import list_constraint_factory
+
+
+def codes(queryset):
+    return [preorder.order_code for preorder in queryset]
+
+
+@pytest.fixture
+def preorders():
+    return [
+        Preorder.objects.create(order_code=code)
+        for code in ("XABCDY", "ABCDE", "abcd", "QQQQQ", "ZZABC")
+    ]
+
+
+@pytest.mark.django_db
+def test_search_index_available():
+    assert has_search_index()
+
+
+@pytest.mark.django_db
+def test_search_ranks_matches(preorders, django_assert_num_queries):
+    with django_assert_num_queries(1) as captured:
+        result = codes(search(Preorder.objects.all(), "abcd"))
+    assert result == ["abcd", "ABCDE", "XABCDY"]
+    assert "MATCH" in captured.captured_queries[0]["sql"]
+    assert codes(search(Preorder.objects.all(), "abc", limit=2)) == ["ABCDE", "abcd"]
+
+
+@pytest.mark.django_db
+def test_search_short_queries(preorders):
+    assert codes(search(Preorder.objects.all(), "zz")) == ["ZZABC"]
+    assert codes(search(Preorder.objects.all(), "  ")) == []
+
+
+@pytest.mark.django_db
+def test_search_quotes(preorders):
+    Preorder.objects.create(order_code='AB"CD')
+    assert codes(search(Preorder.objects.all(), 'b"c')) == ['AB"CD']
+    assert codes(search(Preorder.objects.all(), "AND")) == []
+
+
+@pytest.mark.django_db
+def test_search_index_follows_changes():
+    lc = list_constraint_factory()
+    entry = ListConstraintEntry.objects.create(
+        list=lc, name="Jane Doe", identifier="4242"
+    )
+    ListConstraintEntry.objects.bulk_create(
+        [
+            ListConstraintEntry(list=lc, name="John Doe", identifier="1337"),
+            ListConstraintEntry(list=lc, name="Max Mustermann", identifier="4711"),
+        ]
+    )
+    entries = lc.entries.all()
+    assert [e.name for e in search(entries, "doe")] == ["Jane Doe", "John Doe"]
+    assert [e.name for e in search(entries, "471")] == ["Max Mustermann"]
+
+    entry.name = "Erika Mustermann"
+    entry.save()
+    assert [e.name for e in search(entries, "doe")] == ["John Doe"]
+    assert [e.name for e in search(entries, "muster")] == [
+        "Erika Mustermann",
+        "Max Mustermann",
+    ]
+
+    ListConstraintEntry.objects.filter(identifier="1337").delete()
+    assert list(search(entries, "doe")) == []
+
+
+@pytest.mark.django_db
+def test_search_index_repairs_missing_triggers(preorders):
+    table = get_search_table(Preorder._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute("DROP TRIGGER {}_insert".format(table))
+    Preorder.objects.create(order_code="MISSED")
+    assert codes(search(Preorder.objects.all(), "misse")) == []
+
+    assert install_search_index()
+    assert codes(search(Preorder.objects.all(), "misse")) == ["MISSED"]
+    Preorder.objects.create(order_code="NOTMISSED")
+    assert codes(search(Preorder.objects.all(), "misse")) == ["MISSED", "NOTMISSED"]
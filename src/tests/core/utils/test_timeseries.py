@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from django.utils.timezone import get_current_timezone, now
+
+from postix.core.models import Transaction, TransactionPosition
+from postix.core.models.rollup import rebuild_rollup
+from postix.core.utils.timeseries import (
+    count_open_cashdesks,
+    get_default_sessions,
+    get_timeline,
+    local_midnight,
+    split_days,
+)
+
+from ...factories import (
+    cashdesk_session_before_factory,
+    transaction_factory,
+    transaction_position_factory,
+)
+
+
+def test_count_open_cashdesks():
+    starts = np.array([10, 20, 15, 40, 30], dtype=np.float64)
+    ends = np.array([30, 25, 35, np.inf, 50], dtype=np.float64)
+    cashdesks = np.array([1, 1, 2, 3, 1])
+    points = np.array([0, 10, 22, 30, 36, 45, 60], dtype=np.float64)
+    assert count_open_cashdesks(starts, ends, cashdesks, points).tolist() == [
+        0,
+        1,
+        2,
+        2,
+        1,
+        2,
+        1,
+    ]
+
+
+@pytest.mark.django_db
+def test_timeline_buckets_positions_by_type():
+    today = now().astimezone(get_current_timezone()).date()
+    origin = local_midnight(today)
+    transaction = transaction_factory()
+    positions = [transaction_position_factory(transaction) for _ in range(3)]
+    TransactionPosition.objects.filter(pk=positions[0].pk).update(type="reverse")
+    Transaction.objects.filter(pk=transaction.pk).update(
+        datetime=transaction.session.start + timedelta(minutes=5)
+    )
+    rebuild_rollup()
+
+    timeline = get_timeline(
+        start=today - timedelta(days=1), end=today, bucket=timedelta(hours=1)
+    )
+    assert timeline["days"] == 2
+    assert len(timeline["buckets"]) == 48
+    hour = 24 + int((transaction.session.start.timestamp() + 300 - origin) // 3600)
+    assert timeline["transactions"]["sell"].sum() == 2
+    assert timeline["transactions"]["sell"][hour] == 2
+    assert timeline["transactions"]["reverse"][hour] == 1
+    assert timeline["transactions"]["redeem"].sum() == 0
+
+    # Buckets that do not line up with the rollup are computed from positions
+    uneven = get_timeline(
+        start=today - timedelta(days=1), end=today, bucket=timedelta(minutes=7)
+    )
+    assert uneven["transactions"]["sell"].sum() == 2
+
+    # The session is still open, so it counts from its start until now
+    sample = int((transaction.session.start.timestamp() + 300 - origin) // 300)
+    assert timeline["open_cashdesks"][24 * 12 + sample] == 1
+    assert timeline["open_cashdesks"][0] == 0
+
+
+def test_timeline_validates_input():
+    with pytest.raises(ValueError):
+        get_timeline(bucket=timedelta(0))
+
+
+@pytest.mark.django_db
+def test_default_sessions_leave_out_cash_boxes():
+    session = cashdesk_session_before_factory(create_items=False)
+    cash_box = cashdesk_session_before_factory(create_items=False)
+    cash_box.cashdesk.name = "Handkasse 1"
+    cash_box.cashdesk.save()
+    assert list(get_default_sessions()) == [session]
+
+
+def test_timeline_limits_size():
+    today = now().date()
+    with pytest.raises(ValueError):
+        get_timeline(start=today - timedelta(days=7), end=today, max_days=7)
+    with pytest.raises(ValueError):
+        get_timeline(
+            start=today, end=today, resolution=timedelta(minutes=1), max_samples=1000
+        )
+
+
+@pytest.mark.django_db
+def test_timeline_days_across_dst_change(settings):
+    settings.TIME_ZONE = "Europe/Berlin"
+    # Daylight saving time ends on October 25, 2026, so that day has 25 hours
+    start = date(2026, 10, 24)
+    timeline = get_timeline(
+        start=start, end=date(2026, 10, 26), bucket=timedelta(hours=1)
+    )
+    assert len(timeline["buckets"]) == 73
+    days = list(split_days(np.arange(73), timeline["buckets"], timeline["start"], 3))
+    assert [len(indices) for _, indices in days] == [24, 25, 24]
+    assert [indices[0] for _, indices in days] == [0, 24, 49]
+    assert days[2][0][0] == 0
@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+import pytest
+from django.db.models import F
+
+from postix.core.models import Cashdesk, CashdeskSession, User
+from postix.core.utils.working_hours import (
+    get_working_hours,
+    iter_working_hours_csv,
+    parse_groups,
+    with_working_time,
+)
+
+from ...factories import cashdesk_session_after_factory, cashdesk_session_before_factory
+
+
+@pytest.fixture
+def sessions():
+    first = cashdesk_session_after_factory(create_items=False)
+    second = cashdesk_session_after_factory(user=first.user, create_items=False)
+    other = cashdesk_session_after_factory(create_items=False)
+    cashdesk_session_before_factory(user=other.user, create_items=False)
+    CashdeskSession.objects.filter(pk=first.pk).update(
+        start=F("end") - timedelta(minutes=90)
+    )
+    CashdeskSession.objects.filter(pk=second.pk).update(
+        start=F("end") - timedelta(minutes=30)
+    )
+    CashdeskSession.objects.filter(pk=other.pk).update(
+        start=F("end") - timedelta(minutes=45)
+    )
+    Cashdesk.objects.filter(sessions__in=[first, second]).update(record_name="Bar")
+    Cashdesk.objects.filter(pk=other.cashdesk_id).update(record_name=None)
+    return first.user, other.user
+
+
+@pytest.mark.django_db
+def test_working_hours(sessions, django_assert_num_queries):
+    user, other = sessions
+    with django_assert_num_queries(1):
+        rows = list(get_working_hours())
+    assert [(row["user"], row["sessions"]) for row in rows] == [
+        (user.pk, 2),
+        (other.pk, 1),
+    ]
+    assert rows[0]["duration"] == timedelta(minutes=120)
+    assert rows[1]["duration"] == timedelta(minutes=45)
+
+    assert User.objects.get(pk=user.pk).hours[0] == timedelta(minutes=120)
+    annotated = with_working_time(User.objects.filter(pk=other.pk)).get()
+    with django_assert_num_queries(0):
+        assert annotated.hours[0] == timedelta(minutes=45)
+
+
+@pytest.mark.django_db
+def test_working_hours_by_role(sessions):
+    user, other = sessions
+    rows = list(get_working_hours(["role"]))
+    assert [(row["user"], row["role"], row["sessions"]) for row in rows] == [
+        (user.pk, "Bar", 2),
+        (other.pk, CashdeskSession.objects.filter(user=other).first().cashdesk.name, 1),
+    ]
+
+
+@pytest.mark.django_db
+def test_working_hours_by_day(sessions):
+    rows = list(get_working_hours(["day"]))
+    assert len(rows) == 2
+    assert all(row["day"] for row in rows)
+
+
+@pytest.mark.django_db
+def test_working_hours_csv(sessions):
+    user, other = sessions
+    lines = list(iter_working_hours_csv())
+    assert lines[0] == "nick,name,minutes\n"
+    assert lines[1] == "{},{},120\n".format(user.username, user.get_full_name())
+    assert lines[2].endswith(",45\n")
+
+    lines = list(iter_working_hours_csv(["day"]))
+    assert lines[0] == "nick,name,day,minutes\n"
+
+
+def test_parse_groups():
+    assert parse_groups("") == []
+    assert parse_groups("day, role") == ["day", "role"]
+    with pytest.raises(ValueError):
+        parse_groups("cashdesk")
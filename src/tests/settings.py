@@ -8,3 +8,9 @@ MEDIA_ROOT = os.path.join(tmpdir.name, "media")
 atexit.register(tmpdir.cleanup)
 
 LANGUAGE_CODE = "en-us"
+
+TROUBLESHOOTER_DASHBOARD_CACHE = 0
+API_AUTH_CACHE = 0
+BACKOFFICE_CHECKS_CACHE = 0
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
@@ -0,0 +1,47 @@
+import pytest
+from django.core.cache import cache
+
+from postix.troubleshooter.dashboard import (
+    build_dashboard,
+    get_dashboard,
+    invalidate_dashboard,
+)
+
+from ..factories import cashdesk_session_before_factory, notification_factory
+
+
+@pytest.mark.django_db
+def test_dashboard_query_count_is_constant(django_assert_num_queries):
+    notification = notification_factory()
+    cashdesk_session_before_factory()
+    with django_assert_num_queries(4):
+        data = build_dashboard()
+    assert len(data["sessions"]) == 2
+
+    for _ in range(3):
+        cashdesk_session_before_factory()
+    with django_assert_num_queries(4):
+        data = build_dashboard()
+    assert len(data["sessions"]) == 5
+
+    sessions = {sess.pk: sess for sess in data["sessions"]}
+    assert sessions[notification.session.pk].open_requests
+    assert sum(sess.open_requests for sess in data["sessions"]) == 1
+    for sess in data["sessions"]:
+        assert sess.current_items == sess.get_current_items()
+
+
+@pytest.mark.django_db
+def test_dashboard_is_cached(settings, django_assert_num_queries):
+    settings.TROUBLESHOOTER_DASHBOARD_CACHE = 60
+    cache.clear()
+    cashdesk_session_before_factory()
+    assert len(get_dashboard()["sessions"]) == 1
+
+    cashdesk_session_before_factory()
+    with django_assert_num_queries(0):
+        assert len(get_dashboard()["sessions"]) == 1
+
+    invalidate_dashboard()
+    assert len(get_dashboard()["sessions"]) == 2
+    cache.clear()
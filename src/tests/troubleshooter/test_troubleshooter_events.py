@@ -0,0 +1,111 @@
+import json
+import threading
+
+import pytest
+
+from postix.core.models import TroubleshooterNotification
+from postix.troubleshooter import events
+from postix.troubleshooter.events import (
+    EVENT_ACK,
+    EVENT_EXPIRED,
+    EVENT_NEW,
+    NotificationBus,
+    bus,
+    event_stream,
+)
+
+from ..factories import cashdesk_session_before_factory
+
+
+def test_bus_wakes_all_subscribers():
+    test_bus = NotificationBus()
+    results = []
+
+    def subscribe():
+        results.append(test_bus.wait(0, timeout=5))
+
+    threads = [threading.Thread(target=subscribe) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    test_bus.publish(EVENT_NEW, {"notification": 1})
+    for thread in threads:
+        thread.join()
+    assert results == [[(1, EVENT_NEW, {"notification": 1})]] * 5
+    assert test_bus.wait(1, timeout=0.01) == []
+
+
+def test_bus_expires_notifications(monkeypatch):
+    monkeypatch.setattr(events, "NOTIFICATION_LIFETIME", 0.05)
+    test_bus = NotificationBus()
+    test_bus.publish(EVENT_NEW, {"notification": 1})
+    test_bus.publish(EVENT_NEW, {"notification": 2})
+    test_bus.publish(EVENT_ACK, {"notification": 2})
+    assert test_bus.wait(3, timeout=5) == [(4, EVENT_EXPIRED, {"notification": 1})]
+
+
+@pytest.mark.django_db
+def test_event_stream():
+    stream = event_stream(duration=5)
+    assert next(stream).startswith("retry:")
+    assert json.loads(next(stream).split("data: ")[1]) == {"has_requests": False}
+
+    session = cashdesk_session_before_factory()
+    notification = TroubleshooterNotification.objects.create(
+        session=session, modified_by=session.user, message="Requesting resupply"
+    )
+    timer = threading.Timer(
+        0.05, bus.publish, (EVENT_NEW, events.notification_data(notification))
+    )
+    timer.start()
+    event = next(stream)
+    timer.join()
+    assert "event: new" in event
+    data = json.loads(event.split("data: ")[1])
+    assert data["notification"] == notification.pk
+    assert data["has_requests"] is True
+    stream.close()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_resupply_publishes_events(troubleshooter_client):
+    last_id = bus.last_id
+    session = cashdesk_session_before_factory()
+    session.request_resupply()
+    troubleshooter_client.post(
+        "/troubleshooter/session/{}/resupply/".format(session.pk)
+    )
+    published = [
+        (event_type, data["session"]) for _, event_type, data in bus.since(last_id)
+    ]
+    assert published == [(EVENT_NEW, session.pk), (EVENT_ACK, session.pk)]
+
+
+@pytest.mark.django_db
+def test_notification_events_view(troubleshooter_client, monkeypatch):
+    monkeypatch.setattr(events, "STREAM_DURATION", 0)
+    response = troubleshooter_client.get("/troubleshooter/session/events")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "text/event-stream"
+    content = b"".join(response.streaming_content).decode()
+    assert "event: state" in content
+
+
+@pytest.mark.django_db
+def test_notification_events_view_limits_streams(
+    troubleshooter_client, monkeypatch, settings
+):
+    monkeypatch.setattr(events, "STREAM_DURATION", 0)
+    settings.TROUBLESHOOTER_EVENT_STREAMS = 1
+    stream = events.open_event_stream()
+    response = troubleshooter_client.get("/troubleshooter/session/events")
+    assert response.status_code == 503
+
+    stream.close()
+    response = troubleshooter_client.get("/troubleshooter/session/events")
+    assert response.status_code == 200
+    b"".join(response.streaming_content)
+    assert events.stream_slots.count == 0
+
+    settings.TROUBLESHOOTER_EVENT_STREAMS = 0
+    response = troubleshooter_client.get("/troubleshooter/session/events")
+    assert response.status_code == 503
@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 import pytest
+from django.utils.timezone import now
 
 from postix.core.models import Ping
 
@@ -17,3 +20,16 @@ def test_troubleshooter_ping_view(troubleshooter_client):
     )
     assert response.status_code == 200
     assert Ping.objects.count() == 11
+
+
+@pytest.mark.django_db
+def test_troubleshooter_ping_view_window_and_pages(troubleshooter_client):
+    pings = [ping_factory(ponged=True) for _ in range(60)]
+    Ping.objects.filter(pk=pings[0].pk).update(pinged=now() - timedelta(hours=2))
+    response = troubleshooter_client.get("/troubleshooter/ping/?window=1h")
+    assert response.context["stats"]["count"] == 59
+    assert response.context["is_paginated"]
+    assert len(response.context["pings"]) == 50
+    response = troubleshooter_client.get("/troubleshooter/ping/?window=1h&page=2")
+    assert len(response.context["pings"]) == 9
+    assert "p50/p90/p99" in response.content.decode()
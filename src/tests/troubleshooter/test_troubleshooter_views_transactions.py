@@ -1,7 +1,15 @@
+from datetime import timedelta
+
 import pytest
+from django.utils.timezone import now
+
+from postix.core.models import Transaction
+from postix.troubleshooter.views.transactions import TransactionListView
 
 from ..factories import (
     cashdesk_factory,
+    cashdesk_session_before_factory,
+    product_factory,
     transaction_factory,
     transaction_position_factory,
 )
@@ -56,3 +64,87 @@ def test_troubleshooter_can_generate_invoice(troubleshooter_client, event_settin
         follow=True,
     )
     assert response.status_code == 200
+
+
+@pytest.fixture
+def positions():
+    session = cashdesk_session_before_factory(create_items=False)
+    product = product_factory()
+    result = []
+    for index in range(7):
+        transaction = transaction_factory(session=session)
+        result += [
+            transaction_position_factory(transaction=transaction, product=product)
+            for _ in range(2)
+        ]
+    # Several transactions share a timestamp, so the position ID has to break ties
+    base = now()
+    for index, transaction in enumerate(Transaction.objects.order_by("pk")):
+        Transaction.objects.filter(pk=transaction.pk).update(
+            datetime=base - timedelta(minutes=index // 3)
+        )
+    return result
+
+
+def get_page(client, query=""):
+    response = client.get("/troubleshooter/transactions/" + query)
+    assert response.status_code == 200
+    return (
+        response.context["page_obj"],
+        [p.pk for p in response.context["transactions"]],
+    )
+
+
+@pytest.mark.django_db
+def test_troubleshooter_transactions_keyset_pages(
+    troubleshooter_client, positions, monkeypatch
+):
+    monkeypatch.setattr(TransactionListView, "paginate_by", 4)
+    expected = [
+        p.pk
+        for p in sorted(
+            positions,
+            key=lambda p: (Transaction.objects.get(pk=p.transaction_id).datetime, p.pk),
+            reverse=True,
+        )
+    ]
+
+    pages = []
+    page, ids = get_page(troubleshooter_client)
+    assert not page.has_previous
+    pages.append(ids)
+    while page.has_next:
+        page, ids = get_page(troubleshooter_client, "?after=" + page.next_cursor)
+        pages.append(ids)
+    assert [len(ids) for ids in pages] == [4, 4, 4, 2]
+    assert sum(pages, []) == expected
+
+    # And back again
+    for expected_ids in reversed(pages[:-1]):
+        page, ids = get_page(troubleshooter_client, "?before=" + page.previous_cursor)
+        assert ids == expected_ids
+        assert page.has_next
+    assert not page.has_previous
+
+
+@pytest.mark.django_db
+def test_troubleshooter_transactions_constant_queries(
+    troubleshooter_client, positions, django_assert_max_num_queries, monkeypatch
+):
+    monkeypatch.setattr(TransactionListView, "paginate_by", 4)
+    page, _ = get_page(troubleshooter_client)
+    with django_assert_max_num_queries(8) as first:
+        troubleshooter_client.get("/troubleshooter/transactions/")
+    with django_assert_max_num_queries(8) as deep:
+        troubleshooter_client.get(
+            "/troubleshooter/transactions/?after=" + page.next_cursor
+        )
+    assert len(first.captured_queries) == len(deep.captured_queries)
+    assert not any("COUNT(" in q["sql"] for q in deep.captured_queries)
+
+
+@pytest.mark.django_db
+def test_troubleshooter_transactions_invalid_cursor(troubleshooter_client, positions):
+    page, ids = get_page(troubleshooter_client, "?after=foo")
+    assert len(ids) == len(positions)
+    assert not page.has_previous